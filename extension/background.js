@@ -6,6 +6,9 @@
 // API configuration - loads from storage or defaults to localhost
 let API_BASE_URL = 'http://localhost:8000';
 
+// Longest URL-encoded claim sent as a cacheable GET; longer ones are POSTed
+const MAX_GET_CLAIM_LENGTH = 512;
+
 // Load API URL from storage on startup
 chrome.storage.sync.get(['apiBaseUrl'], (result) => {
   if (result.apiBaseUrl) {
@@ -76,13 +79,22 @@ async function verifyClaim(claim, tabId) {
     console.log('Verifying claim:', claim);
     console.log('API URL:', `${API_BASE_URL}/api/v1/verify`);
     
-    const response = await fetch(`${API_BASE_URL}/api/v1/verify`, {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json'
-      },
-      body: JSON.stringify({ claim })
-    });
+    // GET lets the browser cache the result; 'no-cache' revalidates it with
+    // If-None-Match, so a claim already seen is answered with a cheap 304
+    // until the knowledge base changes. Long selections go in a POST body:
+    // in the query string they would exceed request-line limits and end up
+    // in access logs.
+    const query = encodeURIComponent(claim);
+    const response = query.length <= MAX_GET_CLAIM_LENGTH
+      ? await fetch(`${API_BASE_URL}/api/v1/verify?claim=${query}`, {
+          method: 'GET',
+          cache: 'no-cache'
+        })
+      : await fetch(`${API_BASE_URL}/api/v1/verify`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ claim: claim })
+        });
 
     console.log('API response status:', response.status);
 
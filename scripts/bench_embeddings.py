@@ -0,0 +1,140 @@
+"""Benchmark embedding throughput and query latency of each embedding backend.
+
+For every backend it measures
+
+* bulk throughput – ``embed_documents`` over ``--documents`` chunk-sized texts
+  in batches of ``--bulk-batch`` (embeddings/s)
+* sequential query latency – ``embed_query`` one at a time (p50/p95)
+* concurrent query latency – ``--concurrency`` threads issuing queries at
+  once, which the local backend batches dynamically (p50/p95 and queries/s)
+
+Backends: ``openai`` (``OPENAI_EMBEDDING_MODEL``; point ``OPENAI_BASE_URL`` at
+``scripts/stub_services.py`` for a dry run) and ``local:torch``,
+``local:int8`` and ``local:onnx`` (``LOCAL_EMBEDDING_MODEL``).
+
+Usage:
+    python -m scripts.bench_embeddings
+    python -m scripts.bench_embeddings --backends local:int8 local:onnx --threads 4
+    python -m scripts.bench_embeddings --backends openai local:int8 --documents 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.embeddings import Embeddings
+
+from src.config import settings
+
+WORDS = (
+    "government announced economy report study health climate election court company "
+    "market researchers according percent million city police official data program "
+    "energy water policy school record international president minister scientists"
+).split()
+
+
+def synthetic_texts(count: int, words: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(WORDS, k=words)) for _ in range(count)]
+
+
+def make_embeddings(backend: str) -> Embeddings:
+    if backend == "openai":
+        from langchain_openai import OpenAIEmbeddings
+
+        return OpenAIEmbeddings(
+            model=settings.openai_embedding_model,
+            api_key=settings.openai_api_key,
+            base_url=settings.openai_base_url or None,
+            check_embedding_ctx_length=not settings.openai_base_url,
+        )
+    from src.rag.local_embeddings import LocalEmbeddings
+
+    settings.local_embedding_backend = backend.split(":", 1)[1]
+    embeddings = LocalEmbeddings()
+    embeddings.model  # load before timing
+    return embeddings
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def timed_query(embeddings: Embeddings, text: str) -> float:
+    started = time.perf_counter()
+    embeddings.embed_query(text)
+    return time.perf_counter() - started
+
+
+def bench(backend: str, args: argparse.Namespace) -> dict[str, float]:
+    embeddings = make_embeddings(backend)
+    documents = synthetic_texts(args.documents, 150)
+    queries = synthetic_texts(args.queries, 12, seed=1)
+    embeddings.embed_query(queries[0])  # warm up
+
+    started = time.perf_counter()
+    for start in range(0, len(documents), args.bulk_batch):
+        embeddings.embed_documents(documents[start : start + args.bulk_batch])
+    bulk = len(documents) / (time.perf_counter() - started)
+
+    sequential = [timed_query(embeddings, query) for query in queries]
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        started = time.perf_counter()
+        concurrent = list(pool.map(lambda q: timed_query(embeddings, q), queries))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "bulk_per_s": bulk,
+        "seq_p50_ms": percentile(sequential, 0.5) * 1000,
+        "seq_p95_ms": percentile(sequential, 0.95) * 1000,
+        "conc_p50_ms": percentile(concurrent, 0.5) * 1000,
+        "conc_p95_ms": percentile(concurrent, 0.95) * 1000,
+        "conc_qps": len(queries) / elapsed,
+        "mean_ms": statistics.fmean(sequential) * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends.")
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        default=["openai", "local:torch", "local:int8"],
+        help="openai, local:torch, local:int8, local:onnx",
+    )
+    parser.add_argument("--documents", type=int, default=1000, help="Texts for bulk throughput")
+    parser.add_argument("--bulk-batch", type=int, default=256, help="Texts per embed_documents")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per latency run")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent query threads")
+    parser.add_argument("--threads", type=int, default=settings.local_embedding_threads,
+                        help="LOCAL_EMBEDDING_THREADS (0 = library default)")
+    args = parser.parse_args()
+    settings.local_embedding_threads = args.threads
+
+    results = {}
+    for backend in args.backends:
+        try:
+            results[backend] = bench(backend, args)
+        except Exception as e:
+            print(f"{backend}: skipped ({type(e).__name__}: {e})")
+
+    print(
+        f"\n{'backend':<12} {'bulk emb/s':>10} {'seq p50':>8} {'seq p95':>8} "
+        f"{'conc p50':>9} {'conc p95':>9} {'conc q/s':>9}   (latencies in ms)"
+    )
+    for backend, r in results.items():
+        print(
+            f"{backend:<12} {r['bulk_per_s']:>10.1f} {r['seq_p50_ms']:>8.1f} "
+            f"{r['seq_p95_ms']:>8.1f} {r['conc_p50_ms']:>9.1f} {r['conc_p95_ms']:>9.1f} "
+            f"{r['conc_qps']:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Benchmark the hybrid retriever against the previous EnsembleRetriever setup.
+
+Builds synthetic corpora (Zipf-distributed vocabulary, ~150-word chunks) and
+compares index build time and per-query latency of:
+
+* ``ensemble`` – ``EnsembleRetriever`` over a vector retriever and
+  ``BM25Retriever`` (rank-bm25), legs run one after the other
+* ``hybrid``   – ``HybridRetriever`` with the precomputed sparse BM25 matrix,
+  concurrent legs and ID-based fusion
+
+The vector leg is a stub that sleeps ``--vector-latency`` ms (standing in for
+the query embedding round trip plus the HNSW search) so no API calls are made.
+rank-bm25 needs minutes and several GB at 1M chunks, so the baseline is
+skipped above ``--baseline-max`` chunks.
+
+Usage:
+    python -m scripts.bench_hybrid
+    python -m scripts.bench_hybrid --sizes 10000 100000 --queries 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+
+import numpy as np
+from langchain_classic.retrievers import EnsembleRetriever
+from langchain_community.retrievers import BM25Retriever
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from src.rag.hybrid import BM25Index, HybridRetriever
+
+
+class StubVectorStore:
+    """Returns ``k`` random chunks after a fixed delay."""
+
+    def __init__(self, documents: list[Document], latency: float, seed: int = 0) -> None:
+        self.documents = documents
+        self.latency = latency
+        self.random = random.Random(seed)
+
+    def similarity_search_with_score(self, query: str, k: int) -> list[tuple[Document, float]]:
+        time.sleep(self.latency)
+        picks = self.random.sample(range(len(self.documents)), k)
+        return [(self.documents[i], rank / k) for rank, i in enumerate(picks)]
+
+
+class StubVectorRetriever(BaseRetriever):
+    store: StubVectorStore
+    k: int
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        return [doc for doc, _ in self.store.similarity_search_with_score(query, self.k)]
+
+
+def make_corpus(size: int, vocab: int, words: int, seed: int = 0) -> list[Document]:
+    rng = np.random.default_rng(seed)
+    terms = np.array([f"w{rank}" for rank in range(vocab)], dtype=object)
+    documents = []
+    # In blocks: the token array of 1M chunks at once would not fit in memory
+    for start in range(0, size, 10_000):
+        rows = min(10_000, size - start)
+        ranks = np.minimum(rng.zipf(1.2, size=(rows, words)), vocab) - 1
+        documents.extend(
+            Document(page_content=" ".join(terms[row]), metadata={"source": "synthetic"}, id=str(i))
+            for i, row in enumerate(ranks, start=start)
+        )
+    return documents
+
+
+def make_queries(documents: list[Document], count: int, seed: int = 1) -> list[str]:
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        words = rng.choice(documents).page_content.split()
+        queries.append(" ".join(rng.sample(words, min(6, len(words)))))
+    return queries
+
+
+def time_queries(retriever: BaseRetriever, queries: list[str]) -> list[float]:
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        retriever.invoke(query)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def summarize(name: str, size: int, build: float, latencies: list[float]) -> str:
+    ordered = sorted(latencies)
+    p95 = ordered[int(0.95 * (len(ordered) - 1))]
+    return (
+        f"{name:<9} {size:>9,} {build:>9.2f}s {statistics.mean(latencies) * 1000:>9.1f}ms "
+        f"{statistics.median(latencies) * 1000:>9.1f}ms {p95 * 1000:>9.1f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark hybrid retrieval implementations.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=100, help="Queries per configuration")
+    parser.add_argument("--k", type=int, default=20, help="Candidates per leg")
+    parser.add_argument("--vocab", type=int, default=50_000, help="Vocabulary size")
+    parser.add_argument("--words", type=int, default=150, help="Words per chunk")
+    parser.add_argument("--vector-latency", type=float, default=20.0, help="Stub vector leg ms")
+    parser.add_argument(
+        "--baseline-max", type=int, default=100_000, help="Skip the rank-bm25 baseline above this"
+    )
+    args = parser.parse_args()
+    latency = args.vector_latency / 1000
+
+    print(f"{'retriever':<9} {'chunks':>9} {'build':>10} {'mean':>11} {'p50':>11} {'p95':>11}")
+    for size in args.sizes:
+        documents = make_corpus(size, args.vocab, args.words)
+        queries = make_queries(documents, args.queries)
+
+        if size <= args.baseline_max:
+            started = time.perf_counter()
+            bm25 = BM25Retriever.from_documents(documents, k=args.k)
+            build = time.perf_counter() - started
+            ensemble = EnsembleRetriever(
+                retrievers=[
+                    StubVectorRetriever(store=StubVectorStore(documents, latency), k=args.k),
+                    bm25,
+                ],
+                weights=[0.7, 0.3],
+            )
+            print(summarize("ensemble", size, build, time_queries(ensemble, queries)))
+            del bm25, ensemble
+        else:
+            print(f"{'ensemble':<9} {size:>9,}   skipped (above --baseline-max)")
+
+        started = time.perf_counter()
+        index = BM25Index.build(
+            [doc.page_content for doc in documents], [doc.id for doc in documents]
+        )
+        build = time.perf_counter() - started
+        hybrid = HybridRetriever(
+            vector_store=StubVectorStore(documents, latency),
+            bm25=index,
+            documents=documents,
+            k=args.k,
+        )
+        print(summarize("hybrid", size, build, time_queries(hybrid, queries)))
+
+
+if __name__ == "__main__":
+    main()
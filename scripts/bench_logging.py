@@ -0,0 +1,172 @@
+"""Benchmark the per-request cost of application logging.
+
+Replays the log lines of one ``/verify`` request (the same calls the agent
+nodes, the retriever and the evidence packer make) many times and reports the
+time spent in the logging calls on the request thread, plus the time until
+every line has been written.
+
+Configurations:
+
+* ``baseline``   – the previous setup: f-string messages, text format,
+  synchronous writes to stderr and ``logs/app.log``
+* ``json``       – JSON lines, lazy messages, still synchronous
+* ``json+queue`` – as ``json`` with ``LOG_ENQUEUE`` (background writer)
+* ``sampled``    – as ``json+queue`` keeping INFO lines of ``--sample-rate``
+  of requests
+* ``warning``    – ``LOG_LEVEL=WARNING``; lazy messages are never formatted
+
+stderr is redirected to a file in a temporary directory so the terminal does
+not distort the numbers.
+
+Usage:
+    python -m scripts.bench_logging
+    python -m scripts.bench_logging --requests 20000 --sample-rate 0.05
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from loguru import logger
+
+from src.config import settings
+from src.logger import request_context, setup_logger
+
+CLAIM = "The Eiffel Tower was completed in 1889 for the World's Fair in Paris. " * 2
+
+
+def request_eager(claim: str) -> None:
+    """The log lines of one request, formatted eagerly (as before)."""
+    logger.info(f"Received claim: {claim[:100]}...")
+    logger.info(f"Retrieving context for claim: {claim[:100]}")
+    logger.debug(f"Retrieved {20} result(s) with scores for query: {claim[:80]}...")
+    logger.info(f"Re-ranker returned {5} document(s) for query: {claim[:100]}")
+    logger.info(f"Retrieved {5} document(s) from vector store")
+    logger.info("Evaluating claim against RAG store evidence")
+    logger.info(
+        f"Packed {5} evidence item(s) into {4} ({1} merged, {0} duplicate(s)): "
+        f"{900} → {700} tokens"
+    )
+    logger.info(
+        f"RAG evaluation → evidence_found={False}, confidence={0.42:.2f}, "
+        f"claim_verdict={True}"
+    )
+    logger.info(f"Insufficient RAG evidence (evidence_found={False}, confidence={0.42:.2f})")
+    logger.info(f"Performing web search for claim: {claim[:100]}")
+    logger.info("Evaluating claim against web search results")
+    logger.info(
+        f"Web evaluation → evidence_found={True}, confidence={0.91:.2f}, "
+        f"claim_verdict={True}"
+    )
+    logger.info("Syncing web search results to RAG store")
+    logger.info(
+        f"Final output → evidence_source={'WEB'}, claim_verdict={True}, "
+        f"source_urls={3} URLs"
+    )
+
+
+def request_lazy(claim: str) -> None:
+    """The same lines with arguments passed separately."""
+    logger.info("Received claim: {}...", claim[:100])
+    logger.info("Retrieving context for claim: {}", claim[:100])
+    logger.debug("Retrieved {} result(s) with scores for query: {}...", 20, claim[:80])
+    logger.info("Re-ranker returned {} document(s) for query: {}", 5, claim[:100])
+    logger.info("Retrieved {} document(s) from vector store", 5)
+    logger.info("Evaluating claim against RAG store evidence")
+    logger.info(
+        "Packed {} evidence item(s) into {} ({} merged, {} duplicate(s)): {} → {} tokens",
+        5, 4, 1, 0, 900, 700,
+    )
+    logger.info(
+        "RAG evaluation → evidence_found={}, confidence={:.2f}, claim_verdict={}",
+        False, 0.42, True,
+    )
+    logger.info("Insufficient RAG evidence (evidence_found={}, confidence={:.2f})", False, 0.42)
+    logger.info("Performing web search for claim: {}", claim[:100])
+    logger.info("Evaluating claim against web search results")
+    logger.info(
+        "Web evaluation → evidence_found={}, confidence={:.2f}, claim_verdict={}",
+        True, 0.91, True,
+    )
+    logger.info("Syncing web search results to RAG store")
+    logger.info(
+        "Final output → evidence_source={}, claim_verdict={}, source_urls={} URLs",
+        "WEB", True, 3,
+    )
+
+
+CONFIGS = {
+    # name: (log call style, LOG_FORMAT, LOG_ENQUEUE, sample rate, LOG_LEVEL)
+    "baseline": (request_eager, "text", False, 1.0, "INFO"),
+    "json": (request_lazy, "json", False, 1.0, "INFO"),
+    "json+queue": (request_lazy, "json", True, 1.0, "INFO"),
+    "sampled": (request_lazy, "json", True, None, "INFO"),
+    "warning": (request_lazy, "json", True, 1.0, "WARNING"),
+}
+
+
+def run(name: str, requests: int, sample_rate: float, workdir: Path) -> dict[str, float]:
+    emit, fmt, enqueue, rate, level = CONFIGS[name]
+    settings.log_format = fmt
+    settings.log_enqueue = enqueue
+    settings.log_sample_rate = sample_rate if rate is None else rate
+    settings.log_level = level
+    settings.log_file = str(workdir / f"{name}.log")
+
+    stderr = sys.stderr
+    with open(workdir / f"{name}.stderr", "w") as sys.stderr:
+        setup_logger()
+        per_request = []
+        started = time.perf_counter()
+        for i in range(requests):
+            with request_context(f"{i:016x}"):
+                t0 = time.perf_counter()
+                emit(CLAIM)
+                per_request.append(time.perf_counter() - t0)
+        caller = time.perf_counter() - started
+        logger.remove()  # waits for enqueued lines to be written
+        total = time.perf_counter() - started
+    sys.stderr = stderr
+
+    per_request.sort()
+    return {
+        "mean_us": statistics.fmean(per_request) * 1e6,
+        "p99_us": per_request[int(len(per_request) * 0.99)] * 1e6,
+        "caller_s": caller,
+        "drained_s": total,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark per-request logging overhead.")
+    parser.add_argument("--requests", type=int, default=5000, help="Simulated requests per run")
+    parser.add_argument(
+        "--sample-rate", type=float, default=0.1, help="LOG_SAMPLE_RATE of the 'sampled' run"
+    )
+    parser.add_argument("--configs", nargs="+", choices=list(CONFIGS), default=list(CONFIGS))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {
+            name: run(name, args.requests, args.sample_rate, Path(tmp)) for name in args.configs
+        }
+
+    print(f"\n{args.requests} requests × 14 log calls")
+    print(
+        f"{'config':<12} {'mean µs/req':>12} {'p99 µs/req':>12} "
+        f"{'caller s':>10} {'drained s':>10}"
+    )
+    for name, r in results.items():
+        print(
+            f"{name:<12} {r['mean_us']:>12.1f} {r['p99_us']:>12.1f} "
+            f"{r['caller_s']:>10.2f} {r['drained_s']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Measure how well the model cascade agrees with the large model on a labeled set.
+
+Every claim is evaluated by both tiers on the same prompt the agent builds.
+The cascade decision (small model unless ``escalation_reason`` fires) is then
+compared with the large model and, when the set carries labels, with the
+ground truth.  Reports agreement, accuracy, escalation rate and mean latency
+per tier so cascade bands can be tuned before enabling them in production.
+
+Input is JSONL with one object per line::
+
+    {"claim": "...", "label": true, "evidence": "optional evidence text"}
+
+Without ``evidence`` the claim's evidence is retrieved from the knowledge
+base, exactly as ``retrieve_node`` does.
+
+Usage:
+    python -m scripts.cascade_agreement labeled.jsonl --small gpt-4o-mini
+    python -m scripts.cascade_agreement labeled.jsonl --band-low 0.3 --band-high 0.9
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from pathlib import Path
+
+from src.agents.cascade import escalation_reason, get_evaluator
+from src.agents.rag_agent import build_evaluation_messages
+from src.config import settings
+from src.rag.evidence import format_rag_item, items_from_documents, pack_evidence
+
+
+def load_labeled(path: Path, limit: int | None) -> list[dict]:
+    records = []
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                records.append(json.loads(line))
+            if limit and len(records) >= limit:
+                break
+    return records
+
+
+def build_prompt(record: dict) -> tuple[list, float | None]:
+    """Return the evaluation messages and retrieval signal for one record."""
+    if "evidence" in record:
+        text = record["evidence"]
+        return build_evaluation_messages(record["claim"], "Evidence", text), None
+
+    from src.rag.retriever import get_context_after_re_ranker
+
+    documents = get_context_after_re_ranker(record["claim"])
+    text = pack_evidence(items_from_documents(documents), format_rag_item).text
+    scores = [
+        doc.metadata["relevance_score"]
+        for doc in documents
+        if "relevance_score" in doc.metadata
+    ]
+    messages = build_evaluation_messages(
+        record["claim"], "Retrieved evidence from knowledge base", text
+    )
+    return messages, max(scores) if scores else None
+
+
+async def timed(model: str, messages: list) -> tuple[object, float]:
+    started = time.perf_counter()
+    evaluation = await asyncio.to_thread(get_evaluator(model).invoke, messages)
+    return evaluation, time.perf_counter() - started
+
+
+async def evaluate(record: dict, small: str, large: str, semaphore: asyncio.Semaphore) -> dict:
+    async with semaphore:
+        messages, retrieval_score = await asyncio.to_thread(build_prompt, record)
+        (small_eval, small_s), (large_eval, large_s) = await asyncio.gather(
+            timed(small, messages), timed(large, messages)
+        )
+    reason = escalation_reason(small_eval, retrieval_score)
+    cascade_eval = small_eval if reason is None else large_eval
+    return {
+        "claim": record["claim"],
+        "label": record.get("label"),
+        "retrieval_score": retrieval_score,
+        "small": small_eval.claim_verdict,
+        "small_confidence": small_eval.confidence,
+        "large": large_eval.claim_verdict,
+        "cascade": cascade_eval.claim_verdict,
+        "escalation": reason,
+        "small_latency": small_s,
+        "large_latency": large_s,
+    }
+
+
+def report(rows: list[dict]) -> None:
+    n = len(rows)
+    escalated = sum(row["escalation"] is not None for row in rows)
+    small_latency = statistics.mean(row["small_latency"] for row in rows)
+    large_latency = statistics.mean(row["large_latency"] for row in rows)
+    # Escalated claims pay for both calls in sequence
+    cascade_latency = small_latency + large_latency * escalated / n
+
+    print(f"claims:                      {n}")
+    print(f"escalation rate:             {escalated / n:.1%}")
+    for reason in sorted({row["escalation"] for row in rows} - {None}):
+        count = sum(row["escalation"] == reason for row in rows)
+        print(f"  {reason:<26} {count / n:.1%}")
+    print(f"small  vs large agreement:   {sum(r['small'] == r['large'] for r in rows) / n:.1%}")
+    print(f"cascade vs large agreement:  {sum(r['cascade'] == r['large'] for r in rows) / n:.1%}")
+
+    labeled = [row for row in rows if row["label"] is not None]
+    if labeled:
+        for tier in ("small", "large", "cascade"):
+            accuracy = sum(bool(r[tier]) == bool(r["label"]) for r in labeled) / len(labeled)
+            print(f"{tier:<7} accuracy:            {accuracy:.1%}  (n={len(labeled)})")
+
+    print(f"mean latency small/large:    {small_latency:.2f}s / {large_latency:.2f}s")
+    print(f"est. mean cascade latency:   {cascade_latency:.2f}s")
+
+
+async def run(args: argparse.Namespace) -> None:
+    records = load_labeled(args.labeled, args.limit)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    rows = await asyncio.gather(
+        *(evaluate(record, args.small, args.large, semaphore) for record in records)
+    )
+    if args.output:
+        with args.output.open("w", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row) + "\n")
+    report(rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure cascade agreement on a labeled set.")
+    parser.add_argument("labeled", type=Path, help="JSONL with claim, label and optional evidence")
+    parser.add_argument("--small", default=settings.cascade_small_model or "gpt-4o-mini")
+    parser.add_argument("--large", default=settings.openai_model)
+    parser.add_argument("--band-low", type=float, default=settings.cascade_band_low)
+    parser.add_argument("--band-high", type=float, default=settings.cascade_band_high)
+    parser.add_argument("--concurrency", type=int, default=4, help="Claims evaluated at once")
+    parser.add_argument("--limit", type=int, default=None, help="Only the first N claims")
+    parser.add_argument("--output", type=Path, default=None, help="Per-claim results (JSONL)")
+    args = parser.parse_args()
+
+    settings.cascade_band_low = args.band_low
+    settings.cascade_band_high = args.band_high
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
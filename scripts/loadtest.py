@@ -0,0 +1,351 @@
+"""End-to-end HTTP load test for ``/api/v1/verify``.
+
+By default the harness starts the stub OpenAI/Tavily services
+(``scripts.stub_services``) and the API server pointed at them – with a
+throw-away vector store and job database – seeds the knowledge base through
+``/api/v1/ingest`` and then drives traffic.  ``--target`` load tests an
+already running server instead.
+
+Traffic modes:
+
+* ``closed`` – ``--concurrency`` clients each send the next request as soon
+  as the previous one finished
+* ``open``   – Poisson arrivals at ``--rate`` requests/s, regardless of how
+  many are still in flight (exposes queueing and load shedding)
+* ``--replay`` – re-sends a captured JSONL file (see ``TRAFFIC_CAPTURE_PATH``)
+  with its original inter-arrival times, scaled by ``--speed``
+
+Claims are drawn from ``--unique-claims`` distinct claims with Zipf
+popularity, so repeated and concurrent identical claims occur as in
+production.  Reports throughput, status codes and p50/p95/p99 latency per
+route (RAG Store vs WEB).
+
+Usage:
+    python -m scripts.loadtest --mode closed --concurrency 16 --duration 60
+    python -m scripts.loadtest --mode open --rate 20 --duration 120 --error-rate 0.02
+    python -m scripts.loadtest --replay capture.jsonl --speed 4
+    python -m scripts.loadtest --target http://localhost:8000 --mode open --rate 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import httpx
+
+from scripts.stub_services import add_stub_arguments
+
+SUBJECTS = [
+    "Google", "The Eiffel Tower", "Python", "The Amazon river", "Mount Everest",
+    "The Moon landing", "Bitcoin", "The Great Wall", "Penicillin", "The Titanic",
+]
+PREDICATES = [
+    "was founded in {year}", "was completed in {year}", "was first described in {year}",
+    "became widely known in {year}", "is older than {year}",
+]
+
+
+@dataclass
+class Result:
+    started: float
+    latency: float
+    status: int
+    route: str  # evidence_source, or the error class
+
+
+@dataclass
+class Stats:
+    results: list[Result] = field(default_factory=list)
+    dropped: int = 0  # open-loop arrivals skipped because --max-inflight was reached
+
+
+# ---------------------------------------------------------------------------
+# Workload
+# ---------------------------------------------------------------------------
+
+
+def make_claims(count: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    claims = []
+    for i in range(count):
+        predicate = rng.choice(PREDICATES).format(year=rng.randint(1850, 2024))
+        claims.append(f"{SUBJECTS[i % len(SUBJECTS)]} {predicate} (#{i}).")
+    return claims
+
+
+class ClaimMix:
+    """Draws claims with Zipf-distributed popularity (rank 1 is the most repeated)."""
+
+    def __init__(self, claims: list[str], exponent: float, seed: int = 1) -> None:
+        self.claims = claims
+        self.weights = [1 / (rank**exponent) for rank in range(1, len(claims) + 1)]
+        self.random = random.Random(seed)
+
+    def next(self) -> str:
+        return self.random.choices(self.claims, weights=self.weights)[0]
+
+
+def read_capture(path: Path) -> list[tuple[float, dict]]:
+    """Return ``(offset_seconds, request_body)`` pairs of a captured JSONL file."""
+    records = []
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                records.append(json.loads(line))
+    if not records:
+        return []
+    first = min(record.get("ts", 0.0) for record in records)
+    return sorted(
+        (
+            record.get("ts", first) - first,
+            {key: value for key, value in record.items() if key not in ("ts", "client")},
+        )
+        for record in records
+    )
+
+
+# ---------------------------------------------------------------------------
+# Drivers
+# ---------------------------------------------------------------------------
+
+
+async def send(client: httpx.AsyncClient, body: dict, stats: Stats) -> None:
+    started = time.perf_counter()
+    try:
+        response = await client.post("/api/v1/verify", json=body)
+        status = response.status_code
+        route = response.json().get("evidence_source", "?") if status == 200 else f"HTTP {status}"
+    except httpx.HTTPError as e:
+        status, route = 0, type(e).__name__
+    stats.results.append(Result(started, time.perf_counter() - started, status, route))
+
+
+async def closed_loop(client, mix: ClaimMix, concurrency: int, duration: float, stats: Stats):
+    deadline = time.perf_counter() + duration
+
+    async def worker() -> None:
+        while time.perf_counter() < deadline:
+            await send(client, {"claim": mix.next()}, stats)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def open_loop(
+    client, arrivals: Iterator[tuple[float, dict]], max_inflight: int, stats: Stats
+) -> None:
+    """Send each ``(offset, body)`` at its offset, never waiting for responses."""
+    start = time.perf_counter()
+    inflight: set[asyncio.Task] = set()
+    for offset, body in arrivals:
+        await asyncio.sleep(max(0.0, start + offset - time.perf_counter()))
+        if len(inflight) >= max_inflight:
+            stats.dropped += 1
+            continue
+        task = asyncio.create_task(send(client, body, stats))
+        inflight.add(task)
+        task.add_done_callback(inflight.discard)
+    await asyncio.gather(*inflight)
+
+
+def poisson_arrivals(mix: ClaimMix, rate: float, duration: float) -> Iterator[tuple[float, dict]]:
+    offset = 0.0
+    rng = random.Random(2)
+    while True:
+        offset += rng.expovariate(rate)
+        if offset >= duration:
+            return
+        yield offset, {"claim": mix.next()}
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))]
+
+
+def report(stats: Stats, elapsed: float) -> None:
+    results = stats.results
+    ok = [r for r in results if r.status == 200]
+    statuses: dict[int, int] = {}
+    for r in results:
+        statuses[r.status] = statuses.get(r.status, 0) + 1
+
+    print(
+        f"\nrequests: {len(results)} in {elapsed:.1f}s  "
+        f"throughput: {len(ok) / elapsed:.2f} ok/s ({len(results) / elapsed:.2f} req/s)"
+    )
+    codes = ", ".join(f"{code or 'conn-error'}={n}" for code, n in sorted(statuses.items()))
+    print(f"status:   {codes}")
+    if stats.dropped:
+        print(f"dropped:  {stats.dropped} arrivals (client --max-inflight reached)")
+
+    print(f"\n{'route':<14} {'count':>7} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    by_route = {
+        route: [r.latency for r in results if r.route == route]
+        for route in sorted({r.route for r in results})
+    }
+    by_route["all ok"] = [r.latency for r in ok]
+    for route, latencies in by_route.items():
+        if not latencies:
+            continue
+        print(
+            f"{route:<14} {len(latencies):>7} {statistics.mean(latencies) * 1000:>7.0f}ms "
+            + " ".join(f"{percentile(latencies, q) * 1000:>7.0f}ms" for q in (0.5, 0.95, 0.99))
+        )
+
+
+# ---------------------------------------------------------------------------
+# Local stack
+# ---------------------------------------------------------------------------
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(url: str, process: subprocess.Popen, timeout: float = 120.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode}")
+        try:
+            if httpx.get(url, timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{url} not ready after {timeout:.0f}s")
+
+
+@contextmanager
+def local_stack(args: argparse.Namespace) -> Iterator[str]:
+    """Start stub services + API server; yield the API base URL."""
+    stub_port, api_port = free_port(), free_port()
+    stub_args = [
+        "--port", str(stub_port),
+        "--openai-latency", str(args.openai_latency),
+        "--embedding-latency", str(args.embedding_latency),
+        "--tavily-latency", str(args.tavily_latency),
+        "--latency-sigma", str(args.latency_sigma),
+        "--error-rate", str(args.error_rate),
+        "--error-status", str(args.error_status),
+        "--rag-hit-rate", str(args.rag_hit_rate),
+        "--embedding-dim", str(args.embedding_dim),
+    ]
+    workdir = Path(tempfile.mkdtemp(prefix="loadtest-"))
+    env = {
+        **os.environ,
+        "OPENAI_API_KEY": "stub",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{stub_port}/v1",
+        "TAVILY_API_KEY": "stub",
+        "TAVILY_BASE_URL": f"http://127.0.0.1:{stub_port}",
+        "CHROMA_PERSIST_DIR": str(workdir / "chroma"),
+        "JOB_STORE_PATH": str(workdir / "jobs.db"),
+        "API_HOST": "127.0.0.1",
+        "API_PORT": str(api_port),
+        "API_RELOAD": "false",
+        "API_WORKERS": str(args.workers),
+        "LOG_LEVEL": "WARNING",
+    }
+    processes = []
+    try:
+        stub = subprocess.Popen([sys.executable, "-m", "scripts.stub_services", *stub_args])
+        processes.append(stub)
+        wait_ready(f"http://127.0.0.1:{stub_port}/health", stub)
+        api = subprocess.Popen([sys.executable, "-m", "src.main"], env=env)
+        processes.append(api)
+        wait_ready(f"http://127.0.0.1:{api_port}/api/v1/health", api)
+        print(f"Stubs on :{stub_port}, API on :{api_port}, state in {workdir}", file=sys.stderr)
+        yield f"http://127.0.0.1:{api_port}"
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+async def run(args: argparse.Namespace, base_url: str) -> None:
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        if args.ingest and not args.target:
+            response = await client.post("/api/v1/ingest")
+            print(f"Ingest: HTTP {response.status_code}", file=sys.stderr)
+
+        stats = Stats()
+        started = time.perf_counter()
+        if args.replay:
+            arrivals = ((offset / args.speed, body) for offset, body in read_capture(args.replay))
+            await open_loop(client, arrivals, args.max_inflight, stats)
+        else:
+            if args.claims:
+                claims = [line.strip() for line in args.claims.open() if line.strip()]
+            else:
+                claims = make_claims(args.unique_claims)
+            mix = ClaimMix(claims, args.zipf)
+            if args.mode == "closed":
+                await closed_loop(client, mix, args.concurrency, args.duration, stats)
+            else:
+                arrivals = poisson_arrivals(mix, args.rate, args.duration)
+                await open_loop(client, arrivals, args.max_inflight, stats)
+        report(stats, time.perf_counter() - started)
+
+        if args.output:
+            with args.output.open("w", encoding="utf-8") as f:
+                for r in stats.results:
+                    f.write(json.dumps(r.__dict__) + "\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test /api/v1/verify.")
+    parser.add_argument("--target", default=None, help="Existing server URL (skips local stack)")
+    parser.add_argument("--mode", choices=["closed", "open"], default="closed")
+    parser.add_argument("--concurrency", type=int, default=8, help="Closed-loop clients")
+    parser.add_argument("--rate", type=float, default=5.0, help="Open-loop requests per second")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds of traffic")
+    parser.add_argument("--max-inflight", type=int, default=1000, help="Open-loop client cap")
+    parser.add_argument("--unique-claims", type=int, default=200, help="Distinct claims")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Claim popularity skew")
+    parser.add_argument("--claims", type=Path, default=None, help="Claims file, one per line")
+    parser.add_argument("--replay", type=Path, default=None, help="Captured JSONL to replay")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed-up factor")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout (s)")
+    parser.add_argument("--workers", type=int, default=1, help="API worker processes")
+    parser.add_argument(
+        "--no-ingest", dest="ingest", action="store_false",
+        help="Do not seed the local stack's knowledge base via /ingest first",
+    )
+    parser.add_argument("--output", type=Path, default=None, help="Per-request results (JSONL)")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    if args.target:
+        asyncio.run(run(args, args.target.rstrip("/")))
+        return
+    with local_stack(args) as base_url:
+        asyncio.run(run(args, base_url))
+
+
+if __name__ == "__main__":
+    main()
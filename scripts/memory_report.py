@@ -0,0 +1,97 @@
+"""Report what the in-process indexes, models and caches hold in memory.
+
+Without ``--url`` the script loads the indexes itself (every shard's BM25
+index, document list and Chroma collection, plus FlashRank with
+``--rerank``) and reports this process.  With ``--url`` it asks a running
+server's worker instead (each worker reports itself; repeat to sample others).
+
+``--trace`` records tracemalloc snapshots around loading and prints the
+allocation sites that grew the most.
+
+Usage:
+    python -m scripts.memory_report
+    python -m scripts.memory_report --rerank --trace
+    python -m scripts.memory_report --url http://localhost:8000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+
+import httpx
+
+from src import memory
+
+MB = 1024 * 1024
+
+
+def local_report(rerank: bool, trace: bool, top: int) -> tuple[dict, dict | None]:
+    from src.rag.retriever import warm_shards
+
+    if trace:
+        memory.start_tracing()
+        memory.take_snapshot("before")
+    warm_shards()
+    if rerank:
+        from src.rag.re_ranker import get_re_ranker
+
+        get_re_ranker()
+    diff = memory.compare_snapshots("before", top=top) if trace else None
+    return memory.memory_report(), diff
+
+
+def print_report(report: dict) -> None:
+    limit = report["limit_bytes"]
+    print(
+        f"pid {report['pid']}: rss {report['rss_bytes'] / MB:.1f} MB, "
+        f"pss {report['pss_bytes'] / MB:.1f} MB, "
+        + (f"limit {limit / MB:.0f} MB" if limit else "no memory limit")
+    )
+    print(f"\n{'component':<28} {'MB':>10}  detail")
+    for component in report["components"]:
+        approx = "~" if component["estimate"] else " "
+        print(
+            f"{component['name']:<28} {approx}{component['bytes'] / MB:>9.2f}  "
+            f"{json.dumps(component['detail'])}"
+        )
+    print(
+        f"{'accounted':<28} {report['accounted_bytes'] / MB:>10.2f}\n"
+        f"{'unaccounted (rss - above)':<28} {report['unaccounted_bytes'] / MB:>10.2f}"
+    )
+    for warning in report["warnings"]:
+        print(f"WARNING: {warning}")
+
+
+def print_diff(diff: dict) -> None:
+    print(f"\nTop allocation growth {diff['base']} → {diff['target']}:")
+    for stat in diff["top"]:
+        print(
+            f"{stat['size_diff_bytes'] / MB:>+9.2f} MB {stat['count_diff']:>+9} blocks  "
+            f"{stat['location']}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Report per-component memory usage.")
+    parser.add_argument("--url", help="Ask a running server (e.g. http://localhost:8000)")
+    parser.add_argument("--rerank", action="store_true", help="Also load the FlashRank model")
+    parser.add_argument("--trace", action="store_true", help="Diff tracemalloc around loading")
+    parser.add_argument("--top", type=int, default=15, help="Allocation sites to show")
+    args = parser.parse_args()
+
+    diff = None
+    if args.url:
+        response = httpx.get(f"{args.url.rstrip('/')}/api/v1/admin/memory", timeout=120)
+        response.raise_for_status()
+        report = response.json()
+    else:
+        report, diff = local_report(args.rerank, args.trace, args.top)
+
+    print_report(report)
+    if diff:
+        print_diff(diff)
+
+
+if __name__ == "__main__":
+    main()
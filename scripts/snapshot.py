@@ -0,0 +1,48 @@
+"""Export, import and verify portable knowledge-base snapshots.
+
+Usage:
+    python -m scripts.snapshot export snapshots/kb-2024-06-01
+    python -m scripts.snapshot verify snapshots/kb-2024-06-01
+    python -m scripts.snapshot import snapshots/kb-2024-06-01
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+
+from src.rag.snapshot import SnapshotError, export_snapshot, import_snapshot, verify_snapshot
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage knowledge-base snapshots.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("export", help="Write a snapshot of the local store").add_argument("path")
+    commands.add_parser("verify", help="Check a snapshot's checksums").add_argument("path")
+    import_parser = commands.add_parser("import", help="Replace the local store with a snapshot")
+    import_parser.add_argument("path")
+    import_parser.add_argument(
+        "--no-verify", action="store_true", help="Skip checksum verification before importing"
+    )
+    args = parser.parse_args()
+
+    try:
+        if args.command == "export":
+            manifest = export_snapshot(args.path)
+        elif args.command == "verify":
+            manifest = verify_snapshot(args.path)
+        else:
+            manifest = import_snapshot(args.path, verify=not args.no_verify)
+    except SnapshotError as e:
+        print(f"Snapshot error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    chunks = sum(shard["count"] for shard in manifest["shards"].values())
+    print(
+        f"{args.command}: generation {manifest['generation']}, "
+        f"{len(manifest['shards'])} shard(s), {chunks} chunks, checksum {manifest['checksum'][:12]}"
+    )
+
+
+if __name__ == "__main__":
+    main()
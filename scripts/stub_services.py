@@ -0,0 +1,240 @@
+"""Local stand-ins for the OpenAI and Tavily APIs, for load testing.
+
+Serves just enough of both APIs for the agent graph:
+
+* ``POST /v1/chat/completions`` – a ``ClaimEvaluation`` JSON answer (as
+  structured-output content, or as a tool call when tools are sent)
+* ``POST /v1/embeddings``       – deterministic unit vectors
+* ``POST /search``              – Tavily-style web results
+
+Each call sleeps for a log-normally distributed latency and fails with a
+configurable probability, so the app can be load tested without spending
+API quota.  The RAG evaluation answers "sufficient evidence" for a stable,
+configurable share of claims; the others fall through to web search.
+
+Point the app at it with ``OPENAI_BASE_URL=http://host:port/v1`` and
+``TAVILY_BASE_URL=http://host:port``.
+
+Usage:
+    python -m scripts.stub_services --port 9100
+    python -m scripts.stub_services --openai-latency 800 --error-rate 0.01 --rag-hit-rate 0.7
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+@dataclass
+class StubConfig:
+    openai_latency: float = 400.0  # Median chat completion latency (ms)
+    embedding_latency: float = 50.0  # Median embedding latency (ms)
+    tavily_latency: float = 1200.0  # Median web search latency (ms)
+    latency_sigma: float = 0.5  # Log-normal shape; 0 = constant latency
+    error_rate: float = 0.0  # Probability of an error response
+    error_status: int = 500  # Status of error responses (e.g. 429 to exercise retries)
+    rag_hit_rate: float = 0.6  # Share of claims the RAG evaluation answers confidently
+    embedding_dim: int = 1536
+
+
+def _stable_fraction(text: str) -> float:
+    """Deterministic value in [0, 1) for ``text``, stable across processes."""
+    return int(hashlib.sha256(text.encode()).hexdigest()[:8], 16) / 0x100000000
+
+
+def _extract_claim(content: str) -> str:
+    marker = "Claim to verify:\n"
+    if marker not in content:
+        return content
+    return content.split(marker, 1)[1].split("\n\n", 1)[0]
+
+
+def create_stub_app(config: StubConfig) -> FastAPI:
+    app = FastAPI(title="OpenAI/Tavily stubs")
+
+    async def delay_or_fail(median_ms: float) -> JSONResponse | None:
+        if median_ms > 0:
+            seconds = random.lognormvariate(math.log(median_ms), config.latency_sigma) / 1000
+            await asyncio.sleep(seconds)
+        if random.random() < config.error_rate:
+            return JSONResponse(
+                {"error": {"message": "stub error", "type": "server_error"}},
+                status_code=config.error_status,
+            )
+        return None
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        if error := await delay_or_fail(config.openai_latency):
+            return error
+
+        content = next(
+            (m["content"] for m in reversed(body["messages"]) if m["role"] == "user"), ""
+        )
+        if isinstance(content, list):  # content parts
+            content = " ".join(part.get("text", "") for part in content)
+        claim = _extract_claim(content)
+        from_rag = "Retrieved evidence from knowledge base" in content
+        confident = not from_rag or _stable_fraction(claim) < config.rag_hit_rate
+        evaluation = json.dumps(
+            {
+                "evidence_found": confident,
+                "confidence": 0.9 if confident else 0.3,
+                "verification_data": f"Stub evaluation of: {claim[:200]}",
+                "claim_verdict": _stable_fraction(claim[::-1]) < 0.5,
+            }
+        )
+
+        message: dict = {"role": "assistant", "content": evaluation, "refusal": None}
+        finish_reason = "stop"
+        if body.get("tools"):
+            name = body["tools"][0]["function"]["name"]
+            message = {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {
+                        "id": "call_stub",
+                        "type": "function",
+                        "function": {"name": name, "arguments": evaluation},
+                    }
+                ],
+            }
+            finish_reason = "tool_calls"
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [
+                {"index": 0, "message": message, "finish_reason": finish_reason, "logprobs": None}
+            ],
+            "usage": {
+                "prompt_tokens": len(content) // 4,
+                "completion_tokens": 60,
+                "total_tokens": len(content) // 4 + 60,
+            },
+        }
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        if error := await delay_or_fail(config.embedding_latency):
+            return error
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        data = []
+        for index, text in enumerate(inputs):
+            seed = int(hashlib.sha256(json.dumps(text).encode()).hexdigest()[:8], 16)
+            vector = np.random.default_rng(seed).standard_normal(config.embedding_dim)
+            vector /= np.linalg.norm(vector)
+            data.append({"object": "embedding", "index": index, "embedding": vector.tolist()})
+        return {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "stub"),
+            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        }
+
+    @app.post("/search")
+    async def search(request: Request):
+        body = await request.json()
+        started = time.perf_counter()
+        if error := await delay_or_fail(config.tavily_latency):
+            return error
+        query = body.get("query", "")
+        digest = hashlib.sha256(query.encode()).hexdigest()[:10]
+        results = [
+            {
+                "title": f"Stub result {i + 1} for {query[:60]}",
+                "url": f"https://stub-news-{i}.example.com/{digest}",
+                "content": f"{query} " + "Background reporting on the subject. " * 20,
+                "score": round(0.9 - 0.1 * i, 2),
+                "published_date": "2024-01-15",
+            }
+            for i in range(min(int(body.get("max_results", 5)), 5))
+        ]
+        return {
+            "query": query,
+            "results": results,
+            "response_time": round(time.perf_counter() - started, 3),
+        }
+
+    return app
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    """Register the ``StubConfig`` options on ``parser`` (shared with the load tester)."""
+    defaults = StubConfig()
+    parser.add_argument(
+        "--openai-latency", type=float, default=defaults.openai_latency, help="Median chat ms"
+    )
+    parser.add_argument(
+        "--embedding-latency", type=float, default=defaults.embedding_latency,
+        help="Median embedding ms",
+    )
+    parser.add_argument(
+        "--tavily-latency", type=float, default=defaults.tavily_latency, help="Median search ms"
+    )
+    parser.add_argument(
+        "--latency-sigma", type=float, default=defaults.latency_sigma,
+        help="Log-normal latency spread (0 = constant)",
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=defaults.error_rate, help="Error probability per call"
+    )
+    parser.add_argument(
+        "--error-status", type=int, default=defaults.error_status, help="Status of error responses"
+    )
+    parser.add_argument(
+        "--rag-hit-rate", type=float, default=defaults.rag_hit_rate,
+        help="Share of claims answered from the RAG store",
+    )
+    parser.add_argument("--embedding-dim", type=int, default=defaults.embedding_dim)
+
+
+def config_from_args(args: argparse.Namespace) -> StubConfig:
+    return StubConfig(
+        openai_latency=args.openai_latency,
+        embedding_latency=args.embedding_latency,
+        tavily_latency=args.tavily_latency,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        rag_hit_rate=args.rag_hit_rate,
+        embedding_dim=args.embedding_dim,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run stub OpenAI and Tavily services.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(
+        create_stub_app(config_from_args(args)),
+        host=args.host,
+        port=args.port,
+        log_level="warning",
+    )
+
+
+if __name__ == "__main__":
+    main()
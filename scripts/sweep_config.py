@@ -0,0 +1,341 @@
+"""Sweep RAG parameters: index size, per-stage latency, web-fallback rate and accuracy.
+
+For every ``chunk_size`` × ``chunk_overlap`` combination the corpus is split
+and indexed again – embeddings in an in-memory Chroma collection and a BM25
+index, with the app's own splitter, fusion and re-ranker.  Every labeled
+claim then goes through retrieval, re-ranking, evidence packing and the RAG
+evaluation for every ``retriever_top_k`` × ``retriever_top_n`` × vector
+weight combination (the BM25 weight is ``1 - vector weight``) and is routed
+with every confidence threshold.  The web fallback itself is not run; how
+often it would be is reported as the fallback rate.
+
+Evaluation answers come from
+
+* ``--llm stub`` (default) – no model calls: ``confidence`` is the best
+  re-ranker score of the evidence, evidence counts as found from
+  ``--stub-evidence`` on, and a claim is judged true iff evidence was found.
+  Accuracy then only says whether retrieval surfaces evidence for true
+  claims and not for false ones.
+* ``--llm record`` – the configured model (cascade included).  Answers are
+  appended to ``--recordings``, keyed by the prompt, and reused when the same
+  prompt comes up again.
+* ``--llm replay`` – recorded answers only.  Prompts never recorded fall back
+  to the stub and are counted as ``misses``.
+
+Input is JSONL with one object per line::
+
+    {"claim": "...", "label": true}
+
+Prints one row per configuration: chunks and index size, mean milliseconds
+per query stage, evidence tokens in the prompt, fallback rate and accuracy
+of the claims answered without the web.  Rows on the Pareto front (no other
+row is at least as good on index size, query latency, fallback rate and
+accuracy, and better on one) are marked ``*``.  Queries are embedded once and
+shared by all configurations; near-duplicate filtering is off.
+
+Usage:
+    python -m scripts.sweep_config claims.jsonl --corpus data
+    python -m scripts.sweep_config claims.jsonl --chunk-size 500 1000 --top-k 10 20 \\
+        --threshold 0.6 0.7 0.8 --json sweep.json
+    python -m scripts.sweep_config claims.jsonl --llm record --recordings recorded.jsonl
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import itertools
+import json
+import statistics
+import time
+import uuid
+from concurrent.futures import Future
+from pathlib import Path
+
+import chromadb
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+
+from src.agents.rag_agent import build_evaluation_messages
+from src.agents.state import ClaimEvaluation
+from src.config import settings
+from src.rag.embeddings import get_embedding_model
+from src.rag.evidence import format_rag_item, items_from_documents, pack_evidence
+from src.rag.hybrid import BM25Index, HybridRetriever
+from src.rag.ingestion import load_documents, split_documents
+from src.rag.re_ranker import rerank_scores
+
+MB = 1024 * 1024
+
+# (row key, True if larger is better) – the objectives of the Pareto front
+OBJECTIVES = (("index_mb", False), ("query_ms", False), ("fallback", False), ("accuracy", True))
+
+
+def load_claims(path: Path, limit: int | None) -> list[dict]:
+    records = []
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                records.append(json.loads(line))
+            if limit and len(records) >= limit:
+                break
+    return records
+
+
+class Evaluator:
+    """Answers evaluation prompts from the stub, the model or recordings."""
+
+    def __init__(self, mode: str, recordings: Path | None, stub_evidence: float) -> None:
+        self.mode = mode
+        self.path = recordings
+        self.stub_evidence = stub_evidence
+        self.misses = 0
+        self.recorded: dict[str, dict] = {}
+        if recordings is not None and recordings.exists():
+            with recordings.open(encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.recorded[entry["key"]] = entry["evaluation"]
+
+    def stub(self, retrieval_score: float | None) -> ClaimEvaluation:
+        score = retrieval_score or 0.0
+        found = score >= self.stub_evidence
+        return ClaimEvaluation(
+            evidence_found=found, confidence=score, verification_data="", claim_verdict=found
+        )
+
+    def __call__(self, messages: list, retrieval_score: float | None) -> ClaimEvaluation:
+        if self.mode == "stub":
+            return self.stub(retrieval_score)
+        key = hashlib.sha256(
+            json.dumps([[m.type, m.content] for m in messages]).encode()
+        ).hexdigest()
+        if key in self.recorded:
+            return ClaimEvaluation(**self.recorded[key])
+        if self.mode == "replay":
+            self.misses += 1
+            return self.stub(retrieval_score)
+
+        from src.agents.cascade import evaluate_claim
+
+        evaluation = evaluate_claim(messages, retrieval_score)
+        self.recorded[key] = evaluation.model_dump()
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps({"key": key, "evaluation": self.recorded[key]}) + "\n")
+        return evaluation
+
+
+def build_index(
+    client, corpus: list[Document], chunk_size: int, chunk_overlap: int
+) -> tuple[Chroma, BM25Index, list[Document], dict]:
+    """Split and index ``corpus``; returns the stores, the chunks and size / build stats."""
+    settings.chunk_size, settings.chunk_overlap = chunk_size, chunk_overlap
+    started = time.perf_counter()
+    chunks = split_documents([doc.model_copy(deep=True) for doc in corpus], dedup=False)
+    for chunk in chunks:
+        chunk.id = str(uuid.uuid4())
+    split_s = time.perf_counter() - started
+
+    texts = [chunk.page_content for chunk in chunks]
+    started = time.perf_counter()
+    embeddings = get_embedding_model().embed_documents(texts)
+    embed_s = time.perf_counter() - started
+
+    store = Chroma(
+        client=client,
+        collection_name=f"sweep-{chunk_size}-{chunk_overlap}",
+        embedding_function=get_embedding_model(),
+        collection_metadata={"hnsw:space": "cosine"},
+    )
+    started = time.perf_counter()
+    batch = client.get_max_batch_size()
+    for start in range(0, len(chunks), batch):
+        end = start + batch
+        store._collection.add(
+            ids=[chunk.id for chunk in chunks[start:end]],
+            embeddings=embeddings[start:end],
+            documents=texts[start:end],
+            metadatas=[chunk.metadata or None for chunk in chunks[start:end]],
+        )
+    bm25 = BM25Index.build(texts, [chunk.id for chunk in chunks])
+    index_s = time.perf_counter() - started
+
+    vectors = len(embeddings) * len(embeddings[0]) * 4 if embeddings else 0
+    text = sum(len(t.encode()) for t in texts)
+    stats = {
+        "chunks": len(chunks),
+        "index_mb": (vectors + bm25.nbytes + text) / MB,
+        "vectors_mb": vectors / MB,
+        "bm25_mb": bm25.nbytes / MB,
+        "build_s": split_s + embed_s + index_s,
+        "embed_s": embed_s,
+    }
+    return store, bm25, chunks, stats
+
+
+def retrieve(
+    retriever: HybridRetriever, claim: str, embedding: Future, k: int
+) -> tuple[list[Document], list[float], float, float]:
+    """Fused candidates and their re-ranker scores, best first, with both stage timings."""
+    started = time.perf_counter()
+    candidates = [doc for doc, _ in retriever.search(claim, embedding, k=k)]
+    retrieve_s = time.perf_counter() - started
+    started = time.perf_counter()
+    scores = rerank_scores(claim, candidates) if candidates else []
+    rerank_s = time.perf_counter() - started
+    ranked = sorted(zip(candidates, scores), key=lambda pair: pair[1], reverse=True)
+    documents = [
+        Document(
+            page_content=doc.page_content,
+            metadata={**doc.metadata, "relevance_score": score},
+            id=doc.id,
+        )
+        for doc, score in ranked
+    ]
+    return documents, [score for _, score in ranked], retrieve_s, rerank_s
+
+
+def pareto(rows: list[dict]) -> None:
+    """Mark rows no other row dominates on ``OBJECTIVES`` with ``pareto=True``."""
+
+    def at_least(a: dict, b: dict) -> bool:
+        return all(a[key] >= b[key] if up else a[key] <= b[key] for key, up in OBJECTIVES)
+
+    for row in rows:
+        row["pareto"] = not any(
+            other is not row and at_least(other, row) and not at_least(row, other)
+            for other in rows
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sweep chunking, retrieval and routing settings.")
+    parser.add_argument("claims", type=Path, help="JSONL with claim and label")
+    parser.add_argument("--corpus", type=Path, default=Path("data"), help="Documents to index")
+    parser.add_argument("--limit", type=int, default=None, help="Only use the first N claims")
+    parser.add_argument("--chunk-size", type=int, nargs="+", default=[500, settings.chunk_size])
+    parser.add_argument("--chunk-overlap", type=int, nargs="+", default=[settings.chunk_overlap])
+    parser.add_argument("--top-k", type=int, nargs="+", default=[10, settings.retriever_top_k])
+    parser.add_argument("--top-n", type=int, nargs="+", default=[3, settings.retriever_top_n])
+    parser.add_argument(
+        "--vector-weight", type=float, nargs="+", default=[0.5, settings.hybrid_vector_weight]
+    )
+    parser.add_argument(
+        "--threshold", type=float, nargs="+", default=[0.5, settings.confidence_threshold, 0.9]
+    )
+    parser.add_argument("--llm", choices=["stub", "record", "replay"], default="stub")
+    parser.add_argument("--recordings", type=Path, default=Path("sweep_recordings.jsonl"))
+    parser.add_argument(
+        "--stub-evidence", type=float, default=0.5, help="Stub: re-ranker score counted as evidence"
+    )
+    parser.add_argument("--json", type=Path, help="Also write every row to this JSON file")
+    args = parser.parse_args()
+
+    claims = load_claims(args.claims, args.limit)
+    corpus = load_documents(args.corpus)
+    evaluator = Evaluator(args.llm, args.recordings, args.stub_evidence)
+    client = chromadb.EphemeralClient()
+
+    started = time.perf_counter()
+    query_vectors = get_embedding_model().embed_documents([c["claim"] for c in claims])
+    embed_query_ms = (time.perf_counter() - started) * 1000 / max(len(claims), 1)
+    embeddings = []
+    for vector in query_vectors:
+        future: Future = Future()
+        future.set_result(vector)
+        embeddings.append(future)
+
+    rows = []
+    for chunk_size, chunk_overlap in itertools.product(args.chunk_size, args.chunk_overlap):
+        if chunk_overlap >= chunk_size:
+            continue
+        store, bm25, chunks, index = build_index(client, corpus, chunk_size, chunk_overlap)
+        print(
+            f"chunk_size={chunk_size} overlap={chunk_overlap}: {index['chunks']} chunks, "
+            f"{index['index_mb']:.1f} MB, built in {index['build_s']:.1f}s"
+        )
+        for k, weight in itertools.product(args.top_k, args.vector_weight):
+            retriever = HybridRetriever(
+                vector_store=store,
+                bm25=bm25,
+                documents=chunks,
+                k=k,
+                weights=(weight, 1 - weight),
+                fusion=settings.hybrid_fusion,
+            )
+            ranked = [
+                retrieve(retriever, claim["claim"], embedding, k)
+                for claim, embedding in zip(claims, embeddings)
+            ]
+            for top_n in args.top_n:
+                evaluations, stage_s, tokens = [], [], []
+                for claim, (documents, scores, retrieve_s, rerank_s) in zip(claims, ranked):
+                    packed = pack_evidence(
+                        items_from_documents(documents[:top_n]), format_rag_item
+                    )
+                    messages = build_evaluation_messages(
+                        claim["claim"], "Retrieved evidence from knowledge base", packed.text
+                    )
+                    started = time.perf_counter()
+                    evaluations.append(evaluator(messages, scores[0] if scores else None))
+                    stage_s.append((retrieve_s, rerank_s, time.perf_counter() - started))
+                    tokens.append(packed.tokens_after)
+
+                retrieve_ms, rerank_ms, evaluate_ms = (
+                    statistics.fmean(stage) * 1000 for stage in zip(*stage_s or [(0, 0, 0)])
+                )
+                for threshold in args.threshold:
+                    answered = [
+                        (claim, evaluation)
+                        for claim, evaluation in zip(claims, evaluations)
+                        if evaluation.evidence_found and evaluation.confidence > threshold
+                    ]
+                    correct = sum(e.claim_verdict == c["label"] for c, e in answered)
+                    rows.append(
+                        {
+                            "chunk_size": chunk_size,
+                            "chunk_overlap": chunk_overlap,
+                            "top_k": k,
+                            "top_n": top_n,
+                            "vector_weight": weight,
+                            "threshold": threshold,
+                            **index,
+                            "embed_query_ms": embed_query_ms,
+                            "retrieve_ms": retrieve_ms,
+                            "rerank_ms": rerank_ms,
+                            "evaluate_ms": evaluate_ms,
+                            "query_ms": embed_query_ms + retrieve_ms + rerank_ms + evaluate_ms,
+                            "prompt_tokens": statistics.fmean(tokens) if tokens else 0.0,
+                            "fallback": 1 - len(answered) / len(claims) if claims else 0.0,
+                            "accuracy": correct / len(answered) if answered else 0.0,
+                        }
+                    )
+        client.delete_collection(store._collection.name)
+
+    pareto(rows)
+    rows.sort(key=lambda row: (not row["pareto"], -row["accuracy"], row["fallback"]))
+    print(
+        f"\n{len(claims)} claims, llm={args.llm}"
+        + (f" ({evaluator.misses} unrecorded prompts stubbed)" if args.llm == "replay" else "")
+    )
+    print(
+        f"  {'size':>5} {'ovl':>4} {'k':>3} {'n':>2} {'w_vec':>5} {'thr':>4} {'chunks':>6} "
+        f"{'MB':>7} {'retr ms':>8} {'rerank ms':>9} {'eval ms':>8} {'query ms':>8} "
+        f"{'tokens':>6} {'fallback':>8} {'accuracy':>8}"
+    )
+    for row in rows:
+        print(
+            f"{'*' if row['pareto'] else ' '} {row['chunk_size']:>5} {row['chunk_overlap']:>4} "
+            f"{row['top_k']:>3} {row['top_n']:>2} {row['vector_weight']:>5.2f} "
+            f"{row['threshold']:>4.2f} {row['chunks']:>6} {row['index_mb']:>7.2f} "
+            f"{row['retrieve_ms']:>8.1f} {row['rerank_ms']:>9.1f} {row['evaluate_ms']:>8.1f} "
+            f"{row['query_ms']:>8.1f} {row['prompt_tokens']:>6.0f} {row['fallback']:>8.1%} "
+            f"{row['accuracy']:>8.1%}"
+        )
+    if args.json:
+        args.json.write_text(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Sweep retrieval depth: recall vs. re-rank cost of fixed and adaptive depth.
+
+Runs every query of an eval set through the knowledge base with
+
+* fixed depth – ``k`` candidates per leg, all of them re-ranked (the
+  behaviour with ``ADAPTIVE_RETRIEVAL=false``), for every ``--fixed-k``
+* adaptive depth – :func:`src.rag.adaptive.adaptive_rerank` for every
+  combination of ``--k-initial`` and ``--margin``
+
+and reports recall@top_n, passages re-ranked and latency per configuration.
+
+Input is JSONL with one object per line::
+
+    {"query": "...", "relevant": ["chunk id, source URL/path or text snippet", ...]}
+
+A relevant entry matches a chunk whose ID or ``source`` equals it, or whose
+text contains it.  Queries without ``relevant`` are scored against the
+top_n of the deepest fixed configuration instead ("recall vs. full depth").
+
+Each query is embedded once and the embedding shared by all configurations,
+so latencies compare retrieval + re-ranking only.
+
+Usage:
+    python -m scripts.sweep_retrieval_depth eval.jsonl
+    python -m scripts.sweep_retrieval_depth eval.jsonl --fixed-k 5 10 20 --margin 0.1 0.3
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import statistics
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+from langchain_core.documents import Document
+
+from src.config import settings
+from src.rag.adaptive import adaptive_rerank
+from src.rag.embeddings import get_embedding_model
+from src.rag.re_ranker import rerank_scores
+from src.rag.retriever import get_hybrid_retriever
+
+
+def load_queries(path: Path, limit: int | None) -> list[dict]:
+    records = []
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                records.append(json.loads(line))
+            if limit and len(records) >= limit:
+                break
+    return records
+
+
+def matches(doc: Document, relevant: str) -> bool:
+    return relevant in (doc.id, doc.metadata.get("source")) or relevant in doc.page_content
+
+
+def recall(documents: list[Document], relevant: list[str]) -> float:
+    if not relevant:
+        return 1.0
+    return sum(any(matches(doc, r) for doc in documents) for r in relevant) / len(relevant)
+
+
+def fixed_depth(
+    query: str, fetch, k: int, top_n: int
+) -> tuple[list[Document], int]:
+    candidates = fetch(k)
+    if not candidates:
+        return [], 0
+    scores = rerank_scores(query, candidates)
+    ranked = sorted(zip(candidates, scores), key=lambda pair: pair[1], reverse=True)
+    return [doc for doc, _ in ranked[:top_n]], len(candidates)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sweep fixed vs. adaptive retrieval depth.")
+    parser.add_argument("eval_set", type=Path, help="JSONL with query and optional relevant")
+    parser.add_argument("--limit", type=int, default=None, help="Only use the first N queries")
+    parser.add_argument("--top-n", type=int, default=settings.retriever_top_n)
+    parser.add_argument("--fixed-k", type=int, nargs="+", default=[5, 10, settings.retriever_top_k])
+    parser.add_argument("--k-initial", type=int, nargs="+", default=[3, 5])
+    parser.add_argument("--margin", type=float, nargs="+", default=[0.2, 0.3, 0.5])
+    parser.add_argument("--high", type=float, default=settings.adaptive_high)
+    parser.add_argument("--low", type=float, default=settings.adaptive_low)
+    parser.add_argument("--batch", type=int, default=settings.adaptive_rerank_batch)
+    args = parser.parse_args()
+
+    records = load_queries(args.eval_set, args.limit)
+    retriever = get_hybrid_retriever()
+    embedder = get_embedding_model()
+    k_max = max(args.fixed_k)
+
+    configs = [(f"fixed k={k}", ("fixed", k, None)) for k in sorted(args.fixed_k)]
+    configs += [
+        (f"adaptive k0={k0} m={m}", ("adaptive", k0, m))
+        for k0, m in itertools.product(args.k_initial, args.margin)
+    ]
+    rows: dict[str, list[tuple[float, int, float]]] = {name: [] for name, _ in configs}
+
+    for record in records:
+        query = record["query"]
+        embedding: Future = Future()
+        embedding.set_result(embedder.embed_query(query))
+
+        def fetch(k: int, query=query, embedding=embedding) -> list[Document]:
+            return retriever.search(query, k=k, embedding=embedding)
+
+        relevant = record.get("relevant")
+        if relevant is None:
+            reference, _ = fixed_depth(query, fetch, k_max, args.top_n)
+            relevant = [doc.id or doc.page_content for doc in reference]
+
+        for name, (kind, k, margin) in configs:
+            started = time.perf_counter()
+            if kind == "fixed":
+                documents, reranked = fixed_depth(query, fetch, k, args.top_n)
+            else:
+                result = adaptive_rerank(
+                    query, fetch, rerank_scores, top_n=args.top_n, k_initial=k, k_max=k_max,
+                    batch=args.batch, high=args.high, low=args.low, margin=margin,
+                )
+                documents, reranked = result.documents, result.reranked
+            elapsed = time.perf_counter() - started
+            rows[name].append((recall(documents, relevant), reranked, elapsed))
+
+    print(f"\n{len(records)} queries, recall@{args.top_n}")
+    print(f"{'config':<24} {'recall':>7} {'reranked':>9} {'mean ms':>8} {'p95 ms':>8}")
+    for name, results in rows.items():
+        if not results:
+            continue
+        latencies = sorted(r[2] for r in results)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(
+            f"{name:<24} {statistics.fmean(r[0] for r in results):>7.1%} "
+            f"{statistics.fmean(r[1] for r in results):>9.1f} "
+            f"{statistics.fmean(latencies) * 1000:>8.1f} {p95 * 1000:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
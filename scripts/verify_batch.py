@@ -0,0 +1,259 @@
+"""Offline bulk claim verification with streaming input and checkpointing.
+
+Claims are streamed from a JSONL or CSV file, verified with the same graph the
+API uses (``create_rag_agent``) at a configurable concurrency and appended to
+a JSONL results file as they finish.  Progress is checkpointed so a crashed
+run resumes where it stopped, and memory stays flat regardless of input size:
+only the in-flight window of claims is ever held in memory.
+
+Usage:
+    python -m scripts.verify_batch claims.jsonl --output results.jsonl
+    python -m scripts.verify_batch claims.csv --claim-field text --concurrency 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+from src.agents.rag_agent import create_rag_agent, extract_output
+from src.api.coalescing import SingleFlight
+from src.normalize import normalize_claim
+
+
+def read_claims(
+    path: Path,
+    fmt: str,
+    claim_field: str,
+    on_invalid: Callable[[int, str], None] | None = None,
+) -> Iterator[tuple[int, dict]]:
+    """Yield ``(index, record)`` for every input row without loading the file.
+
+    Indexes count the records yielded, so blank lines and malformed JSONL
+    lines (reported to ``on_invalid`` with their line number) leave no gaps
+    for the checkpoint watermark to stall on.
+    """
+    with path.open(newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            for index, row in enumerate(csv.DictReader(f)):
+                yield index, row
+            return
+        index = 0
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                if on_invalid is not None:
+                    on_invalid(line_number, str(e))
+                continue
+            yield index, record if isinstance(record, dict) else {claim_field: record}
+            index += 1
+
+
+class Checkpoint:
+    """Resumable progress: every index below ``watermark`` plus ``done`` is finished.
+
+    Claims complete out of order, but never further apart than the
+    concurrency window, so ``done`` stays small.  The output size at the time
+    of the checkpoint is recorded too; results appended after it are
+    recovered from the output file on resume, and a line torn by a crash is
+    cut off so that new results start on a line of their own.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.watermark = 0
+        self.done: set[int] = set()
+        self.output_offset = 0
+
+    def load(self, output: Path) -> None:
+        if self.path.exists():
+            state = json.loads(self.path.read_text())
+            self.watermark = state["watermark"]
+            self.done = set(state["done"])
+            self.output_offset = state["output_offset"]
+        if output.exists():
+            # Results written after the last checkpoint
+            with output.open("r+b") as f:
+                f.seek(self.output_offset)
+                end = self.output_offset
+                for line in f:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("no line end")
+                        self.mark(json.loads(line)["index"])
+                    except (ValueError, KeyError):
+                        break  # torn final line from a crash
+                    end += len(line)
+                f.truncate(end)
+            self.output_offset = end
+
+    def is_done(self, index: int) -> bool:
+        return index < self.watermark or index in self.done
+
+    def mark(self, index: int) -> None:
+        self.done.add(index)
+        while self.watermark in self.done:
+            self.done.remove(self.watermark)
+            self.watermark += 1
+
+    def save(self, output_offset: int) -> None:
+        self.output_offset = output_offset
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(
+            json.dumps(
+                {
+                    "watermark": self.watermark,
+                    "done": sorted(self.done),
+                    "output_offset": output_offset,
+                }
+            )
+        )
+        os.replace(tmp, self.path)
+
+
+class Progress:
+    """Running throughput and RAG-vs-WEB split."""
+
+    def __init__(self) -> None:
+        self.started = time.monotonic()
+        self.completed = 0
+        self.skipped = 0
+        self.errors = 0
+        self.invalid = 0
+        self.sources: dict[str, int] = {}
+
+    def record(self, output: dict) -> None:
+        self.completed += 1
+        if "error" in output:
+            self.errors += 1
+            return
+        source = output.get("evidence_source", "unknown")
+        self.sources[source] = self.sources.get(source, 0) + 1
+
+    def report(self) -> str:
+        elapsed = time.monotonic() - self.started
+        rate = self.completed / elapsed if elapsed else 0.0
+        answered = sum(self.sources.values()) or 1
+        split = ", ".join(
+            f"{source}={count} ({count / answered:.0%})"
+            for source, count in sorted(self.sources.items())
+        )
+        return (
+            f"{self.completed} verified ({self.skipped} resumed, {self.errors} errors, "
+            f"{self.invalid} malformed) "
+            f"in {elapsed:.0f}s – {rate:.2f} claims/s – {split or 'no results yet'}"
+        )
+
+
+async def run(args: argparse.Namespace) -> None:
+    input_path = Path(args.input)
+    fmt = args.format or ("csv" if input_path.suffix.lower() == ".csv" else "jsonl")
+    output_path = Path(args.output)
+    checkpoint = Checkpoint(Path(args.checkpoint or f"{args.output}.ckpt"))
+    checkpoint.load(output_path)
+
+    agent = create_rag_agent()
+    flight = SingleFlight("batch")
+    progress = Progress()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    last_report = last_save = time.monotonic()
+
+    output = output_path.open("a", encoding="utf-8")
+
+    async def verify(claim: str) -> dict:
+        result = await agent.ainvoke({"query": claim})
+        return extract_output(result, claim)
+
+    async def process(index: int, record: dict) -> None:
+        nonlocal last_report, last_save
+        claim = str(record.get(args.claim_field, "")).strip()
+        line = {"index": index}
+        if args.id_field:
+            line["id"] = record.get(args.id_field)
+        try:
+            if not claim:
+                raise ValueError(f"missing '{args.claim_field}' field")
+            line.update(await flight.do(normalize_claim(claim), lambda: verify(claim)))
+            line["claim"] = claim
+        except Exception as e:
+            line.update({"claim": claim, "error": str(e)})
+        finally:
+            semaphore.release()
+
+        output.write(json.dumps(line) + "\n")
+        checkpoint.mark(index)
+        progress.record(line)
+
+        now = time.monotonic()
+        if now - last_save >= args.checkpoint_every:
+            output.flush()
+            os.fsync(output.fileno())
+            checkpoint.save(output.tell())
+            last_save = now
+        if now - last_report >= args.report_every:
+            print(progress.report(), file=sys.stderr)
+            last_report = now
+
+    def skip_invalid(line_number: int, error: str) -> None:
+        progress.invalid += 1
+        print(f"Skipping malformed line {line_number}: {error}", file=sys.stderr)
+
+    tasks: set[asyncio.Task] = set()
+    try:
+        for index, record in read_claims(input_path, fmt, args.claim_field, skip_invalid):
+            if checkpoint.is_done(index):
+                progress.skipped += 1
+                continue
+            # Backpressure: never read further than the concurrency window
+            await semaphore.acquire()
+            task = asyncio.create_task(process(index, record))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+    finally:
+        output.flush()
+        os.fsync(output.fileno())
+        checkpoint.save(output.tell())
+        output.close()
+
+    print(progress.report(), file=sys.stderr)
+    print(f"Results written to {output_path}")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Verify a large file of claims offline.")
+    parser.add_argument("input", help="JSONL or CSV file with one claim per record")
+    parser.add_argument("--output", default="results.jsonl", help="JSONL results file (appended)")
+    parser.add_argument(
+        "--format", choices=["jsonl", "csv"], help="Input format (default: by extension)"
+    )
+    parser.add_argument("--claim-field", default="claim", help="Field holding the claim text")
+    parser.add_argument("--id-field", help="Field copied to the output to identify each claim")
+    parser.add_argument("--concurrency", type=int, default=4, help="Claims verified in parallel")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.ckpt)")
+    parser.add_argument(
+        "--checkpoint-every", type=float, default=5.0, help="Seconds between checkpoints"
+    )
+    parser.add_argument(
+        "--report-every", type=float, default=10.0, help="Seconds between progress reports"
+    )
+    return parser.parse_args(argv)
+
+
+def main() -> None:
+    asyncio.run(run(parse_args()))
+
+
+if __name__ == "__main__":
+    main()
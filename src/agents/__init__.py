@@ -1,5 +1,5 @@
 """Agent definitions for the truth detection system."""
 
-from src.agents.rag_agent import create_rag_agent
+from src.agents.rag_agent import create_rag_agent, extract_output
 
-__all__ = ["create_rag_agent"]
+__all__ = ["create_rag_agent", "extract_output"]
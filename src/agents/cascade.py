@@ -0,0 +1,127 @@
+"""Two-tier model cascade for claim evaluation.
+
+A small, cheap model evaluates the claim first.  Its answer is accepted
+unless it is uncertain (confidence inside ``settings.cascade_band``) or it
+disagrees with the retrieval signal – e.g. it is confident the evidence
+settles the claim while the re-ranker found nothing relevant, or the other
+way round.  Only those claims are escalated to ``settings.openai_model``.
+
+Per-tier latency, call counts and the escalation rate are recorded in
+``src.metrics``.
+
+Under a request deadline (``src.deadline``) each call gets the remaining
+budget as its timeout and no retries, and a small-model answer is accepted
+without escalation when too little budget is left for the large model.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import Runnable
+from langchain_openai import ChatOpenAI
+from loguru import logger
+
+from src import metrics
+from src.agents.state import ClaimEvaluation
+from src.config import settings
+from src.deadline import call_timeout, has_budget
+
+
+@lru_cache(maxsize=8)
+def get_evaluator(model: str, max_retries: int | None = None) -> Runnable:
+    """Return a cached structured-output evaluator for ``model``."""
+    llm = ChatOpenAI(
+        model=model,
+        api_key=settings.openai_api_key,
+        base_url=settings.openai_base_url or None,
+        temperature=0,
+        max_retries=max_retries,
+    )
+    return llm.with_structured_output(ClaimEvaluation)
+
+
+def _evaluator(model: str, deadline: float | None) -> Runnable:
+    timeout = call_timeout(deadline)
+    if timeout is None:
+        return get_evaluator(model)
+    # A retry after a timeout would overrun the deadline; the per-call timeout
+    # is bound onto the chat model step of the structured-output chain
+    evaluator = get_evaluator(model, max_retries=0)
+    return evaluator.first.bind(timeout=timeout) | evaluator.last
+
+
+def escalation_reason(
+    evaluation: ClaimEvaluation, retrieval_score: float | None
+) -> str | None:
+    """Why a small-model ``evaluation`` should be re-checked by the large model.
+
+    Args:
+        evaluation: The small model's evaluation.
+        retrieval_score: Best relevance score of the evidence (re-ranker score
+            for RAG, Tavily score for web results), if known.
+
+    Returns:
+        ``"uncertain"``, ``"disagrees_with_retrieval"`` or ``None`` to accept.
+    """
+    low, high = settings.cascade_band_low, settings.cascade_band_high
+    if low <= evaluation.confidence < high:
+        return "uncertain"
+    if retrieval_score is not None:
+        model_says_supported = evaluation.evidence_found and evaluation.confidence >= high
+        retrieval_says_supported = retrieval_score >= settings.cascade_retrieval_threshold
+        if model_says_supported != retrieval_says_supported:
+            return "disagrees_with_retrieval"
+    return None
+
+
+def _invoke(
+    tier: str, model: str, messages: list[BaseMessage], deadline: float | None = None
+) -> ClaimEvaluation:
+    evaluator = _evaluator(model, deadline)
+    metrics.increment(f"cascade.{tier}.calls")
+    with metrics.timer(f"cascade.{tier}.latency"):
+        return evaluator.invoke(messages)
+
+
+def evaluate_claim(
+    messages: list[BaseMessage],
+    retrieval_score: float | None = None,
+    deadline: float | None = None,
+) -> ClaimEvaluation:
+    """Evaluate a claim prompt through the cascade (or the large model alone).
+
+    The cascade is disabled when ``settings.cascade_small_model`` is empty.
+
+    Raises:
+        TimeoutError, openai.APITimeoutError: If ``deadline`` runs out first.
+    """
+    if not settings.cascade_small_model:
+        return _invoke("large", settings.openai_model, messages, deadline)
+
+    evaluation = _invoke("small", settings.cascade_small_model, messages, deadline)
+    reason = escalation_reason(evaluation, retrieval_score)
+    if reason is None:
+        metrics.increment("cascade.accepted")
+    elif not has_budget(deadline, settings.deadline_escalation_seconds):
+        logger.info("Not escalating ({}): request deadline too close", reason)
+        metrics.increment("deadline.escalations_skipped")
+    else:
+        logger.info(
+            "Escalating to {} ({}): confidence={:.2f}, retrieval_score={}",
+            settings.openai_model,
+            reason,
+            evaluation.confidence,
+            retrieval_score,
+        )
+        metrics.increment("cascade.escalations")
+        metrics.increment(f"cascade.escalations.{reason}")
+        evaluation = _invoke("large", settings.openai_model, messages, deadline)
+
+    counters = metrics.snapshot()["counters"]
+    metrics.set_gauge(
+        "cascade.escalation_rate",
+        counters.get("cascade.escalations", 0) / counters["cascade.small.calls"],
+    )
+    return evaluation
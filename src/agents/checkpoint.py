@@ -0,0 +1,342 @@
+"""Durable SQLite checkpoints for the agent graph.
+
+A ``/verify`` request that carries an ``Idempotency-Key`` runs the graph
+with a checkpoint after every node, in a thread derived from the key and
+the request (``thread_id``).  When the client retries after a failure –
+an LLM timeout, a structured-output parse error – the run resumes at the
+node that failed instead of repeating the Tavily search and the LLM calls
+that already succeeded, and a retry of a finished run reuses its result.
+
+``SqliteCheckpointer`` implements LangGraph's ``BaseCheckpointSaver`` on the
+standard library's ``sqlite3`` (the ``langgraph-checkpoint-sqlite`` package
+is not a dependency).  Each checkpoint is stored whole; threads expire
+``settings.checkpoint_ttl_seconds`` after their last checkpoint.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from collections.abc import AsyncIterator, Iterator, Sequence
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from loguru import logger
+
+from src.config import settings
+
+HEADER = "Idempotency-Key"
+
+# Minimum seconds between purges of expired threads
+_PURGE_INTERVAL = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT NOT NULL,
+    checkpoint BLOB NOT NULL,
+    metadata_type TEXT NOT NULL,
+    metadata BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE INDEX IF NOT EXISTS checkpoints_created ON checkpoints (created_at);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT NOT NULL,
+    value BLOB NOT NULL,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+
+def thread_id(idempotency_key: str, *parts: str) -> str:
+    """Checkpoint thread for a request: the key plus what the request asks.
+
+    Reusing a key for a different claim starts a fresh thread instead of
+    returning another claim's verdict.
+    """
+    digest = hashlib.sha256("\x00".join((idempotency_key, *parts)).encode()).hexdigest()
+    return digest[:32]
+
+
+class SqliteCheckpointer(BaseCheckpointSaver[int]):
+    """LangGraph checkpoint saver backed by a local SQLite file.
+
+    Args:
+        path: Database file (created with its parent directory).
+        ttl_seconds: Threads expire this long after their last checkpoint
+            (``0`` keeps them forever).
+    """
+
+    def __init__(self, path: str | Path, ttl_seconds: float = 0) -> None:
+        super().__init__()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self._conn = sqlite3.connect(
+            str(path), isolation_level=None, check_same_thread=False, timeout=30
+        )
+        self._lock = threading.Lock()
+        self._purged_at = 0.0
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    # -- expiry -----------------------------------------------------------
+
+    def _cutoff(self) -> float:
+        return time.time() - self.ttl_seconds if self.ttl_seconds else 0.0
+
+    def purge_expired(self) -> int:
+        """Delete threads whose last checkpoint is older than the TTL."""
+        if not self.ttl_seconds:
+            return 0
+        with self._lock:
+            expired = [
+                row[0]
+                for row in self._conn.execute(
+                    "SELECT thread_id FROM checkpoints GROUP BY thread_id "
+                    "HAVING MAX(created_at) < ?",
+                    (self._cutoff(),),
+                )
+            ]
+            for thread in expired:
+                self._delete_unlocked(thread)
+        if expired:
+            logger.info("Purged {} expired checkpoint thread(s)", len(expired))
+        return len(expired)
+
+    def _maybe_purge(self) -> None:
+        now = time.monotonic()
+        if now - self._purged_at >= _PURGE_INTERVAL:
+            self._purged_at = now
+            self.purge_expired()
+
+    # -- reads ------------------------------------------------------------
+
+    def _tuple(self, row: tuple) -> CheckpointTuple:
+        thread, ns, checkpoint_id, parent_id, type_, checkpoint, metadata_type, metadata = row
+        with self._lock:
+            writes = self._conn.execute(
+                "SELECT task_id, channel, type, value FROM writes "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? "
+                "ORDER BY task_id, idx",
+                (thread, ns, checkpoint_id),
+            ).fetchall()
+        return CheckpointTuple(
+            config=_config(thread, ns, checkpoint_id),
+            checkpoint=self.serde.loads_typed((type_, checkpoint)),
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=_config(thread, ns, parent_id) if parent_id else None,
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((value_type, value)))
+                for task_id, channel, value_type, value in writes
+            ],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        configurable = config["configurable"]
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, "
+            "checkpoint, metadata_type, metadata FROM checkpoints "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND created_at >= ?"
+        )
+        params: list[Any] = [
+            configurable["thread_id"],
+            configurable.get("checkpoint_ns", ""),
+            self._cutoff(),
+        ]
+        if checkpoint_id := get_checkpoint_id(config):
+            query += " AND checkpoint_id = ?"
+            params.append(checkpoint_id)
+        else:
+            # Checkpoint IDs are time-ordered UUIDs
+            query += " ORDER BY checkpoint_id DESC LIMIT 1"
+        with self._lock:
+            row = self._conn.execute(query, params).fetchone()
+        return self._tuple(row) if row else None
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, "
+            "checkpoint, metadata_type, metadata FROM checkpoints WHERE created_at >= ?"
+        )
+        params: list[Any] = [self._cutoff()]
+        if config is not None:
+            query += " AND thread_id = ?"
+            params.append(config["configurable"]["thread_id"])
+            if (ns := config["configurable"].get("checkpoint_ns")) is not None:
+                query += " AND checkpoint_ns = ?"
+                params.append(ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                query += " AND checkpoint_id = ?"
+                params.append(checkpoint_id)
+        if before is not None and (before_id := get_checkpoint_id(before)):
+            query += " AND checkpoint_id < ?"
+            params.append(before_id)
+        query += " ORDER BY checkpoint_id DESC"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        count = 0
+        for row in rows:
+            item = self._tuple(row)
+            if filter and any(item.metadata.get(k) != v for k, v in filter.items()):
+                continue
+            yield item
+            count += 1
+            if limit is not None and count >= limit:
+                return
+
+    # -- writes -----------------------------------------------------------
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        configurable = config["configurable"]
+        thread, ns = configurable["thread_id"], configurable.get("checkpoint_ns", "")
+        type_, blob = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_blob = self.serde.dumps_typed(
+            get_checkpoint_metadata(config, metadata)
+        )
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread,
+                    ns,
+                    checkpoint["id"],
+                    configurable.get("checkpoint_id"),
+                    type_,
+                    blob,
+                    metadata_type,
+                    metadata_blob,
+                    time.time(),
+                ),
+            )
+        self._maybe_purge()
+        return _config(thread, ns, checkpoint["id"])
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        configurable = config["configurable"]
+        key = (
+            configurable["thread_id"],
+            configurable.get("checkpoint_ns", ""),
+            configurable["checkpoint_id"],
+        )
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, blob = self.serde.dumps_typed(value)
+            rows.append((*key, task_id, WRITES_IDX_MAP.get(channel, idx), channel, type_, blob))
+        # Special writes (errors, interrupts) are replaced; regular ones kept
+        with self._lock:
+            for row in rows:
+                verb = "INSERT OR REPLACE" if row[4] < 0 else "INSERT OR IGNORE"
+                self._conn.execute(
+                    f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", (*row, task_path)
+                )
+
+    def _delete_unlocked(self, thread: str) -> None:
+        self._conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread,))
+        self._conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread,))
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._delete_unlocked(thread_id)
+
+    # -- async (SQLite calls run in a worker thread) -------------------------
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+def _config(thread: str, ns: str, checkpoint_id: str) -> RunnableConfig:
+    return {
+        "configurable": {"thread_id": thread, "checkpoint_ns": ns, "checkpoint_id": checkpoint_id}
+    }
+
+
+@lru_cache(maxsize=1)
+def get_checkpointer() -> SqliteCheckpointer:
+    """Return the process-wide checkpointer (``settings.checkpoint_store_path``)."""
+    checkpointer = SqliteCheckpointer(
+        settings.checkpoint_store_path, settings.checkpoint_ttl_seconds
+    )
+    checkpointer.purge_expired()
+    return checkpointer
@@ -0,0 +1,106 @@
+"""Split a highlighted passage into atomic sub-claims.
+
+The browser extension often sends a whole paragraph as one claim.  Retrieved
+and evaluated as a single blob it makes for a long prompt that rarely finds
+enough evidence for every statement at once, so the web fallback is likely.
+``split_claims`` cuts the text into sentences with a regular expression – no
+model call – so that each statement gets its own retrieval and evaluation
+(the graph fans them out in parallel, see ``src.agents.rag_agent``).
+
+Sentences that cannot stand alone are kept with their neighbour: fragments
+shorter than ``settings.decompose_min_words`` and sentences opening with a
+pronoun ("It was founded…") whose referent is in the previous sentence.
+"""
+
+from __future__ import annotations
+
+import re
+
+from src.config import settings
+from src.normalize import normalize_claim
+
+# Sentence ends: terminal punctuation (or a semicolon) followed by whitespace
+# and something that can start a sentence
+_BOUNDARY_RE = re.compile(r"(?<=[.!?;])\s+(?=[\"'“‘(\[]?[A-Z0-9])")
+
+# Tokens whose trailing period does not end a sentence
+_ABBREVIATIONS = frozenset(
+    "mr mrs ms dr prof sr jr st mt vs etc inc ltd co corp no nos fig approx est dept gen "
+    "gov sen rep jan feb mar apr jun jul aug sep sept oct nov dec e.g i.e u.s u.k a.m p.m".split()
+)
+
+# Openers that refer back to the previous sentence
+_ANAPHORA = frozenset(
+    "it its they their them he his she her this these those such which both".split()
+)
+
+
+def _sentences(text: str) -> list[str]:
+    sentences: list[str] = []
+    for piece in _BOUNDARY_RE.split(text.strip()):
+        previous = sentences[-1].split()[-1].lower().rstrip(".") if sentences else ""
+        # "Dr. Smith", "J. Doe", "U.S. Army": the period belonged to an abbreviation
+        if sentences and sentences[-1].endswith(".") and (
+            previous in _ABBREVIATIONS or len(previous) == 1
+        ):
+            sentences[-1] = f"{sentences[-1]} {piece}"
+        else:
+            sentences.append(piece)
+    return sentences
+
+
+def _stands_alone(sentence: str, min_words: int) -> bool:
+    words = sentence.split()
+    return len(words) >= min_words and words[0].strip("\"'“‘([").lower() not in _ANAPHORA
+
+
+def _merge_to(claims: list[str], count: int) -> list[str]:
+    """Join adjacent claims into ``count`` groups of (nearly) equal size."""
+    size, extra = divmod(len(claims), count)
+    groups, start = [], 0
+    for i in range(count):
+        end = start + size + (i < extra)
+        groups.append(" ".join(claims[start:end]))
+        start = end
+    return groups
+
+
+def split_claims(
+    text: str, max_claims: int | None = None, min_words: int | None = None
+) -> list[str]:
+    """Split ``text`` into sub-claims that can be verified independently.
+
+    Args:
+        text: The claim or passage to split.
+        max_claims: Upper bound on sub-claims; beyond it adjacent sentences
+            are merged (defaults to ``settings.decompose_max_claims``).
+        min_words: Sentences with fewer words are kept with their neighbour
+            (defaults to ``settings.decompose_min_words``).
+
+    Returns:
+        The sub-claims in text order – a single element when ``text`` holds
+        only one statement.  Repeated statements appear once.
+    """
+    max_claims = max_claims or settings.decompose_max_claims
+    min_words = settings.decompose_min_words if min_words is None else min_words
+
+    claims: list[str] = []
+    for sentence in _sentences(text):
+        if claims and not _stands_alone(sentence, min_words):
+            claims[-1] = f"{claims[-1]} {sentence}"
+        elif claims and not _stands_alone(claims[-1], min_words):
+            # A short opening fragment joins the sentence after it
+            claims[-1] = f"{claims[-1]} {sentence}"
+        else:
+            claims.append(sentence)
+
+    seen: set[str] = set()
+    unique = []
+    for claim in claims:
+        key = normalize_claim(claim)
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(claim.rstrip(";").strip())
+    if len(unique) > max_claims:
+        unique = _merge_to(unique, max_claims)
+    return unique or [text.strip()]
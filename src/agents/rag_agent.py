@@ -1,35 +1,51 @@
 """RAG Agent built with LangGraph.
 
 This module defines the core agentic RAG workflow:
-  1. Receive a user query (claim)
+  1. Receive a user query (claim); with ``settings.decompose_claims`` a passage
+     is split into sub-claims that run steps 2–5 in parallel branches
   2. Retrieve relevant context from the vector store
   3. Evaluate the claim against retrieved evidence (evidence_found, confidence)
-  4. If evidence is strong (evidence_found=True & confidence > 0.7) → return result
+  4. If evidence is strong (evidence_found & confidence > confidence_threshold) → return result
   5. Otherwise fall back to web search → evaluate → sync new data into RAG store
   6. Return a structured verification result to the user
+
+Under a request deadline (``state.deadline``) the web fallback is skipped
+when too little budget is left, outbound calls time out with the remaining
+budget, and the best verdict so far is returned flagged ``low_confidence``.
 """
 
 from __future__ import annotations
 
 import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
-from langchain_openai import ChatOpenAI
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph import END, StateGraph
+from langgraph.types import Send
 from loguru import logger
 
-from src.agents.state import AgentState, ClaimEvaluation
+from src import metrics
+from src.agents.cascade import evaluate_claim
+from src.agents.decompose import split_claims
+from src.agents.state import AgentState
 from src.config import settings
-from src.rag.ingestion import ingest_text_content
+from src.deadline import TIMEOUT_ERRORS, call_timeout, has_budget, remaining
+from src.rag.evidence import (
+    format_rag_item,
+    format_web_item,
+    items_from_documents,
+    items_from_web_results,
+    pack_evidence,
+)
+from src.rag.ingestion import split_documents
 from src.rag.retriever import get_context_after_re_ranker
 from src.rag.vector_store import add_documents
 from src.tools.search import web_search_tool
 
-# ---------------------------------------------------------------------------
-# Confidence threshold – claims with RAG confidence above this skip web search
-# ---------------------------------------------------------------------------
-CONFIDENCE_THRESHOLD = 0.7
-
 # ---------------------------------------------------------------------------
 # System prompts
 # ---------------------------------------------------------------------------
@@ -55,16 +71,150 @@ Guidelines:
 """
 
 
+def build_evaluation_messages(claim: str, heading: str, evidence_text: str) -> list[BaseMessage]:
+    """Build the claim-evaluation prompt for ``claim`` and its packed evidence."""
+    return [
+        SystemMessage(content=EVALUATE_CLAIM_PROMPT),
+        HumanMessage(
+            content=(
+                f"Claim to verify:\n{claim}\n\n"
+                f"{heading}:\n{evidence_text}\n\n"
+                "Evaluate the claim and respond with the JSON object."
+            )
+        ),
+    ]
+
+
 # ---------------------------------------------------------------------------
 # Graph node functions
 # ---------------------------------------------------------------------------
 
 
+def decompose_node(state: AgentState) -> dict:
+    """Split the claim into sub-claims when decomposition is enabled."""
+    sub_claims = split_claims(state.query) if settings.decompose_claims else [state.query]
+    if len(sub_claims) > 1:
+        logger.info("Decomposed claim into {} sub-claims", len(sub_claims))
+        metrics.increment("decompose.claims")
+        metrics.observe("decompose.sub_claims", len(sub_claims))
+    return {"sub_claims": sub_claims, "claim": state.query}
+
+
+def route_after_decomposition(state: AgentState) -> str | list[Send]:
+    """Verify a single claim in this graph, or fan sub-claims out to parallel branches."""
+    if len(state.sub_claims) <= 1:
+        return "retrieve"
+    return [
+        Send(
+            "verify_sub_claim",
+            {"index": i, "claim": claim, "filters": state.filters, "deadline": state.deadline},
+        )
+        for i, claim in enumerate(state.sub_claims)
+    ]
+
+
+@lru_cache(maxsize=1)
+def _claim_graph():
+    # One sub-claim's pipeline; the parent graph checkpoints its branches as a whole
+    return create_rag_agent(checkpointer=False, decompose=False)
+
+
+def verify_sub_claim_node(task: dict, config: RunnableConfig) -> dict:
+    """Retrieve, evaluate and (if needed) search the web for one sub-claim.
+
+    ``task`` is the ``Send`` payload of ``route_after_decomposition``.  A run
+    resumed from a checkpoint passes its own deadline in the config, since
+    payloads keep the one of the failed attempt.
+    """
+    configurable = config.get("configurable", {})
+    deadline = configurable["deadline"] if "deadline" in configurable else task["deadline"]
+    logger.info("Verifying sub-claim {}: {}", task["index"] + 1, task["claim"][:100])
+    result = _claim_graph().invoke(
+        {"query": task["claim"], "filters": task["filters"], "deadline": deadline}
+    )
+    return {"sub_results": [{"index": task["index"], **extract_output(result, task["claim"])}]}
+
+
+def aggregate_node(state: AgentState) -> dict:
+    """Combine the sub-claim verdicts into the final output.
+
+    The passage holds only if every sub-claim does; sources and the
+    best-effort flag are merged, and each sub-claim's result is listed.
+    """
+    results = sorted(state.sub_results, key=lambda result: result["index"])
+    source_urls: list[str] = []
+    for result in results:
+        source_urls.extend(url for url in result["source_urls"] if url not in source_urls)
+    sub_claims = [
+        {
+            "claim": result["claim"],
+            "verification_data": result["verification_data"],
+            "evidence_source": result["evidence_source"],
+            "source_urls": result["source_urls"],
+            "claim_verdict": result["claim_verdict"],
+            "low_confidence": result["low_confidence"],
+        }
+        for result in results
+    ]
+    output = {
+        "claim": state.query,
+        "verification_data": "\n\n".join(
+            f"{i}. [{'TRUE' if sub['claim_verdict'] else 'FALSE'}] {sub['claim']}\n"
+            f"{sub['verification_data']}"
+            for i, sub in enumerate(sub_claims, 1)
+        ),
+        "evidence_source": " + ".join(sorted({sub["evidence_source"] for sub in sub_claims})),
+        "source_urls": source_urls,
+        "claim_verdict": all(sub["claim_verdict"] for sub in sub_claims),
+        "low_confidence": any(sub["low_confidence"] for sub in sub_claims),
+        "sub_claims": sub_claims,
+    }
+    logger.info(
+        "Aggregated {} sub-claims → claim_verdict={}, evidence_source={}",
+        len(sub_claims),
+        output["claim_verdict"],
+        output["evidence_source"],
+    )
+    return {
+        "messages": [AIMessage(content=json.dumps(output, indent=2))],
+        "claim": state.query,
+        "verification_data": output["verification_data"],
+        "evidence_source": output["evidence_source"],
+        "source_urls": source_urls,
+        "claim_verdict": output["claim_verdict"],
+        "low_confidence": output["low_confidence"],
+    }
+
+
+@lru_cache(maxsize=1)
+def _retrieval_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="retrieval")
+
+
 def retrieve_node(state: AgentState) -> dict:
-    """Retrieve relevant documents from the vector store for the user's claim."""
-    logger.info(f"Retrieving context for claim: {state.query[:100]}")
-    documents = get_context_after_re_ranker(state.query)
-    logger.info(f"Retrieved {len(documents)} document(s) from vector store")
+    """Retrieve relevant documents from the vector store for the user's claim.
+
+    Under a request deadline the retrieval (query embedding, search and
+    re-ranking) gets at most the remaining budget; when it is spent the
+    claim is evaluated without knowledge-base evidence.  A retrieval cut
+    short finishes in the background (and still fills the retrieval cache).
+    """
+    logger.info("Retrieving context for claim: {}", state.query[:100])
+    if state.deadline is None:
+        documents = get_context_after_re_ranker(state.query, state.filters)
+    else:
+        try:
+            timeout = call_timeout(state.deadline)
+            documents = (
+                _retrieval_executor()
+                .submit(get_context_after_re_ranker, state.query, state.filters)
+                .result(timeout=timeout)
+            )
+        except TIMEOUT_ERRORS as e:
+            logger.warning("Retrieval ran out of time: {}", e)
+            metrics.increment("deadline.retrieval_skipped")
+            return {"context": [], "claim": state.query, "low_confidence": True}
+    logger.info("Retrieved {} document(s) from vector store", len(documents))
     return {"context": documents, "claim": state.query}
 
 
@@ -72,59 +222,49 @@ def evaluate_rag_node(state: AgentState) -> dict:
     """Evaluate the claim against documents retrieved from the RAG store."""
     logger.info("Evaluating claim against RAG store evidence")
 
-    llm = ChatOpenAI(
-        model=settings.openai_model,
-        api_key=settings.openai_api_key,
-        temperature=0,
-    )
-
-    # Format retrieved documents as evidence text and extract source URLs
+    # Pack retrieved documents into a deduplicated, token-budgeted evidence
+    # section and collect the unique sources it cites
     source_urls = []
     if state.context:
-        evidence_parts = []
-        for i, doc in enumerate(state.context, 1):
-            # Try source_url first (web results), fallback to source (file paths)
-            source_url = doc.metadata.get("source_url") or doc.metadata.get("source", "unknown")
-            source_type = doc.metadata.get("source_type", "file")
-            title = doc.metadata.get("title", "")
-            
-            # Format evidence with source info
-            source_label = f"{title} ({source_url})" if title else source_url
-            evidence_parts.append(
-                f"[{i}] (source: {source_label})\n{doc.page_content}"
-            )
-            
-            # Collect unique URLs (handle both web URLs and file paths)
-            if source_url and source_url != "unknown":
-                if source_type == "web" or source_url.startswith(("http://", "https://")):
-                    if source_url not in source_urls:
-                        source_urls.append(source_url)
-                elif source_type == "file":
-                    # For file sources, use the file path
-                    if source_url not in source_urls:
-                        source_urls.append(source_url)
-        evidence_text = "\n\n---\n\n".join(evidence_parts)
+        packed = pack_evidence(items_from_documents(state.context), format_rag_item)
+        for item in packed.items:
+            if item.source and item.source != "unknown" and item.source not in source_urls:
+                source_urls.append(item.source)
+        evidence_text = packed.text
     else:
         evidence_text = "No documents were retrieved from the knowledge base."
 
-    messages = [
-        SystemMessage(content=EVALUATE_CLAIM_PROMPT),
-        HumanMessage(
-            content=(
-                f"Claim to verify:\n{state.query}\n\n"
-                f"Retrieved evidence from knowledge base:\n{evidence_text}\n\n"
-                "Evaluate the claim and respond with the JSON object."
-            )
-        ),
-    ]
+    messages = build_evaluation_messages(
+        state.query, "Retrieved evidence from knowledge base", evidence_text
+    )
 
-    structured_llm = llm.with_structured_output(ClaimEvaluation)
-    evaluation: ClaimEvaluation = structured_llm.invoke(messages)
+    # Re-ranker relevance of the best passage is the retrieval signal
+    scores = [
+        doc.metadata["relevance_score"]
+        for doc in state.context
+        if "relevance_score" in doc.metadata
+    ]
+    try:
+        evaluation = evaluate_claim(messages, max(scores) if scores else None, state.deadline)
+    except TIMEOUT_ERRORS as e:
+        # No verdict to fall back on yet: answer "unverified" rather than overrun
+        logger.warning("RAG evaluation ran out of time: {}", e)
+        metrics.increment("deadline.exceeded")
+        return {
+            "evidence_found": False,
+            "confidence": 0.0,
+            "verification_data": "The claim could not be evaluated within the request deadline.",
+            "claim_verdict": False,
+            "evidence_source": "RAG Store",
+            "source_urls": source_urls,
+            "low_confidence": True,
+        }
 
     logger.info(
-        f"RAG evaluation → evidence_found={evaluation.evidence_found}, "
-        f"confidence={evaluation.confidence:.2f}, "
-        f"claim_verdict={evaluation.claim_verdict}"
+        "RAG evaluation → evidence_found={}, confidence={:.2f}, claim_verdict={}",
+        evaluation.evidence_found,
+        evaluation.confidence,
+        evaluation.claim_verdict,
     )
 
     return {
@@ -137,30 +277,51 @@ def evaluate_rag_node(state: AgentState) -> dict:
     }
 
 
+def _is_sufficient(state: AgentState) -> bool:
+    return state.evidence_found and state.confidence > settings.confidence_threshold
+
+
 def route_after_evaluation(state: AgentState) -> str:
     """Route based on evidence quality from RAG evaluation.
 
-    - If evidence_found=True AND confidence > CONFIDENCE_THRESHOLD (0.7) → format output directly
+    - If evidence_found=True AND confidence > settings.confidence_threshold → format output
+    - If the request deadline leaves less than ``settings.deadline_web_search_seconds``
+      → format output with the RAG verdict (flagged low-confidence)
     - Otherwise → fall back to web search
     """
-    if state.evidence_found and state.confidence > CONFIDENCE_THRESHOLD:
+    if _is_sufficient(state):
+        logger.info(
+            "Sufficient RAG evidence (confidence={:.2f}), routing to final output",
+            state.confidence,
+        )
+        return "format_output"
+
+    if not has_budget(state.deadline, settings.deadline_web_search_seconds):
         logger.info(
-            f"Sufficient RAG evidence (confidence={state.confidence:.2f}), "
-            "routing to final output"
+            "Insufficient RAG evidence but only {:.1f}s left, skipping web search",
+            remaining(state.deadline),
         )
+        metrics.increment("deadline.web_search_skipped")
         return "format_output"
 
     logger.info(
-        f"Insufficient RAG evidence (evidence_found={state.evidence_found}, "
-        f"confidence={state.confidence:.2f}), routing to web search"
+        "Insufficient RAG evidence (evidence_found={}, confidence={:.2f}), routing to web search",
+        state.evidence_found,
+        state.confidence,
     )
     return "web_search"
 
 
 def web_search_node(state: AgentState) -> dict:
     """Perform web search when the RAG store lacks sufficient evidence."""
-    logger.info(f"Performing web search for claim: {state.query[:100]}")
-    search_response = web_search_tool.invoke({"query": state.query})
+    logger.info("Performing web search for claim: {}", state.query[:100])
+    try:
+        timeout = call_timeout(state.deadline)
+    except TimeoutError as e:
+        logger.warning("Skipping web search: {}", e)
+        metrics.increment("deadline.exceeded")
+        return {"web_results": "", "web_results_structured": []}
+    search_response = web_search_tool.invoke({"query": state.query, "timeout": timeout})
     return {
         "web_results": search_response["formatted"],
         "web_results_structured": search_response["structured"]
@@ -171,38 +332,36 @@ def evaluate_web_node(state: AgentState) -> dict:
     """Evaluate the claim against web search results."""
     logger.info("Evaluating claim against web search results")
 
-    llm = ChatOpenAI(
-        model=settings.openai_model,
-        api_key=settings.openai_api_key,
-        temperature=0,
-    )
-
-    # Extract URLs from structured web results
+    # Pack structured web results (dropping syndicated copies) and extract URLs
     source_urls = []
     if state.web_results_structured:
-        for result in state.web_results_structured:
-            url = result.get("url", "")
-            if url and url != "No URL" and url not in source_urls:
-                source_urls.append(url)
+        packed = pack_evidence(
+            items_from_web_results(state.web_results_structured), format_web_item
+        )
+        for item in packed.items:
+            if item.source and item.source != "No URL" and item.source not in source_urls:
+                source_urls.append(item.source)
+        evidence_text = packed.text
+    else:
+        # Error / "no results" message from the search tool
+        evidence_text = state.web_results
 
-    messages = [
-        SystemMessage(content=EVALUATE_CLAIM_PROMPT),
-        HumanMessage(
-            content=(
-                f"Claim to verify:\n{state.query}\n\n"
-                f"Evidence from web search:\n{state.web_results}\n\n"
-                "Evaluate the claim and respond with the JSON object."
-            )
-        ),
-    ]
+    messages = build_evaluation_messages(state.query, "Evidence from web search", evidence_text)
 
-    structured_llm = llm.with_structured_output(ClaimEvaluation)
-    evaluation: ClaimEvaluation = structured_llm.invoke(messages)
+    # Tavily's relevance of the best result is the retrieval signal
+    scores = [result["score"] for result in state.web_results_structured if "score" in result]
+    try:
+        evaluation = evaluate_claim(messages, max(scores) if scores else None, state.deadline)
+    except TIMEOUT_ERRORS as e:
+        logger.warning("Web evaluation ran out of time, keeping the RAG verdict: {}", e)
+        metrics.increment("deadline.exceeded")
+        return {"low_confidence": True}
 
     logger.info(
-        f"Web evaluation → evidence_found={evaluation.evidence_found}, "
-        f"confidence={evaluation.confidence:.2f}, "
-        f"claim_verdict={evaluation.claim_verdict}"
+        "Web evaluation → evidence_found={}, confidence={:.2f}, claim_verdict={}",
+        evaluation.evidence_found,
+        evaluation.confidence,
+        evaluation.claim_verdict,
     )
 
     return {
@@ -227,8 +386,14 @@ def sync_to_rag_node(state: AgentState) -> dict:
         logger.warning("No structured web results to sync")
         return {}
 
+    # Embedding the results would delay the response past the deadline
+    if not has_budget(state.deadline, settings.deadline_min_call_seconds):
+        logger.warning("Request deadline reached, not syncing web results")
+        metrics.increment("deadline.sync_skipped")
+        return {}
+
     try:
-        all_chunks = []
+        documents = []
         
         # Process each search result individually
         for result in state.web_results_structured:
@@ -251,47 +416,92 @@ def sync_to_rag_node(state: AgentState) -> dict:
             if "score" in result:
                 metadata["relevance_score"] = result["score"]
             
-            # Ingest this result's content with its metadata
-            chunks = ingest_text_content(
-                content=result.get("content", ""),
-                metadata=metadata
-            )
-            all_chunks.extend(chunks)
+            content = result.get("content", "")
+            if content:
+                documents.append(Document(page_content=content, metadata=metadata))
+
+        # Split all results together, so syndicated copies of one story across
+        # outlets are caught as near-duplicates before they are embedded
+        all_chunks = split_documents(documents) if documents else []
         
         if all_chunks:
             add_documents(all_chunks)
             logger.info(
-                f"Synced {len(all_chunks)} chunk(s) from {len(state.web_results_structured)} web results to RAG store"
+                "Synced {} chunk(s) from {} web results to RAG store",
+                len(all_chunks),
+                len(state.web_results_structured),
             )
         else:
             logger.warning("No chunks produced from web results")
             
     except Exception as e:
-        logger.error(f"Failed to sync web results to RAG store: {e}")
+        logger.error("Failed to sync web results to RAG store: {}", e)
 
     return {}
 
 
 def format_output_node(state: AgentState) -> dict:
     """Compile the final structured output and add it as an AI message."""
+    # An insufficient RAG verdict only gets here when the deadline skipped web search
+    low_confidence = state.low_confidence or (
+        state.evidence_source == "RAG Store" and not _is_sufficient(state)
+    )
+    if low_confidence:
+        metrics.increment("deadline.low_confidence")
     output = {
         "claim": state.claim,
         "verification_data": state.verification_data,
         "evidence_source": state.evidence_source,
         "source_urls": state.source_urls,
         "claim_verdict": state.claim_verdict,
+        "low_confidence": low_confidence,
     }
 
     logger.info(
-        f"Final output → evidence_source={state.evidence_source}, "
-        f"claim_verdict={state.claim_verdict}, "
-        f"source_urls={len(state.source_urls)} URLs"
+        "Final output → evidence_source={}, claim_verdict={}, source_urls={} URLs",
+        state.evidence_source,
+        state.claim_verdict,
+        len(state.source_urls),
     )
 
     return {
         "messages": [
             AIMessage(content=json.dumps(output, indent=2))
         ],
+        "low_confidence": low_confidence,
+    }
+
+
+def extract_output(result: dict, claim: str) -> dict:
+    """Extract the structured verification output from a finished graph run.
+
+    Parses the JSON written by ``format_output_node`` and falls back to the
+    raw state fields when the last message is not valid JSON.
+    """
+    # Extract the structured output from the last AI message
+    ai_messages = [m for m in result.get("messages", []) if hasattr(m, "content")]
+
+    if ai_messages:
+        try:
+            return json.loads(ai_messages[-1].content)
+        except json.JSONDecodeError:
+            # Fallback: build from state fields
+            return {
+                "claim": result.get("claim", claim),
+                "verification_data": result.get("verification_data", ai_messages[-1].content),
+                "evidence_source": result.get("evidence_source", "unknown"),
+                "source_urls": result.get("source_urls", []),
+                "claim_verdict": result.get("claim_verdict", False),
+                "low_confidence": result.get("low_confidence", False),
+            }
+
+    return {
+        "claim": claim,
+        "verification_data": "No analysis produced.",
+        "evidence_source": "unknown",
+        "source_urls": [],
+        "claim_verdict": False,
+        "low_confidence": False,
     }
 
 
@@ -300,15 +510,25 @@ def format_output_node(state: AgentState) -> dict:
 # ---------------------------------------------------------------------------
 
 
-def create_rag_agent() -> StateGraph:
+def create_rag_agent(
+    checkpointer: BaseCheckpointSaver | bool | None = None, decompose: bool = True
+) -> StateGraph:
     """Build and compile the agentic RAG graph.
 
+    With a ``checkpointer`` the state is saved after every node, and runs
+    need a ``thread_id`` in their config (see ``src.agents.checkpoint``).
+    ``decompose=False`` leaves out the decomposition stage (the graph each
+    sub-claim branch runs).
+
     Workflow:
+    0. decompose       – With several sub-claims: verify_sub_claim (one branch
+                         per sub-claim, in parallel, each running 1–3) → aggregate → END
     1. retrieve        – Fetch documents from the vector store
     2. evaluate_rag    – LLM evaluates the claim against RAG evidence
     3. Route:
-       a. confidence > 0.7 & evidence found → format_output → END
-       b. otherwise → web_search → evaluate_web → sync_to_rag → format_output → END
+       a. confidence > confidence_threshold & evidence found → format_output → END
+       b. deadline too close for the web fallback → format_output (low confidence) → END
+       c. otherwise → web_search → evaluate_web → sync_to_rag → format_output → END
 
     Returns a compiled LangGraph that can be invoked with:
         result = agent.invoke({"query": "Some claim to check"})
@@ -316,6 +536,10 @@ def create_rag_agent() -> StateGraph:
     workflow = StateGraph(AgentState)
 
     # Add nodes
+    if decompose:
+        workflow.add_node("decompose", decompose_node)
+        workflow.add_node("verify_sub_claim", verify_sub_claim_node)
+        workflow.add_node("aggregate", aggregate_node)
     workflow.add_node("retrieve", retrieve_node)
     workflow.add_node("evaluate_rag", evaluate_rag_node)
     workflow.add_node("web_search", web_search_node)
@@ -324,7 +548,16 @@ def create_rag_agent() -> StateGraph:
     workflow.add_node("format_output", format_output_node)
 
     # Define edges
-    workflow.set_entry_point("retrieve")
+    if decompose:
+        # decompose → retrieve, or → verify_sub_claim × N → aggregate → END
+        workflow.set_entry_point("decompose")
+        workflow.add_conditional_edges(
+            "decompose", route_after_decomposition, ["retrieve", "verify_sub_claim"]
+        )
+        workflow.add_edge("verify_sub_claim", "aggregate")
+        workflow.add_edge("aggregate", END)
+    else:
+        workflow.set_entry_point("retrieve")
 
     # retrieve → evaluate_rag
     workflow.add_edge("retrieve", "evaluate_rag")
@@ -344,4 +577,4 @@ def create_rag_agent() -> StateGraph:
     # format_output → END
     workflow.add_edge("format_output", END)
 
-    return workflow.compile()
+    return workflow.compile(checkpointer=checkpointer)
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import operator
 from typing import Annotated
 
 from langchain_core.messages import BaseMessage
@@ -9,6 +10,8 @@ from langgraph.graph.message import add_messages
 from pydantic import BaseModel, Field
 from langchain_core.documents import Document
 
+from src.rag.filters import RetrievalFilter
+
 
 class ClaimEvaluation(BaseModel):
     """Structured output from the LLM when evaluating a claim against evidence."""
@@ -37,6 +40,12 @@ class AgentState(BaseModel):
 
     # --- Query ---
     query: str = ""  # The user's claim to verify
+    filters: RetrievalFilter | None = None  # Optional recency / source / domain restrictions
+    deadline: float | None = None  # Absolute wall-clock deadline of the request (src.deadline)
+
+    # --- Claim decomposition ---
+    sub_claims: list[str] = Field(default_factory=list)  # Parts verified in parallel branches
+    sub_results: Annotated[list[dict], operator.add] = Field(default_factory=list)  # Their outputs
 
     # --- RAG retrieval ---
     context: list[Document] = []  # Documents retrieved from the vector store
@@ -52,4 +61,5 @@ class AgentState(BaseModel):
     verification_data: str = ""  # Evidence / analysis text (from RAG or Web)
     evidence_source: str = ""  # "RAG Store" or "WEB"
     source_urls: list[str] = Field(default_factory=list)  # URLs/sources where evidence was fetched
-    claim_verdict: bool = False  # Whether the claim is verified as true
\ No newline at end of file
+    claim_verdict: bool = False  # Whether the claim is verified as true
+    low_confidence: bool = False  # Best-effort verdict: the deadline cut the evaluation short
\ No newline at end of file
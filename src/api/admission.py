@@ -0,0 +1,216 @@
+"""Admission control, bounded queueing and load shedding for agent executions.
+
+Every agent execution fans out into OpenAI (and possibly Tavily) calls, so
+running an unbounded number of them at once only trips provider rate limits
+and collapses latency for everyone.  ``AdmissionController`` caps concurrent
+executions, parks the overflow in a bounded FIFO queue with a deadline and
+rejects the rest immediately with a ``Retry-After`` hint.  Optional per-client
+token buckets stop a single client from monopolising the capacity.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from loguru import logger
+
+from src import metrics
+from src.config import settings
+
+# Buckets are pruned once this many clients are tracked
+MAX_TRACKED_CLIENTS = 10_000
+
+
+class AdmissionRejectedError(Exception):
+    """Raised when a request is shed; maps onto an HTTP 429/503 response."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Classic token bucket refilled at ``rate`` tokens per second up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self) -> float:
+        """Take one token; return 0 on success or the seconds until one is available."""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    @property
+    def full(self) -> bool:
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+class AdmissionController:
+    """Concurrency cap with a bounded, deadline-limited wait queue.
+
+    Args:
+        max_concurrency: Executions allowed to run at the same time.
+        max_queue: Requests allowed to wait for a slot; beyond that they are
+            rejected with 503 straight away.
+        queue_timeout: Seconds a request may wait for a slot before a 503.
+        rate_per_minute: Per-client request rate (0 disables rate limiting).
+        burst: Per-client burst capacity of the token bucket.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue: int,
+        queue_timeout: float,
+        rate_per_minute: float = 0.0,
+        burst: int = 10,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.rate_per_minute = rate_per_minute
+        self.burst = burst
+        self._active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._buckets: dict[str, TokenBucket] = {}
+        self._service_time = 5.0  # EWMA of execution time, seeds Retry-After
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    # -- per-client rate limiting ------------------------------------------
+
+    def check_rate(self, client_id: str) -> None:
+        """Consume one token for ``client_id`` or raise a 429 ``AdmissionRejectedError``."""
+        if self.rate_per_minute <= 0:
+            return
+        bucket = self._buckets.get(client_id)
+        if bucket is None:
+            if len(self._buckets) >= MAX_TRACKED_CLIENTS:
+                self._buckets = {k: b for k, b in self._buckets.items() if not b.full}
+            bucket = self._buckets[client_id] = TokenBucket(
+                self.rate_per_minute / 60, self.burst
+            )
+        wait = bucket.take()
+        if wait:
+            metrics.increment("admission.rejected.rate_limited")
+            raise AdmissionRejectedError(429, "Rate limit exceeded", math.ceil(wait))
+
+    # -- concurrency slots -------------------------------------------------
+
+    def _retry_after(self) -> int:
+        """Estimate when a slot frees up from the queue length and service time."""
+        backlog = (len(self._waiters) + 1) / max(1, self.max_concurrency)
+        return max(1, math.ceil(backlog * self._service_time))
+
+    def _publish(self) -> None:
+        metrics.set_gauge("admission.active", self._active)
+        metrics.set_gauge("admission.queue_depth", len(self._waiters))
+
+    def _release(self) -> None:
+        # Hand the slot straight to the oldest live waiter, if any
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self._publish()
+                return
+        self._active -= 1
+        self._publish()
+
+    async def _acquire(self) -> None:
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            metrics.increment("admission.rejected.queue_full")
+            raise AdmissionRejectedError(503, "Server busy, queue full", self._retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._publish()
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except (TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up – pass it on
+                self._release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            self._publish()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            metrics.increment("admission.rejected.timeout")
+            raise AdmissionRejectedError(
+                503, "Server busy, timed out waiting in queue", self._retry_after()
+            ) from None
+        finally:
+            metrics.observe("admission.queue_wait", time.monotonic() - started)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one execution slot for the duration of the ``async with`` block."""
+        await self._acquire()
+        metrics.increment("admission.admitted")
+        self._publish()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            self._service_time = 0.8 * self._service_time + 0.2 * elapsed
+            self._release()
+
+    def stats(self) -> dict:
+        """Current occupancy, for health checks and debugging."""
+        return {
+            "active": self._active,
+            "queue_depth": len(self._waiters),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "tracked_clients": len(self._buckets),
+        }
+
+
+def create_admission_controller() -> AdmissionController:
+    """Build an ``AdmissionController`` from ``settings``."""
+    logger.info(
+        "Admission control: max_concurrency={}, max_queue={}, queue_timeout={}s, "
+        "rate_limit_per_minute={}",
+        settings.admission_max_concurrency,
+        settings.admission_max_queue,
+        settings.admission_queue_timeout,
+        settings.rate_limit_per_minute,
+    )
+    return AdmissionController(
+        max_concurrency=settings.admission_max_concurrency,
+        max_queue=settings.admission_max_queue,
+        queue_timeout=settings.admission_queue_timeout,
+        rate_per_minute=settings.rate_limit_per_minute,
+        burst=settings.rate_limit_burst,
+    )
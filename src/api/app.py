@@ -1,17 +1,41 @@
 """FastAPI application factory."""
 
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from src.api.routes import router
+from src.api.correlation import HEADER as REQUEST_ID_HEADER
+from src.api.correlation import CorrelationIdMiddleware
+from src.api.routes import job_manager, router, upload_manager
+from src.config import settings
+from src.logger import setup_logger
+from src.memory import watch_memory
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the job workers (recovering unfinished jobs) and the memory watch; stop them."""
+    job_manager.start()
+    upload_manager.start()
+    watcher = None
+    if settings.memory_report_interval:
+        watcher = asyncio.create_task(watch_memory(settings.memory_report_interval))
+    yield
+    if watcher is not None:
+        watcher.cancel()
+    await job_manager.stop()
 
 
 def create_app() -> FastAPI:
     """Create and configure the FastAPI application."""
+    setup_logger()
     app = FastAPI(
         title="AI League Truth Detector",
         description="Agentic RAG-based truth detection API",
         version="0.1.0",
+        lifespan=lifespan,
     )
 
     # CORS – allow all origins during development; tighten for production
@@ -21,7 +45,10 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[REQUEST_ID_HEADER],
     )
+    # Added last so it wraps everything, including CORS responses
+    app.add_middleware(CorrelationIdMiddleware)
 
     app.include_router(router, prefix="/api/v1")
 
@@ -0,0 +1,57 @@
+"""Single-flight coalescing of identical in-flight requests.
+
+When a claim goes viral many clients submit it within seconds.  Instead of
+running retrieval, LLM evaluation, web search and a store write once per
+request, concurrent callers with the same key attach to a single in-flight
+execution and all receive its result – or its exception.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from loguru import logger
+
+from src import metrics
+
+
+class SingleFlight:
+    """Deduplicate concurrent executions of the same keyed coroutine.
+
+    The shared execution runs as its own task, so a caller that disconnects
+    (and is cancelled) does not cancel the work the other callers wait on.
+    Results are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, name: str = "singleflight") -> None:
+        self.name = name
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    @property
+    def inflight(self) -> int:
+        """Number of distinct keys currently executing."""
+        return len(self._inflight)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run ``fn()`` for ``key``, or join the execution already in flight."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+            metrics.increment(f"{self.name}.executions")
+        else:
+            metrics.increment(f"{self.name}.coalesced")
+            logger.debug("Coalesced request onto in-flight execution for key: {}", key[:100])
+        metrics.set_gauge(f"{self.name}.inflight", len(self._inflight))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        metrics.set_gauge(f"{self.name}.inflight", len(self._inflight))
+        # Mark the exception as retrieved even if every waiter was cancelled
+        if not task.cancelled() and task.exception() is not None:
+            metrics.increment(f"{self.name}.failures")
@@ -0,0 +1,45 @@
+"""Per-request correlation IDs.
+
+Takes the caller's ``X-Request-ID`` (or generates one), makes it the
+``request_id`` of every log record written while the request is handled and
+echoes it in the response.  Written as plain ASGI middleware – it adds no
+extra task or body buffering per request, unlike ``BaseHTTPMiddleware``.
+"""
+
+from __future__ import annotations
+
+import uuid
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.logger import request_context
+
+HEADER = "X-Request-ID"
+_MAX_LENGTH = 64
+
+
+class CorrelationIdMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = ""
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1").strip()[:_MAX_LENGTH]
+                break
+        request_id = request_id or uuid.uuid4().hex[:16]
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((HEADER.lower().encode(), request_id.encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        with request_context(request_id):
+            await self.app(scope, receive, send_with_id)
@@ -0,0 +1,404 @@
+"""Asynchronous verification jobs.
+
+The web-fallback path (Tavily search plus two LLM calls plus a store write)
+can take longer than clients want to hold an HTTP connection open.  Jobs let
+a client submit a claim, get a job ID back immediately and poll for – or be
+called back with – the result.
+
+Job state lives in a local SQLite database, which doubles as the work queue:
+workers claim queued jobs atomically, so several worker processes can share
+one store, results survive a restart and finished jobs expire after
+``settings.job_ttl_seconds``.  A running job is leased: its worker renews
+``updated_at`` while it runs, and a job whose lease has not been renewed for
+``settings.job_lease_seconds`` (its process crashed or was killed) is queued
+again.  Process IDs are not used for this – they are reused after a restart.
+
+Store calls run in a thread (``asyncio.to_thread``): SQLite waits up to 30 s
+for a lock held by another process, which must not stall the event loop.
+Webhook URLs must point at a public address (unless
+``settings.job_webhook_allow_private``), so that a job cannot be used to make
+the server POST into its own network.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import ipaddress
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+
+import httpx
+from loguru import logger
+
+from src import metrics
+from src.api.admission import AdmissionRejectedError
+from src.config import settings
+from src.logger import request_context
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    claim TEXT NOT NULL,
+    status TEXT NOT NULL,
+    webhook_url TEXT,
+    result TEXT,
+    error TEXT,
+    owner_pid INTEGER,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+
+def check_webhook_url(url: str) -> None:
+    """Reject webhook URLs that name a private, loopback or otherwise internal host.
+
+    Only literal addresses and local host names can be judged without a DNS
+    lookup; names are resolved again before every delivery
+    (``_pin_webhook_host``).
+
+    Raises:
+        ValueError: If the URL is not http(s) or its host is not public.
+    """
+    parsed = httpx.URL(url)
+    if parsed.scheme not in ("http", "https") or not parsed.host:
+        raise ValueError("webhook_url must be an http(s) URL")
+    if settings.job_webhook_allow_private:
+        return
+    host = parsed.host.rstrip(".").lower()
+    if host == "localhost" or host.endswith((".localhost", ".local", ".internal")):
+        raise ValueError(f"webhook host '{host}' is not public")
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return  # a name: checked once resolved
+    if not address.is_global:
+        raise ValueError(f"webhook host '{host}' is not public")
+
+
+async def _pin_webhook_host(url: str) -> tuple[httpx.URL, dict, dict]:
+    """Resolve the webhook host once and pin the request to a validated address.
+
+    The request connects to the address that was checked rather than the host
+    name, so a name that resolves differently on the next lookup (DNS
+    rebinding) cannot redirect it into the local network.  The ``Host``
+    header and, for https, the TLS server name (used for certificate
+    verification) stay those of the original host.
+
+    Returns:
+        The URL to connect to, the request headers and the request extensions.
+
+    Raises:
+        ValueError: If the host is not public or resolves to a non-public address.
+    """
+    check_webhook_url(url)
+    parsed = httpx.URL(url)
+    if settings.job_webhook_allow_private:
+        return parsed, {}, {}
+    infos = await asyncio.get_running_loop().getaddrinfo(
+        parsed.host, parsed.port or None, type=socket.SOCK_STREAM
+    )
+    for *_, sockaddr in infos:
+        if not ipaddress.ip_address(sockaddr[0]).is_global:
+            raise ValueError(f"webhook host '{parsed.host}' resolves to {sockaddr[0]}")
+    if not infos:
+        raise ValueError(f"webhook host '{parsed.host}' does not resolve")
+    headers = {"Host": parsed.netloc.decode("ascii")}
+    extensions = {"sni_hostname": parsed.host} if parsed.scheme == "https" else {}
+    return parsed.copy_with(host=infos[0][4][0]), headers, extensions
+
+
+class JobStore:
+    """SQLite-backed job table shared by every worker process."""
+
+    def __init__(self, path: str | Path) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(path), isolation_level=None, check_same_thread=False, timeout=30
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row | None) -> dict | None:
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def create(self, claim: str, webhook_url: str | None = None) -> dict:
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, claim, status, webhook_url, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, claim, QUEUED, webhook_url, now, now),
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def claim_next(self) -> dict | None:
+        """Atomically move the oldest queued job to ``running`` and return it."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, owner_pid = ?, updated_at = ? WHERE id = ?",
+                        (RUNNING, os.getpid(), time.time(), row["id"]),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(row["id"]) if row is not None else None
+
+    def finish(
+        self, job_id: str, result: dict | None = None, error: str | None = None
+    ) -> dict | None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ?, "
+                "finished_at = ? WHERE id = ?",
+                (
+                    FAILED if error else SUCCEEDED,
+                    json.dumps(result) if result is not None else None,
+                    error,
+                    now,
+                    now,
+                    job_id,
+                ),
+            )
+        return self.get(job_id)
+
+    def renew(self, job_ids: list[str]) -> None:
+        """Extend the lease of running jobs this process is still working on."""
+        if not job_ids:
+            return
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET updated_at = ? WHERE status = ? "
+                f"AND id IN ({', '.join('?' for _ in job_ids)})",
+                (time.time(), RUNNING, *job_ids),
+            )
+
+    def requeue_orphans(self, lease_seconds: float) -> int:
+        """Re-queue running jobs whose lease expired (their process crashed or was killed)."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, owner_pid = NULL, updated_at = ? "
+                "WHERE status = ? AND updated_at < ?",
+                (QUEUED, time.time(), RUNNING, time.time() - lease_seconds),
+            )
+        return cursor.rowcount
+
+    def purge_expired(self, ttl_seconds: float) -> int:
+        """Delete finished jobs older than ``ttl_seconds``."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (time.time() - ttl_seconds,),
+            )
+        return cursor.rowcount
+
+    def count(self, status: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)
+            ).fetchone()[0]
+
+
+class JobManager:
+    """Worker pool that runs queued verification jobs from a ``JobStore``.
+
+    Args:
+        runner: Coroutine function verifying one claim and returning the
+            structured output (the same path ``/verify`` uses).
+        store: Job store; opened from ``settings.job_store_path`` on start
+            when omitted.
+        workers: Number of concurrent job workers in this process.
+    """
+
+    def __init__(
+        self,
+        runner: Callable[[str], Awaitable[dict]],
+        store: JobStore | None = None,
+        workers: int | None = None,
+    ) -> None:
+        self._runner = runner
+        self._store = store
+        self._workers = workers or settings.job_workers
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup: asyncio.Event | None = None
+        self._running: set[str] = set()
+
+    @property
+    def store(self) -> JobStore:
+        if self._store is None:
+            self._store = JobStore(settings.job_store_path)
+        return self._store
+
+    @property
+    def started(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        """Recover orphaned jobs, purge expired ones and start the workers."""
+        if self.started:
+            return
+        requeued = self.store.requeue_orphans(settings.job_lease_seconds)
+        purged = self.store.purge_expired(settings.job_ttl_seconds)
+        if requeued or purged:
+            logger.info(
+                "Job store: re-queued {} orphaned, purged {} expired job(s)",
+                requeued,
+                purged,
+            )
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self._workers)]
+        self._tasks.append(asyncio.create_task(self._janitor()))
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+        logger.info("Started {} job worker(s)", self._workers)
+
+    async def stop(self) -> None:
+        """Cancel the workers; running jobs are re-queued on the next start."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, claim: str, webhook_url: str | None = None) -> dict:
+        """Persist a new job and wake a worker; returns the job record."""
+        self.start()
+        job = await asyncio.to_thread(self.store.create, claim, webhook_url)
+        metrics.increment("jobs.submitted")
+        self._wakeup.set()
+        return job
+
+    async def get(self, job_id: str) -> dict | None:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job = await asyncio.to_thread(self.store.claim_next)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    # Poll as well: other processes may enqueue into the same store
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=1.0)
+                except TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _run(self, job: dict) -> None:
+        # The job ID is the correlation ID of everything logged while it runs
+        self._running.add(job["id"])
+        try:
+            with request_context(job["id"]):
+                await self._run_job(job)
+        finally:
+            self._running.discard(job["id"])
+
+    async def _run_job(self, job: dict) -> None:
+        logger.info("Job {} started: {}", job["id"], job["claim"][:100])
+        started = time.monotonic()
+        try:
+            while True:
+                try:
+                    result = await self._runner(job["claim"])
+                    break
+                except AdmissionRejectedError as e:
+                    # Jobs are not latency sensitive – wait for capacity instead of failing
+                    await asyncio.sleep(e.retry_after)
+            job = await asyncio.to_thread(self.store.finish, job["id"], result=result)
+            metrics.increment("jobs.succeeded")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Job {} failed: {}", job["id"], e)
+            job = await asyncio.to_thread(self.store.finish, job["id"], error=str(e))
+            metrics.increment("jobs.failed")
+        metrics.observe("jobs.duration", time.monotonic() - started)
+
+        if job and job.get("webhook_url"):
+            await _deliver_webhook(job)
+
+    async def _janitor(self) -> None:
+        while True:
+            await asyncio.sleep(60)
+            purged = await asyncio.to_thread(self.store.purge_expired, settings.job_ttl_seconds)
+            if purged:
+                logger.info("Purged {} expired job(s)", purged)
+            metrics.set_gauge("jobs.queued", await asyncio.to_thread(self.store.count, QUEUED))
+
+    async def _heartbeat(self) -> None:
+        # Renew the leases of our jobs and take over those of crashed processes
+        while True:
+            await asyncio.sleep(settings.job_lease_seconds / 3)
+            try:
+                await asyncio.to_thread(self.store.renew, list(self._running))
+                requeued = await asyncio.to_thread(
+                    self.store.requeue_orphans, settings.job_lease_seconds
+                )
+            except sqlite3.Error as e:
+                logger.warning("Job lease renewal failed: {}", e)
+                continue
+            if requeued:
+                logger.info("Re-queued {} job(s) with an expired lease", requeued)
+                self._wakeup.set()
+
+
+async def _deliver_webhook(job: dict, attempts: int = 3) -> None:
+    """POST the finished job to its webhook URL, retrying with backoff."""
+    payload = {key: job[key] for key in ("id", "claim", "status", "result", "error")}
+    async with httpx.AsyncClient(timeout=settings.job_webhook_timeout) as client:
+        for attempt in range(1, attempts + 1):
+            # Resolved and checked again on every attempt; the request then goes
+            # to exactly the address that passed the check.
+            try:
+                url, headers, extensions = await _pin_webhook_host(job["webhook_url"])
+            except (ValueError, OSError) as e:
+                logger.warning("Webhook for job {} not delivered: {}", job["id"], e)
+                break
+            try:
+                response = await client.post(
+                    url, json=payload, headers=headers, extensions=extensions
+                )
+                response.raise_for_status()
+                metrics.increment("jobs.webhooks_delivered")
+                return
+            except Exception as e:
+                logger.warning(
+                    "Webhook for job {} failed (attempt {}): {}", job["id"], attempt, e
+                )
+                if attempt < attempts:
+                    await asyncio.sleep(2**attempt)
+    metrics.increment("jobs.webhooks_failed")
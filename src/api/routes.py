@@ -2,13 +2,33 @@
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
+import queue
+import threading
+import time
+from functools import lru_cache
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from langgraph.types import Command
 from loguru import logger
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, HttpUrl, field_validator
 
-from src.agents.rag_agent import create_rag_agent
+from src import memory, metrics
+from src.agents.checkpoint import HEADER as IDEMPOTENCY_HEADER
+from src.agents.checkpoint import get_checkpointer, thread_id
+from src.agents.rag_agent import create_rag_agent, extract_output
+from src.api.admission import AdmissionRejectedError, create_admission_controller
+from src.api.coalescing import SingleFlight
+from src.api.jobs import FAILED, JobManager, check_webhook_url
+from src.api.uploads import UploadManager
+from src.config import settings
+from src.deadline import HEADER as DEADLINE_HEADER
+from src.deadline import deadline_after, parse_timeout
+from src.normalize import normalize_claim
+from src.rag.filters import RetrievalFilter
+from src.rag.shards import kb_generation
 
 router = APIRouter()
 
@@ -17,6 +37,167 @@ router = APIRouter()
 _rag_agent = create_rag_agent()
 
 
+@lru_cache(maxsize=1)
+def _durable_agent():
+    """The same graph with a checkpoint after every node (requests with an Idempotency-Key)."""
+    return create_rag_agent(checkpointer=get_checkpointer())
+
+
+# Coalesces identical claims that are verified at the same time
+_single_flight = SingleFlight("verify")
+
+# Caps concurrent agent executions and sheds load beyond the wait queue
+_admission = create_admission_controller()
+
+
+async def _run_durable(thread: str, inputs: dict) -> dict:
+    """Run the checkpointed graph in ``thread``, resuming or reusing an earlier attempt."""
+    agent = _durable_agent()
+    config = {"configurable": {"thread_id": thread}}
+    snapshot = await agent.aget_state(config)
+    if snapshot.next:
+        # An earlier attempt failed: re-run from the failed node on, with this
+        # attempt's deadline (pending sub-claim branches read it from the config)
+        logger.info("Resuming verification at {}", ", ".join(snapshot.next))
+        metrics.increment("checkpoint.resumed")
+        config["configurable"]["deadline"] = inputs["deadline"]
+        return await agent.ainvoke(Command(update={"deadline": inputs["deadline"]}), config)
+    if snapshot.values and not snapshot.values.get("low_confidence"):
+        metrics.increment("checkpoint.reused")
+        return snapshot.values
+    if snapshot.values:
+        # A best-effort verdict was a deadline artefact: verify again
+        await get_checkpointer().adelete_thread(thread)
+    return await agent.ainvoke(inputs, config)
+
+
+async def _run_agent(
+    claim: str,
+    filters: RetrievalFilter | None = None,
+    deadline: float | None = None,
+    thread: str | None = None,
+) -> dict:
+    """Run the agent graph for one claim (within an admission slot)."""
+    inputs = {"query": claim, "filters": filters, "deadline": deadline}
+    async with _admission.slot():
+        if thread is None:
+            result = await _rag_agent.ainvoke(inputs)
+        else:
+            result = await _run_durable(thread, inputs)
+    return extract_output(result, claim)
+
+
+async def _verify(
+    claim: str,
+    filters: RetrievalFilter | None = None,
+    deadline: float | None = None,
+    idempotency_key: str | None = None,
+) -> dict:
+    """Verify a claim, coalescing with identical in-flight claims (and filters).
+
+    Runs under a deadline may return a best-effort verdict, so they only
+    coalesce with other deadline-bound runs (sharing the first one's deadline).
+    With an ``idempotency_key`` the run is checkpointed, so a retry with the
+    same key resumes where the failed attempt stopped; such runs coalesce
+    only with requests carrying the same key.
+    """
+    key = normalize_claim(claim)
+    if filters is not None and not filters.is_empty:
+        key = f"{key}\x00{filters.model_dump_json(exclude_none=True)}"
+    thread = thread_id(idempotency_key, key) if idempotency_key else None
+    if deadline is not None:
+        key = f"{key}\x00deadline"
+    if thread is not None:
+        # A keyed request must checkpoint under its own thread, so that its
+        # retry can resume: it only joins runs with the same key
+        key = f"{key}\x00{thread}"
+    return await _single_flight.do(key, lambda: _run_agent(claim, filters, deadline, thread))
+
+
+# Background worker pool for POST /verify/jobs – reuses the same graph
+job_manager = JobManager(runner=_verify)
+
+# Streamed uploads for POST /ingest/uploads
+upload_manager = UploadManager()
+
+
+# Captured requests wait here for the writer thread: /verify never blocks on the disk
+_capture_queue: queue.Queue[tuple[str, str]] = queue.Queue()
+_capture_lock = threading.Lock()
+_capture_writer: threading.Thread | None = None
+
+
+def _capture(request: VerifyRequest, client_id: str) -> None:
+    """Queue the request for ``settings.traffic_capture_path`` (load-test replay)."""
+    global _capture_writer
+    record = {"ts": time.time(), "client": client_id, **request.model_dump(exclude_none=True)}
+    _capture_queue.put((settings.traffic_capture_path, json.dumps(record) + "\n"))
+    if _capture_writer is None:
+        with _capture_lock:
+            if _capture_writer is None:
+                _capture_writer = threading.Thread(
+                    target=_write_captures, name="traffic-capture", daemon=True
+                )
+                _capture_writer.start()
+
+
+def _write_captures() -> None:
+    while True:
+        items = [_capture_queue.get()]
+        while not _capture_queue.empty():
+            items.append(_capture_queue.get_nowait())
+        lines: dict[str, list[str]] = {}
+        for path, line in items:
+            lines.setdefault(path, []).append(line)
+        for path, batch in lines.items():
+            try:
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write("".join(batch))
+            except OSError as e:
+                logger.warning("Traffic capture to {} failed: {}", path, e)
+        for _ in items:
+            _capture_queue.task_done()
+
+
+def _etag(claim: str, filters: RetrievalFilter | None) -> str:
+    """Strong validator of a verification result at the current knowledge-base generation."""
+    key = normalize_claim(claim)
+    if filters is not None and not filters.is_empty:
+        key = f"{key}\x00{filters.model_dump_json(exclude_none=True)}"
+    digest = hashlib.sha256(f"{key}\x00{kb_generation()}".encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def _cache_headers(etag: str) -> dict[str, str]:
+    return {
+        "ETag": etag,
+        # The response is per claim (and per caller), not for shared caches
+        "Cache-Control": f"private, max-age={settings.verify_cache_max_age}, must-revalidate",
+    }
+
+
+def _client_id(request: Request) -> str:
+    """Identify the caller for per-client rate limiting."""
+    return request.headers.get("X-Client-Id") or (
+        request.client.host if request.client else "unknown"
+    )
+
+
+def _rejection(e: AdmissionRejectedError) -> HTTPException:
+    return HTTPException(
+        status_code=e.status_code,
+        detail=e.detail,
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
 # ---------------------------------------------------------------------------
 # Request / Response schemas
 # ---------------------------------------------------------------------------
@@ -26,6 +207,20 @@ class VerifyRequest(BaseModel):
     """Request body for the /verify endpoint."""
 
     claim: str = Field(..., min_length=1, description="The claim to verify.")
+    filters: RetrievalFilter | None = Field(
+        default=None, description="Optional restrictions on the knowledge-base evidence."
+    )
+
+
+class SubClaimResult(BaseModel):
+    """Verdict on one sub-claim of a decomposed claim."""
+
+    claim: str
+    verification_data: str
+    evidence_source: str  # "RAG Store" or "WEB"
+    source_urls: list[str]
+    claim_verdict: bool
+    low_confidence: bool = False
 
 
 class VerifyResponse(BaseModel):
@@ -33,9 +228,83 @@ class VerifyResponse(BaseModel):
 
     claim: str
     verification_data: str
-    evidence_source: str  # "RAG Store" or "WEB"
+    evidence_source: str  # "RAG Store", "WEB" or both for decomposed claims
     source_urls: list[str]  # Array of URLs where evidence was fetched
     claim_verdict: bool
+    low_confidence: bool = False  # Best-effort verdict: the deadline cut verification short
+    sub_claims: list[SubClaimResult] = Field(default_factory=list)  # With DECOMPOSE_CLAIMS
+
+
+class VerifyJobRequest(BaseModel):
+    """Request body for the /verify/jobs endpoint."""
+
+    claim: str = Field(..., min_length=1, description="The claim to verify.")
+    webhook_url: HttpUrl | None = Field(
+        default=None,
+        description="Optional public URL that receives the finished job as a POST.",
+    )
+
+    @field_validator("webhook_url")
+    @classmethod
+    def _public_webhook(cls, url: HttpUrl | None) -> HttpUrl | None:
+        if url is not None:
+            check_webhook_url(str(url))
+        return url
+
+
+class VerifyJobResponse(BaseModel):
+    """Status of an asynchronous verification job."""
+
+    job_id: str
+    status: str  # "queued", "running", "succeeded" or "failed"
+    claim: str
+    created_at: float
+    finished_at: float | None = None
+    result: VerifyResponse | None = None
+    error: str | None = None
+
+
+class IngestUploadResponse(BaseModel):
+    """Progress and throughput of a streamed upload."""
+
+    upload_id: str
+    filename: str
+    format: str  # "text" or "ndjson"
+    status: str  # "receiving", "processing", "succeeded" or "failed"
+    bytes_total: int | None = None  # From Content-Length, when sent
+    bytes_received: int
+    bytes_processed: int
+    progress: float | None = None  # bytes_processed / bytes_total
+    documents: int
+    invalid_records: int
+    chunks: int
+    duplicates: int
+    stored: int
+    embed_seconds: float
+    elapsed_seconds: float
+    bytes_per_second: float
+    chunks_per_second: float
+    created_at: float
+    finished_at: float | None = None
+    error: str | None = None
+
+
+def _upload_response(upload: dict) -> IngestUploadResponse:
+    return IngestUploadResponse(upload_id=upload["id"], **upload)
+
+
+def _job_response(job: dict) -> VerifyJobResponse:
+    return VerifyJobResponse(
+        job_id=job["id"],
+        status=job["status"],
+        claim=job["claim"],
+        created_at=job["created_at"],
+        finished_at=job["finished_at"],
+        result=(
+            VerifyResponse(**{**job["result"], "claim": job["claim"]}) if job["result"] else None
+        ),
+        error=job["error"],
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -49,57 +318,144 @@ async def health_check():
     return {"status": "ok"}
 
 
-@router.post("/verify", response_model=VerifyResponse)
-async def verify_claim(request: VerifyRequest):
-    """Verify a claim using the Agentic RAG pipeline.
+@router.get("/metrics")
+async def get_metrics():
+    """In-process counters, gauges and timings of this worker."""
+    return metrics.snapshot()
 
-    Workflow:
-    1. Retrieve evidence from the RAG vector store
-    2. Evaluate the claim against retrieved evidence
-    3. If evidence is sufficient (confidence > 0.7) → return result
-    4. Otherwise → web search → evaluate → sync to RAG store → return result
-    """
-    logger.info(f"Received claim: {request.claim[:100]}...")
 
+async def _verify_with_validators(
+    request: VerifyRequest, http_request: Request, response: Response
+) -> VerifyResponse | Response:
+    """Shared body of ``GET``/``POST /verify``: conditional check, then verification."""
+    logger.info("Received claim: {}...", request.claim[:100])
     try:
-        result = _rag_agent.invoke({"query": request.claim})
+        deadline = deadline_after(parse_timeout(http_request.headers.get(DEADLINE_HEADER)))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        # Extract the structured output from the last AI message
-        ai_messages = [m for m in result["messages"] if hasattr(m, "content")]
+    if settings.traffic_capture_path:
+        _capture(request, _client_id(http_request))
 
-        if ai_messages:
-            try:
-                output = json.loads(ai_messages[-1].content)
-            except json.JSONDecodeError:
-                # Fallback: build from state fields
-                output = {
-                    "claim": result.get("claim", request.claim),
-                    "verification_data": result.get("verification_data", ai_messages[-1].content),
-                    "evidence_source": result.get("evidence_source", "unknown"),
-                    "source_urls": result.get("source_urls", []),
-                    "claim_verdict": result.get("claim_verdict", False),
-                }
-        else:
-            output = {
-                "claim": request.claim,
-                "verification_data": "No analysis produced.",
-                "evidence_source": "unknown",
-                "source_urls": [],
-                "claim_verdict": False,
-            }
+    # A client holding the result for this claim at the current knowledge-base
+    # generation gets a 304 without running the graph.  RFC 9110 §13.1.2 only
+    # allows 304 for GET/HEAD; any other method gets 412 Precondition Failed.
+    etag = _etag(request.claim, request.filters)
+    if _etag_matches(http_request.headers.get("If-None-Match"), etag):
+        if http_request.method in ("GET", "HEAD"):
+            metrics.increment("verify.not_modified")
+            return Response(status_code=304, headers=_cache_headers(etag))
+        metrics.increment("verify.precondition_failed")
+        return Response(status_code=412, headers={"ETag": etag})
 
+    try:
+        _admission.check_rate(_client_id(http_request))
+        # Concurrent requests for the same normalized claim share one execution
+        idempotency_key = (
+            http_request.headers.get(IDEMPOTENCY_HEADER) if settings.checkpoint_enabled else None
+        )
+        output = await _verify(request.claim, request.filters, deadline, idempotency_key)
+
+        low_confidence = output.get("low_confidence", False)
+        if low_confidence:
+            # A best-effort verdict must not be revalidated as the final answer
+            metrics.increment("verify.low_confidence")
+            response.headers["Cache-Control"] = "no-store"
+        else:
+            # Web fallback syncs new chunks, so stamp the post-run generation
+            response.headers.update(_cache_headers(_etag(request.claim, request.filters)))
         return VerifyResponse(
-            claim=output["claim"],
+            claim=request.claim,
             verification_data=output["verification_data"],
             evidence_source=output["evidence_source"],
             source_urls=output.get("source_urls", []),
             claim_verdict=output["claim_verdict"],
+            low_confidence=low_confidence,
+            sub_claims=output.get("sub_claims", []),
         )
+    except AdmissionRejectedError as e:
+        logger.warning("Rejected claim ({}): {}", e.status_code, e.detail)
+        raise _rejection(e)
     except Exception as e:
-        logger.error(f"Error verifying claim: {e}")
+        logger.error("Error verifying claim: {}", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/verify", response_model=VerifyResponse)
+async def verify_claim(request: VerifyRequest, http_request: Request, response: Response):
+    """Verify a claim using the Agentic RAG pipeline.
+
+    Workflow:
+    1. Retrieve evidence from the RAG vector store
+    2. Evaluate the claim against retrieved evidence
+    3. If evidence is sufficient (confidence > 0.7) → return result
+    4. Otherwise → web search → evaluate → sync to RAG store → return result
+
+    With ``settings.decompose_claims`` a multi-sentence claim is split and its
+    sub-claims run steps 1–4 in parallel; ``sub_claims`` lists their verdicts.
+
+    Identical claims (after normalisation) that arrive while one is being
+    verified wait for that execution instead of starting their own.  When
+    the server is saturated the request is rejected with 429/503 and a
+    ``Retry-After`` header.  Responses carry an ``ETag`` (normalized claim,
+    filters and knowledge-base generation); a matching ``If-None-Match``
+    is answered with 412 without running the graph (use ``GET /verify`` to
+    revalidate with 304).
+
+    With an ``Idempotency-Key`` header every completed node is checkpointed:
+    a retry with the same key and claim resumes at the node that failed, or
+    reuses the finished verdict.
+
+    An ``X-Request-Timeout`` header (seconds, default
+    ``settings.verify_deadline_seconds``) bounds the latency: when the
+    budget runs short the best verdict so far is returned with
+    ``low_confidence=true``.
+    """
+    return await _verify_with_validators(request, http_request, response)
+
+
+@router.get("/verify", response_model=VerifyResponse)
+async def verify_claim_get(
+    http_request: Request,
+    response: Response,
+    claim: str = Query(..., min_length=1, description="The claim to verify."),
+):
+    """Cacheable variant of ``POST /verify`` (no filters).
+
+    Browsers and HTTP caches store the response and revalidate it with
+    ``If-None-Match``, which is answered with 304 until the knowledge base
+    changes.
+    """
+    return await _verify_with_validators(VerifyRequest(claim=claim), http_request, response)
+
+
+@router.post("/verify/jobs", response_model=VerifyJobResponse, status_code=202)
+async def submit_verify_job(request: VerifyJobRequest, http_request: Request):
+    """Queue a claim for background verification and return its job ID immediately.
+
+    Poll ``GET /verify/jobs/{job_id}`` for the result, or pass ``webhook_url``
+    to receive the finished job as a POST.
+    """
+    try:
+        _admission.check_rate(_client_id(http_request))
+    except AdmissionRejectedError as e:
+        raise _rejection(e)
+
+    webhook_url = str(request.webhook_url) if request.webhook_url else None
+    job = await job_manager.submit(request.claim, webhook_url)
+    logger.info("Queued job {} for claim: {}", job["id"], request.claim[:100])
+    return _job_response(job)
+
+
+@router.get("/verify/jobs/{job_id}", response_model=VerifyJobResponse)
+async def get_verify_job(job_id: str):
+    """Return the status (and, once finished, the result) of a verification job."""
+    job = await job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return _job_response(job)
+
+
 @router.post("/ingest")
 async def ingest_documents():
     """Trigger document ingestion from the data/ directory."""
@@ -107,11 +463,125 @@ async def ingest_documents():
     from src.rag.vector_store import add_documents
 
     try:
-        chunks = ingest()
+        # Loading, splitting and embedding block; keep the event loop serving
+        chunks = await asyncio.to_thread(ingest)
         if not chunks:
             return {"status": "no documents found", "chunks": 0}
-        add_documents(chunks)
+        await asyncio.to_thread(add_documents, chunks)
         return {"status": "success", "chunks": len(chunks)}
     except Exception as e:
-        logger.error(f"Ingestion error: {e}")
+        logger.error("Ingestion error: {}", e)
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/ingest/uploads", response_model=IngestUploadResponse, status_code=202)
+async def upload_documents(
+    request: Request,
+    filename: str = Query(default="upload.txt", min_length=1),
+    fmt: str | None = Query(default=None, alias="format", pattern="^(text|ndjson)$"),
+):
+    """Stream a file (or NDJSON documents) into the knowledge base.
+
+    The raw request body is chunked, deduplicated and embedded while it
+    arrives.  The response is sent once the whole body has been received;
+    the last batches may still be processing — poll
+    ``GET /ingest/uploads/{upload_id}`` for progress.
+    """
+    content_type = request.headers.get("content-type", "")
+    if fmt is None:
+        fmt = "ndjson" if "ndjson" in content_type or "jsonl" in content_type else "text"
+    length = request.headers.get("content-length")
+    try:
+        upload = upload_manager.open(filename, fmt, int(length) if length else None)
+    except AdmissionRejectedError as e:
+        logger.warning("Rejected upload ({}): {}", e.status_code, e.detail)
+        raise _rejection(e)
+    record = await upload_manager.receive(upload, request.stream())
+    if record["status"] == FAILED:
+        raise HTTPException(status_code=422, detail=record["error"])
+    return _upload_response(record)
+
+
+@router.get("/ingest/uploads", response_model=list[IngestUploadResponse])
+async def list_uploads(limit: int = Query(default=20, ge=1, le=200)):
+    """Most recent uploads, newest first."""
+    uploads = await asyncio.to_thread(upload_manager.recent, limit)
+    return [_upload_response(upload) for upload in uploads]
+
+
+@router.get("/ingest/uploads/{upload_id}", response_model=IngestUploadResponse)
+async def get_upload(upload_id: str):
+    """Progress and throughput of a streamed upload."""
+    upload = await asyncio.to_thread(upload_manager.get, upload_id)
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Upload not found or expired")
+    return _upload_response(upload)
+
+
+# ---------------------------------------------------------------------------
+# Memory accounting (per worker process)
+# ---------------------------------------------------------------------------
+
+
+@router.get("/admin/memory")
+async def get_memory_report():
+    """Resident size of each index, model and cache in this worker, with RSS and warnings."""
+    extra = {
+        "single_flight": _single_flight._inflight,
+        "rate_limit_buckets": _admission._buckets,
+    }
+    # Walking large document lists takes a while; keep the event loop free
+    return await asyncio.to_thread(memory.memory_report, extra)
+
+
+def _require_tracing() -> None:
+    # Tracing slows every allocation and each diff without ``target`` takes a
+    # new snapshot: only reachable where an operator turned it on
+    if not settings.memory_tracing_enabled:
+        raise HTTPException(status_code=403, detail="Memory tracing is disabled")
+
+
+@router.post("/admin/memory/tracemalloc/start", dependencies=[Depends(_require_tracing)])
+async def start_tracemalloc(frames: int | None = Query(default=None, ge=1, le=100)):
+    """Start tracing allocations in this worker (costs CPU until stopped)."""
+    memory.start_tracing(frames)
+    return {"tracing": True}
+
+
+@router.post("/admin/memory/tracemalloc/stop", dependencies=[Depends(_require_tracing)])
+async def stop_tracemalloc():
+    """Stop tracing and drop this worker's snapshots."""
+    memory.stop_tracing()
+    return {"tracing": False}
+
+
+@router.get("/admin/memory/snapshots", dependencies=[Depends(_require_tracing)])
+async def list_memory_snapshots():
+    """Labels of the stored tracemalloc snapshots, oldest first."""
+    return {"snapshots": memory.list_snapshots()}
+
+
+@router.post("/admin/memory/snapshots", dependencies=[Depends(_require_tracing)])
+async def take_memory_snapshot(
+    label: str | None = Query(default=None), top: int = Query(default=20, ge=1, le=500)
+):
+    """Store a tracemalloc snapshot and return its top allocation sites."""
+    try:
+        return await asyncio.to_thread(memory.take_snapshot, label, top)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/admin/memory/snapshots/diff", dependencies=[Depends(_require_tracing)])
+async def diff_memory_snapshots(
+    base: str = Query(...),
+    target: str | None = Query(default=None, description="Defaults to a new snapshot"),
+    top: int = Query(default=20, ge=1, le=500),
+):
+    """Allocation sites that grew the most between two snapshots."""
+    try:
+        return await asyncio.to_thread(memory.compare_snapshots, base, target, top)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Unknown snapshot {e}")
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
@@ -0,0 +1,373 @@
+"""Streamed upload ingestion.
+
+``POST /ingest/uploads`` hands the request body to an ``UploadManager`` piece
+by piece as it arrives.  A processing thread per upload chunks the pieces
+(``src.rag.streaming``), drops near-duplicates and embeds and stores the
+chunks in batches of ``settings.ingest_batch_size`` while the upload is still
+running, so the event loop only moves bytes.  At most
+``settings.ingest_queue_pieces`` received pieces wait for the processing
+thread; when it falls behind, reading the body pauses (TCP backpressure), so
+memory stays bounded however large the upload is.
+
+Progress and throughput are written to the ``uploads`` table of the job store
+(throttled), so any worker process can answer a status request.  The writes
+double as a lease: an unfinished upload whose record has not been written for
+``settings.job_lease_seconds`` belonged to a process that died, and is failed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import AsyncIterator, Callable
+from pathlib import Path
+
+from langchain_core.documents import Document
+from loguru import logger
+
+from src import metrics
+from src.api.admission import AdmissionRejectedError
+from src.api.jobs import FAILED, SUCCEEDED
+from src.config import settings
+from src.logger import request_context
+from src.rag.streaming import NdjsonChunker, StreamingChunker
+
+RECEIVING = "receiving"  # body still arriving (chunks are stored meanwhile)
+PROCESSING = "processing"  # body received, last batches being embedded
+
+FORMATS = ("text", "ndjson")
+
+# Minimum seconds between progress writes to the store
+_SAVE_INTERVAL = 0.5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    format TEXT NOT NULL,
+    status TEXT NOT NULL,
+    bytes_total INTEGER,
+    bytes_received INTEGER NOT NULL DEFAULT 0,
+    bytes_processed INTEGER NOT NULL DEFAULT 0,
+    documents INTEGER NOT NULL DEFAULT 0,
+    invalid_records INTEGER NOT NULL DEFAULT 0,
+    chunks INTEGER NOT NULL DEFAULT 0,
+    duplicates INTEGER NOT NULL DEFAULT 0,
+    stored INTEGER NOT NULL DEFAULT 0,
+    embed_seconds REAL NOT NULL DEFAULT 0,
+    error TEXT,
+    owner_pid INTEGER,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    finished_at REAL
+);
+"""
+
+_COUNTERS = (
+    "bytes_received",
+    "bytes_processed",
+    "documents",
+    "invalid_records",
+    "chunks",
+    "duplicates",
+    "stored",
+    "embed_seconds",
+)
+
+
+class UploadStore:
+    """SQLite table of upload progress, next to the verification jobs."""
+
+    def __init__(self, path: str | Path) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(path), isolation_level=None, check_same_thread=False, timeout=30
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    def save(self, upload: dict) -> None:
+        columns = list(upload)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO uploads ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' for _ in columns)})",
+                [upload[column] for column in columns],
+            )
+
+    def get(self, upload_id: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM uploads WHERE id = ?", (upload_id,)).fetchone()
+        return with_throughput(dict(row)) if row else None
+
+    def recent(self, limit: int = 20) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM uploads ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [with_throughput(dict(row)) for row in rows]
+
+    def fail_orphans(self, lease_seconds: float) -> int:
+        """Fail unfinished uploads not written for ``lease_seconds``; they cannot be resumed."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE uploads SET status = ?, error = ?, updated_at = ?, finished_at = ? "
+                "WHERE finished_at IS NULL AND updated_at < ?",
+                (FAILED, "interrupted by a restart", now, now, now - lease_seconds),
+            )
+        return cursor.rowcount
+
+    def purge_expired(self, ttl_seconds: float) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM uploads WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (time.time() - ttl_seconds,),
+            )
+        return cursor.rowcount
+
+
+def _orphaned(upload: dict) -> bool:
+    return (
+        upload["finished_at"] is None
+        and time.time() - upload["updated_at"] > settings.job_lease_seconds
+    )
+
+
+def with_throughput(upload: dict) -> dict:
+    """Add elapsed time, progress and throughput to an upload record."""
+    end = upload["finished_at"] or time.time()
+    elapsed = max(end - upload["created_at"], 1e-9)
+    upload["elapsed_seconds"] = round(elapsed, 3)
+    upload["progress"] = (
+        min(upload["bytes_processed"] / upload["bytes_total"], 1.0)
+        if upload["bytes_total"]
+        else None
+    )
+    upload["bytes_per_second"] = round(upload["bytes_processed"] / elapsed, 1)
+    upload["chunks_per_second"] = round(upload["stored"] / elapsed, 2)
+    return upload
+
+
+class Upload:
+    """Live state of one upload being ingested by this process."""
+
+    def __init__(self, filename: str, fmt: str, bytes_total: int | None) -> None:
+        now = time.time()
+        self.record = {
+            "id": uuid.uuid4().hex,
+            "filename": filename,
+            "format": fmt,
+            "status": RECEIVING,
+            "bytes_total": bytes_total,
+            **dict.fromkeys(_COUNTERS, 0),
+            "error": None,
+            "owner_pid": os.getpid(),
+            "created_at": now,
+            "updated_at": now,
+            "finished_at": None,
+        }
+        metadata = {"source": filename, "source_type": "file", "upload_id": self.id}
+        self.chunker = NdjsonChunker(metadata) if fmt == "ndjson" else StreamingChunker(metadata)
+        self.pieces: queue.Queue[bytes | None] = queue.Queue(maxsize=settings.ingest_queue_pieces)
+        self.done = threading.Event()
+        self.cancelled = False
+
+    @property
+    def id(self) -> str:
+        return self.record["id"]
+
+    def put(self, piece: bytes | None) -> bool:
+        """Hand a piece (``None`` = end of body) to the processing thread.
+
+        Blocks while the queue is full; returns ``False`` if processing has
+        ended (failed), so the caller can stop reading the body.
+        """
+        while not self.done.is_set():
+            try:
+                self.pieces.put(piece, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+
+class UploadManager:
+    """Runs streamed uploads through chunking, deduplication and embedding.
+
+    Args:
+        store_chunks: Stores a batch of chunks and returns how many were kept
+            (defaults to near-duplicate filtering plus ``add_documents``).
+        store: Progress store; opened from ``settings.job_store_path`` when omitted.
+    """
+
+    def __init__(
+        self,
+        store_chunks: Callable[[list[Document]], int] | None = None,
+        store: UploadStore | None = None,
+    ) -> None:
+        self._store_chunks = store_chunks or _store_chunks
+        self._store = store
+        self._active: dict[str, Upload] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def store(self) -> UploadStore:
+        if self._store is None:
+            self._store = UploadStore(settings.job_store_path)
+        return self._store
+
+    def start(self) -> None:
+        """Fail uploads interrupted by a restart and purge expired ones."""
+        failed = self.store.fail_orphans(settings.job_lease_seconds)
+        purged = self.store.purge_expired(settings.job_ttl_seconds)
+        if failed or purged:
+            logger.info("Upload store: failed {} interrupted, purged {} expired", failed, purged)
+
+    def open(self, filename: str, fmt: str, bytes_total: int | None = None) -> Upload:
+        """Register an upload and start its processing thread."""
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown upload format '{fmt}' (expected one of {FORMATS})")
+        with self._lock:
+            if len(self._active) >= settings.ingest_max_uploads:
+                raise AdmissionRejectedError(503, "Too many uploads in progress", retry_after=5)
+            upload = Upload(filename, fmt, bytes_total)
+            self._active[upload.id] = upload
+        self.store.save(upload.record)
+        threading.Thread(
+            target=self._process, args=(upload,), name=f"upload-{upload.id[:8]}", daemon=True
+        ).start()
+        metrics.increment("ingest.uploads.started")
+        logger.info("Upload {} started: {} ({})", upload.id, filename, fmt)
+        return upload
+
+    async def receive(self, upload: Upload, body: AsyncIterator[bytes]) -> dict:
+        """Feed the request body to ``upload``; returns its record once the body is consumed."""
+        try:
+            async for piece in body:
+                if not piece:
+                    continue
+                upload.record["bytes_received"] += len(piece)
+                # Only hop to a thread when the processing thread is behind
+                try:
+                    upload.pieces.put_nowait(piece)
+                except queue.Full:
+                    if not await asyncio.to_thread(upload.put, piece):
+                        break
+            else:
+                await asyncio.to_thread(upload.put, None)
+        except BaseException:
+            # Client went away (or the server is stopping): keep what was stored
+            upload.cancelled = True
+            raise
+        return self.get(upload.id)
+
+    def get(self, upload_id: str) -> dict | None:
+        """Live record if this process runs the upload, else the stored one."""
+        upload = self._active.get(upload_id)
+        if upload is not None:
+            return with_throughput(dict(upload.record))
+        record = self.store.get(upload_id)
+        if record is not None and _orphaned(record):
+            self.store.fail_orphans(settings.job_lease_seconds)
+            record = self.store.get(upload_id)
+        return record
+
+    def recent(self, limit: int = 20) -> list[dict]:
+        records = self.store.recent(limit)
+        if any(record["id"] not in self._active and _orphaned(record) for record in records):
+            self.store.fail_orphans(settings.job_lease_seconds)
+            records = self.store.recent(limit)
+        return records
+
+    def _save(self, upload: Upload, force: bool = False) -> None:
+        now = time.time()
+        if force or now - upload.record["updated_at"] >= _SAVE_INTERVAL:
+            upload.record["updated_at"] = now
+            self.store.save(upload.record)
+
+    def _next_piece(self, upload: Upload) -> bytes | None:
+        while True:
+            if upload.cancelled:
+                raise ConnectionAbortedError("upload aborted by the client")
+            try:
+                return upload.pieces.get(timeout=0.5)
+            except queue.Empty:
+                # Waiting on a slow client: keep the lease alive
+                if time.time() - upload.record["updated_at"] >= settings.job_lease_seconds / 3:
+                    self._save(upload, force=True)
+
+    def _process(self, upload: Upload) -> None:
+        # The upload ID is the correlation ID of everything logged while it runs
+        with request_context(upload.id):
+            record = upload.record
+            try:
+                batch: list[Document] = []
+                while True:
+                    piece = self._next_piece(upload)
+                    if piece is None:
+                        record["status"] = PROCESSING
+                        batch.extend(upload.chunker.close())
+                    else:
+                        batch.extend(upload.chunker.feed(piece))
+                        record["bytes_processed"] += len(piece)
+                    record["documents"] = upload.chunker.documents
+                    record["invalid_records"] = getattr(upload.chunker, "invalid", 0)
+                    if len(batch) >= settings.ingest_batch_size or (piece is None and batch):
+                        self._store_batch(upload, batch)
+                        batch = []
+                    self._save(upload)
+                    if piece is None:
+                        break
+                record["status"] = SUCCEEDED
+                metrics.increment("ingest.uploads.succeeded")
+            except Exception as e:
+                logger.error("Upload {} failed: {}", upload.id, e)
+                record["status"] = FAILED
+                record["error"] = str(e)
+                metrics.increment("ingest.uploads.failed")
+            finally:
+                record["finished_at"] = time.time()
+                self._save(upload, force=True)
+                with self._lock:
+                    self._active.pop(upload.id, None)
+                upload.done.set()
+            logger.info(
+                "Upload {} {}: {} bytes, {} chunk(s) stored, {} duplicate(s) in {:.1f}s",
+                upload.id,
+                record["status"],
+                record["bytes_processed"],
+                record["stored"],
+                record["duplicates"],
+                record["finished_at"] - record["created_at"],
+            )
+
+    def _store_batch(self, upload: Upload, batch: list[Document]) -> None:
+        started = time.perf_counter()
+        stored = self._store_chunks(batch)
+        elapsed = time.perf_counter() - started
+        record = upload.record
+        record["chunks"] += len(batch)
+        record["stored"] += stored
+        record["duplicates"] += len(batch) - stored
+        record["embed_seconds"] += elapsed
+        metrics.increment("ingest.uploads.chunks", stored)
+        metrics.observe("ingest.uploads.batch_seconds", elapsed)
+
+
+def _store_chunks(chunks: list[Document]) -> int:
+    from src.rag.dedup import deduplicate
+    from src.rag.vector_store import add_documents
+
+    survivors = deduplicate(chunks)
+    if survivors:
+        add_documents(survivors)
+    return len(survivors)
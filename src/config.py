@@ -10,10 +10,30 @@ class Settings(BaseSettings):
     openai_api_key: str = ""
     openai_model: str = "gpt-4o"
     openai_embedding_model: str = "text-embedding-3-small"
+    openai_base_url: str = ""  # OpenAI-compatible endpoint override ("" = api.openai.com)
+    cascade_small_model: str = ""  # Cheap model evaluating first, e.g. "gpt-4o-mini" ("" = off)
+    cascade_band_low: float = 0.4  # Small-model confidence in [low, high) is escalated
+    cascade_band_high: float = 0.85
+    cascade_retrieval_threshold: float = 0.5  # Evidence score that counts as "supported"
+
+    # --- Embeddings ---
+    embedding_provider: str = "openai"  # "openai" or "local" (sentence-transformer on CPU)
+    local_embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"
+    local_embedding_backend: str = "int8"  # "torch", "int8" (quantized Linear layers) or "onnx"
+    local_embedding_onnx_file: str = ""  # ONNX weights in the model repo ("" = onnx/model.onnx)
+    local_embedding_threads: int = 0  # CPU threads for inference (0 = library default)
+    local_embedding_max_batch: int = 64  # Max texts per forward pass
+    local_embedding_max_wait_ms: float = 0.0  # Wait to grow a batch (0 = only what is queued)
 
     # --- Vector Store ---
     chroma_persist_dir: str = "./chroma_db"
     chroma_collection_name: str = "truth_detector"
+    shard_collections: bool = False  # One collection + index per source type / time bucket
+    shard_time_bucket: str = "month"  # Web shard granularity: "week", "month" or "year"
+    shard_cold_after_days: int = 30  # Unwritten shards keep their BM25 index memory-mapped
+    index_rebuild_debounce: float = 2.0  # Quiet seconds after a write before rebuilding
+    index_rebuild_max_delay: float = 30.0  # Rebuild at the latest this long after a write
+    index_watch_interval: float = 1.0  # Seconds between checks for other workers' writes
 
     # --- RAG ---
     chunk_size: int = 1000
@@ -21,17 +41,95 @@ class Settings(BaseSettings):
     retriever_top_k: int = 20
     retriever_top_n: int = 5
     similarity_threshold: float = 0.7
+    confidence_threshold: float = 0.7  # RAG confidence above which web search is skipped
+    hybrid_vector_weight: float = 0.7  # Fusion weight of the vector leg
+    hybrid_bm25_weight: float = 0.3  # Fusion weight of the BM25 leg
+    hybrid_fusion: str = "rrf"  # "rrf" (reciprocal rank) or "weighted" (normalised scores)
+
+    # --- Near-duplicate detection at ingest ---
+    dedup_enabled: bool = True  # Skip chunks that near-duplicate a stored or batched chunk
+    dedup_threshold: float = 0.8  # Estimated shingle Jaccard similarity counted as duplicate
+    dedup_num_perm: int = 128  # MinHash permutations per signature
+    dedup_bands: int = 16  # LSH bands (num_perm / bands rows each); more bands = more candidates
+
+    # --- Adaptive retrieval depth (retriever_top_k becomes the maximum depth) ---
+    adaptive_retrieval: bool = True  # Fetch shallow first; widen / re-rank only while ambiguous
+    adaptive_k_initial: int = 5  # Per-leg candidates fetched first
+    adaptive_rerank_batch: int = 5  # Candidates re-ranked per step
+    adaptive_high: float = 0.9  # Stop once the top_n-th re-ranker score reaches this
+    adaptive_low: float = 0.02  # Stop when no re-ranker score reaches this (clearly irrelevant)
+    adaptive_margin: float = 0.3  # Stop once a batch's best is this far below the top_n-th best
+
+    # --- Retrieval cache ---
+    retrieval_cache_size: int = 1024  # Re-ranked results kept per process (0 = disabled)
+
+    # --- Claim decomposition ---
+    decompose_claims: bool = False  # Split multi-sentence claims and verify the parts in parallel
+    decompose_max_claims: int = 5  # Sub-claims per request; adjacent sentences merge beyond this
+    decompose_min_words: int = 4  # Shorter sentences stay with their neighbour
+
+    # --- Evidence packing ---
+    evidence_token_budget: int = 3000  # Max prompt tokens of evidence (0 = unlimited)
+    evidence_dedup_threshold: float = 0.8  # Shingle containment above which passages are duplicates
+    evidence_min_overlap: int = 40  # Min shared characters to stitch same-source chunks
 
     # --- Web Search ---
     tavily_api_key: str = ""
+    tavily_base_url: str = ""  # Tavily endpoint override ("" = api.tavily.com)
 
     # --- API ---
     api_host: str = "0.0.0.0"
     api_port: int = 8000
     api_reload: bool = True
+    api_workers: int = 1  # >1 starts the pre-forking launcher (src/server.py)
+    api_preload: bool = True  # Load models & indexes in the master before forking
+    memory_report_interval: int = 60  # Seconds between per-worker memory reports (0 = off)
+    memory_warn_rss_mb: int = 0  # Warn when a process's RSS exceeds this many MB (0 = off)
+    memory_warn_limit_fraction: float = 0.8  # Warn above this share of the cgroup memory limit
+    memory_warn_component_mb: int = 0  # Warn when one index / model / cache exceeds this (0 = off)
+    memory_tracing_enabled: bool = False  # Expose the tracemalloc endpoints (admin only)
+    tracemalloc_frames: int = 1  # Stack frames recorded per allocation while tracing
+    verify_cache_max_age: int = 0  # Seconds a /verify result may be reused before revalidating
+    traffic_capture_path: str = ""  # Append every /verify request to this JSONL for replay
+
+    # --- Request deadlines ---
+    verify_deadline_seconds: float = 0.0  # Default /verify latency budget (0 = none)
+    deadline_web_search_seconds: float = 8.0  # Budget needed to try the web fallback at all
+    deadline_escalation_seconds: float = 3.0  # Budget needed to escalate to the large model
+    deadline_min_call_seconds: float = 0.5  # Outbound calls are not started with less budget left
+
+    # --- Graph checkpoints (requests with an Idempotency-Key) ---
+    checkpoint_enabled: bool = True  # Resume retried /verify requests at the node that failed
+    checkpoint_store_path: str = "./jobs/checkpoints.db"  # SQLite store for graph checkpoints
+    checkpoint_ttl_seconds: int = 3600  # Threads expire this long after their last checkpoint
+
+    # --- Admission control ---
+    admission_max_concurrency: int = 8  # Agent executions allowed to run at once
+    admission_max_queue: int = 32  # Requests allowed to wait for a slot
+    admission_queue_timeout: float = 15.0  # Seconds a request may wait before a 503
+    rate_limit_per_minute: float = 0.0  # Per-client requests per minute (0 = disabled)
+    rate_limit_burst: int = 10  # Per-client burst capacity
+
+    # --- Verification jobs ---
+    job_store_path: str = "./jobs/jobs.db"  # SQLite store for job state & results
+    job_workers: int = 4  # Concurrent job workers per process
+    job_ttl_seconds: int = 86400  # Finished jobs expire after this many seconds
+    job_webhook_timeout: float = 10.0  # Seconds per completion webhook attempt
+    job_webhook_allow_private: bool = False  # Allow webhooks to private/loopback hosts
+    job_lease_seconds: float = 60.0  # Running jobs/uploads not renewed this long are orphans
+
+    # --- Upload ingestion ---
+    ingest_max_uploads: int = 2  # Streamed uploads processed at once per process
+    ingest_batch_size: int = 64  # Chunks embedded and stored per batch
+    ingest_queue_pieces: int = 64  # Received body pieces buffered ahead of processing
+    ingest_max_record_mb: int = 16  # Largest single NDJSON record accepted
 
     # --- Logging ---
     log_level: str = "INFO"
+    log_format: str = "text"  # "text" (human readable) or "json" (one object per line)
+    log_file: str = "logs/app.log"  # Rotating log file ("" = stderr only)
+    log_enqueue: bool = True  # Write log lines from a background thread
+    log_sample_rate: float = 1.0  # Share of requests whose INFO/DEBUG lines are kept
 
     model_config = {"env_file": ".env", "env_file_encoding": "utf-8"}
 
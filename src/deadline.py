@@ -0,0 +1,74 @@
+"""Per-request latency budgets.
+
+A ``/verify`` request gets an absolute deadline (wall-clock seconds) from its
+``X-Request-Timeout`` header or ``settings.verify_deadline_seconds``.  The
+deadline travels through the agent state; nodes check the remaining budget
+before starting slow work and derive the timeouts of their outbound calls
+from it, so a slow dependency degrades the answer rather than the latency.
+``None`` everywhere means "no deadline".
+"""
+
+from __future__ import annotations
+
+import math
+import time
+
+import httpx
+import openai
+
+from src.config import settings
+
+HEADER = "X-Request-Timeout"
+
+# Raised by outbound calls that ran out of budget
+TIMEOUT_ERRORS = (TimeoutError, openai.APITimeoutError, httpx.TimeoutException)
+
+
+def deadline_after(seconds: float | None) -> float | None:
+    """Absolute deadline ``seconds`` from now (``None`` or ``<= 0`` = no deadline)."""
+    return time.time() + seconds if seconds and seconds > 0 else None
+
+
+def parse_timeout(value: str | None) -> float | None:
+    """Budget in seconds from an ``X-Request-Timeout`` header, else the configured default.
+
+    Raises:
+        ValueError: If the header is not a positive number.
+    """
+    if value is None:
+        return settings.verify_deadline_seconds or None
+    try:
+        seconds = float(value)
+    except ValueError:
+        seconds = 0.0
+    if not (seconds > 0 and math.isfinite(seconds)):
+        raise ValueError(f"{HEADER} must be a positive number of seconds, got {value!r}")
+    return seconds
+
+
+def remaining(deadline: float | None) -> float | None:
+    """Seconds left until ``deadline`` (never negative); ``None`` without a deadline."""
+    if deadline is None:
+        return None
+    return max(deadline - time.time(), 0.0)
+
+
+def has_budget(deadline: float | None, seconds: float) -> bool:
+    """Whether at least ``seconds`` are left (always true without a deadline)."""
+    left = remaining(deadline)
+    return left is None or left >= seconds
+
+
+def call_timeout(deadline: float | None, default: float | None = None) -> float | None:
+    """Timeout for an outbound call: the remaining budget, capped at ``default``.
+
+    Raises:
+        TimeoutError: If less than ``settings.deadline_min_call_seconds`` is left,
+            so a call that cannot finish is not started.
+    """
+    left = remaining(deadline)
+    if left is None:
+        return default
+    if left < settings.deadline_min_call_seconds:
+        raise TimeoutError(f"request deadline leaves {left:.2f}s for an outbound call")
+    return min(left, default) if default else left
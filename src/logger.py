@@ -1,31 +1,269 @@
-"""Application-wide logger configuration using Loguru."""
+"""Application-wide logger configuration using Loguru.
 
+Every record carries the correlation ID of the request (or job) that produced
+it as ``extra["request_id"]``, set through :func:`request_context`.
+
+To keep logging off the request's critical path:
+
+* ``LOG_ENQUEUE`` replaces the stderr/file handlers with a single
+  :class:`BackgroundSink`: the request thread only puts the record on an
+  in-process queue and a writer thread formats and writes it (in batches).
+  loguru's own ``enqueue=True`` is not used – it pickles every record
+  through a multiprocessing pipe, which costs the caller more than the write
+  it saves.
+* ``LOG_SAMPLE_RATE`` keeps the INFO/DEBUG lines of only that share of
+  requests.  The decision is made once per request, so a sampled request
+  keeps its complete trace.  Warnings, errors and lines logged outside a
+  request are always kept.
+* ``LOG_FORMAT=json`` writes one compact JSON object per line.
+
+Under the pre-forking launcher every worker writes (and rotates) its own
+file, ``LOG_FILE`` with a ``.worker-<slot>`` suffix: processes sharing one
+file would rotate it behind each other's backs.
+
+Log calls on the hot path pass their arguments separately
+(``logger.info("Retrieved {} document(s)", n)``), so the message is only
+formatted when some handler accepts the level.
+"""
+
+from __future__ import annotations
+
+import json
+import queue
 import sys
+import threading
+import time
+import traceback
+import zlib
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
 
 from loguru import logger
 
 from src.config import settings
 
+_request_id: ContextVar[str] = ContextVar("request_id", default="-")
+_sampled: ContextVar[bool] = ContextVar("log_sampled", default=True)
 
-def setup_logger() -> None:
-    """Configure the application logger."""
-    logger.remove()  # Remove default handler
-    logger.add(
-        sys.stderr,
-        level=settings.log_level,
-        format=(
-            "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | "
-            "<level>{level: <8}</level> | "
-            "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - "
-            "<level>{message}</level>"
-        ),
-    )
-    logger.add(
-        "logs/app.log",
-        rotation="10 MB",
-        retention="7 days",
-        level=settings.log_level,
+_TEXT_FORMAT = (
+    "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | "
+    "<level>{level: <8}</level> | "
+    "<magenta>{extra[request_id]}</magenta> | "
+    "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - "
+    "<level>{message}</level>"
+)
+
+ROTATION_BYTES = 10 * 1024 * 1024
+RETENTION_SECONDS = 7 * 86400
+
+# Slot of this pre-forked worker (None in a single-process server)
+_worker: int | None = None
+
+
+def is_sampled(request_id: str, rate: float | None = None) -> bool:
+    """Whether the INFO/DEBUG lines of ``request_id`` are kept (stable per ID)."""
+    rate = settings.log_sample_rate if rate is None else rate
+    if rate >= 1:
+        return True
+    return zlib.crc32(request_id.encode()) / 0x100000000 < rate
+
+
+@contextmanager
+def request_context(request_id: str) -> Iterator[None]:
+    """Attach ``request_id`` (and its sampling decision) to every record logged inside."""
+    id_token = _request_id.set(request_id)
+    sampled_token = _sampled.set(is_sampled(request_id))
+    try:
+        yield
+    finally:
+        _request_id.reset(id_token)
+        _sampled.reset(sampled_token)
+
+
+def _patch(record) -> None:
+    record["extra"].setdefault("request_id", _request_id.get())
+
+
+def _keep(record) -> bool:
+    return record["level"].no >= 30 or _sampled.get()  # WARNING and above always pass
+
+
+def _exception_text(record) -> str:
+    exc = record["exception"]
+    return "".join(traceback.format_exception(exc.type, exc.value, exc.traceback))
+
+
+def render_json(record) -> str:
+    """One JSON line for a loguru record."""
+    payload = {
+        "ts": record["time"].isoformat(timespec="milliseconds"),
+        "level": record["level"].name,
+        "request_id": record["extra"].get("request_id", "-"),
+        "logger": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+        "message": record["message"],
+    }
+    if record["exception"] is not None:
+        payload["exception"] = _exception_text(record)
+    return json.dumps(payload, ensure_ascii=False, default=str) + "\n"
+
+
+def render_text(record) -> str:
+    """One plain (uncoloured) text line for a loguru record."""
+    line = (
+        f"{record['time']:%Y-%m-%d %H:%M:%S} | {record['level'].name: <8} | "
+        f"{record['extra'].get('request_id', '-')} | "
+        f"{record['name']}:{record['function']}:{record['line']} - {record['message']}\n"
     )
+    if record["exception"] is not None:
+        line += _exception_text(record)
+    return line
+
+
+def _json_format(record) -> str:
+    record["extra"]["_json"] = render_json(record)
+    return "{extra[_json]}"
+
+
+class RotatingFile:
+    """Append-only log file rotated by size, with age-based retention of old files."""
+
+    def __init__(
+        self,
+        path: str,
+        rotation_bytes: int = ROTATION_BYTES,
+        retention_seconds: float = RETENTION_SECONDS,
+    ) -> None:
+        self.path = Path(path)
+        self.rotation_bytes = rotation_bytes
+        self.retention_seconds = retention_seconds
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._size = self._file.tell()
+
+    def write(self, text: str) -> None:
+        size = len(text.encode("utf-8"))
+        if self._size and self._size + size > self.rotation_bytes:
+            self._rotate()
+        self._file.write(text)
+        self._size += size
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def _rotate(self) -> None:
+        self._file.close()
+        stamp = time.strftime("%Y-%m-%d_%H-%M-%S")
+        target = self.path.with_name(f"{self.path.stem}.{stamp}{self.path.suffix}")
+        serial = 1
+        while target.exists():  # rotated twice within a second
+            target = self.path.with_name(f"{self.path.stem}.{stamp}-{serial}{self.path.suffix}")
+            serial += 1
+        self.path.rename(target)
+        cutoff = time.time() - self.retention_seconds
+        # Rotated files start with the year, so other workers' files do not match
+        for old in self.path.parent.glob(f"{self.path.stem}.[0-9]*{self.path.suffix}"):
+            if old.stat().st_mtime < cutoff:
+                old.unlink(missing_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._size = 0
+
+
+class BackgroundSink:
+    """Loguru sink that hands records to a writer thread.
+
+    ``write`` (called on the logging thread) is a single queue put; the writer
+    renders whatever has queued up and writes it to every stream in one go.
+    ``stop`` (called by ``logger.remove``) drains the queue first.
+    """
+
+    def __init__(self, render: Callable[[dict], str], streams: list, batch: int = 512) -> None:
+        self._render = render
+        self._streams = streams
+        self._batch = batch
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._drain, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, message) -> None:
+        self._queue.put(message.record)
+
+    def stop(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+        for stream in self._streams:
+            if isinstance(stream, RotatingFile):
+                stream.close()
+
+    def _drain(self) -> None:
+        stopping = False
+        while not stopping:
+            records = [self._queue.get()]
+            while len(records) < self._batch and not self._queue.empty():
+                records.append(self._queue.get_nowait())
+            if records[-1] is None:
+                stopping = True
+                records.pop()
+            text = "".join(self._render(record) for record in records)
+            for stream in self._streams:
+                if getattr(stream, "closed", False):
+                    continue
+                try:
+                    stream.write(text)
+                    stream.flush()
+                except Exception as e:  # never let a full disk kill the writer
+                    print(f"Log write failed: {e}", file=sys.__stderr__)
+
+
+def log_file_path() -> str:
+    """``settings.log_file`` of this process: one file per pre-forked worker."""
+    if not settings.log_file or _worker is None:
+        return settings.log_file
+    path = Path(settings.log_file)
+    return str(path.with_name(f"{path.stem}.worker-{_worker}{path.suffix}"))
+
+
+def setup_logger(worker: int | None = None) -> None:
+    """Configure the application logger.
+
+    Args:
+        worker: Slot of the pre-forked worker this process is; kept for
+            later calls, which then write to the same per-worker file.
+    """
+    global _worker
+    if worker is not None:
+        _worker = worker
+    logger.remove()  # Remove default handler (and stop any previous writer)
+    logger.configure(patcher=_patch)
+    log_file = log_file_path()
 
+    if settings.log_enqueue:
+        streams: list = [sys.stderr]
+        if log_file:
+            streams.append(RotatingFile(log_file))
+        render = render_json if settings.log_format == "json" else render_text
+        logger.add(
+            BackgroundSink(render, streams),
+            level=settings.log_level,
+            format="{message}",  # rendered on the writer thread
+            filter=_keep,
+        )
+        return
 
-setup_logger()
+    fmt = _json_format if settings.log_format == "json" else _TEXT_FORMAT
+    logger.add(sys.stderr, level=settings.log_level, format=fmt, filter=_keep)
+    if log_file:
+        logger.add(
+            log_file,
+            rotation="10 MB",
+            retention="7 days",
+            level=settings.log_level,
+            format=fmt,
+            filter=_keep,
+        )
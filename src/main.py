@@ -6,7 +6,17 @@ from src.config import settings
 
 
 def main() -> None:
-    """Start the uvicorn server."""
+    """Start the uvicorn server.
+
+    With ``API_WORKERS`` > 1 the pre-forking launcher is used instead, so the
+    workers share the preloaded models and indexes copy-on-write.
+    """
+    if settings.api_workers > 1:
+        from src.server import run_prefork
+
+        run_prefork(settings.api_workers)
+        return
+
     uvicorn.run(
         "src.api.app:app",
         host=settings.api_host,
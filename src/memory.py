@@ -0,0 +1,461 @@
+"""Memory accounting – what the in-process indexes, models and caches hold.
+
+``memory_report`` sizes each component this process keeps resident (BM25
+indexes, document lists, metadata indexes, the FlashRank model, Chroma's HNSW
+segments, the local embedding model and application caches) next to the
+process RSS/PSS, and warns when a configured threshold is crossed.  Sizes of
+models and HNSW graphs are estimates from file sizes and element counts; the
+Python object graphs are measured with ``deep_sizeof`` (sampled for large
+containers).  ``take_snapshot`` / ``compare_snapshots`` wrap ``tracemalloc``
+to find which lines allocated the growth between two points in time.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import mmap
+import os
+import sys
+import time
+import tracemalloc
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from types import BuiltinFunctionType, FunctionType, MethodType, ModuleType
+
+import numpy as np
+from loguru import logger
+
+from src import metrics
+from src.config import settings
+
+MB = 1024 * 1024
+
+# Containers with more items than this are sized from an even sample
+SAMPLE_ITEMS = 1000
+
+# Snapshots kept for comparison, oldest dropped first
+MAX_SNAPSHOTS = 8
+
+_SKIP_TYPES = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType)
+
+
+@dataclass
+class Component:
+    """Resident size of one in-process structure."""
+
+    name: str
+    bytes: int
+    estimate: bool = False  # derived from file sizes / element counts, not measured
+    detail: dict = field(default_factory=dict)
+
+
+# ---------------------------------------------------------------------------
+# Sizing
+# ---------------------------------------------------------------------------
+
+
+def is_mapped(array: np.ndarray) -> bool:
+    """Whether ``array`` is backed by a memory-mapped file (paged in by the OS on demand)."""
+    base = array
+    while base is not None:
+        if isinstance(base, (np.memmap, mmap.mmap)):
+            return True
+        base = getattr(base, "base", None)
+    return False
+
+
+def deep_sizeof(obj: object, sample: int = SAMPLE_ITEMS) -> int:
+    """Approximate bytes reachable from ``obj``, each object counted once.
+
+    NumPy arrays count their buffers (memory-mapped ones count nothing);
+    containers with more than ``sample`` items are extrapolated from an even
+    sample of them.  Classes, modules and functions are not followed.
+    """
+    seen: set[int] = set()
+
+    def size(o: object, depth: int) -> int:
+        if id(o) in seen or isinstance(o, _SKIP_TYPES):
+            return 0
+        seen.add(id(o))
+        if isinstance(o, np.ndarray):
+            if is_mapped(o):
+                return 0
+            # Owning arrays include their buffer; views count the array they view
+            return sys.getsizeof(o) + (size(o.base, depth + 1) if o.base is not None else 0)
+        total = sys.getsizeof(o)
+        if depth > 64 or isinstance(o, (str, bytes, bytearray, int, float, bool)):
+            return total
+        if isinstance(o, dict):
+            items = list(o.items())
+            total += _sampled(items, lambda kv: size(kv[0], depth + 1) + size(kv[1], depth + 1))
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            total += _sampled(list(o), lambda item: size(item, depth + 1))
+        if hasattr(o, "__dict__"):
+            total += size(o.__dict__, depth + 1)
+        for slot in getattr(type(o), "__slots__", ()):
+            if isinstance(slot, str) and slot != "__dict__" and hasattr(o, slot):
+                total += size(getattr(o, slot), depth + 1)
+        return total
+
+    def _sampled(items: list, measure) -> int:
+        if len(items) <= sample:
+            return sum(measure(item) for item in items)
+        step = len(items) / sample
+        picked = [items[int(i * step)] for i in range(sample)]
+        return int(sum(measure(item) for item in picked) * len(items) / sample)
+
+    return size(obj, 0)
+
+
+def _arrays_bytes(*arrays: np.ndarray) -> tuple[int, int]:
+    """``(resident, mapped)`` bytes of ``arrays``."""
+    resident = mapped = 0
+    for array in arrays:
+        if is_mapped(array):
+            mapped += array.nbytes
+        else:
+            resident += array.nbytes
+    return resident, mapped
+
+
+def _directory_bytes(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+# ---------------------------------------------------------------------------
+# Components
+# ---------------------------------------------------------------------------
+
+
+def _shard_components() -> list[Component]:
+    from src.rag.retriever import _shard_indexes
+
+    components = []
+    for shard, retriever in sorted(_shard_indexes.items()):
+        bm25 = retriever.bm25
+        weights = bm25.weights
+        resident, mapped = _arrays_bytes(weights.data, weights.indices, weights.indptr)
+        lookup = deep_sizeof([bm25.vocabulary, bm25.ids, bm25.row_of])
+        components.append(
+            Component(
+                f"bm25[{shard}]",
+                resident + lookup,
+                detail={
+                    "chunks": len(bm25),
+                    "terms": len(bm25.vocabulary),
+                    "matrix_bytes": resident,
+                    "mapped_bytes": mapped,
+                    "lookup_bytes": lookup,
+                },
+            )
+        )
+
+        index = retriever.metadata_index
+        if index is not None:
+            resident, mapped = _arrays_bytes(index.timestamps, index.source_types, index.domains)
+            names = deep_sizeof([index.type_names, index.domain_names])
+            components.append(
+                Component(
+                    f"metadata_index[{shard}]",
+                    resident + names,
+                    detail={"rows": len(index), "mapped_bytes": mapped},
+                )
+            )
+
+        if retriever.documents is not None:
+            components.append(
+                Component(
+                    f"documents[{shard}]",
+                    deep_sizeof(retriever.documents),
+                    detail={"documents": len(retriever.documents)},
+                )
+            )
+
+        components.append(_chroma_component(shard, retriever.vector_store))
+    return components
+
+
+def _chroma_component(shard: str, store) -> Component:
+    """HNSW graph of one collection: vectors plus level-0 links, per element."""
+    collection = store._collection
+    count = collection.count()
+    dimension = 0
+    if count:
+        sample = collection.get(limit=1, include=["embeddings"])["embeddings"]
+        dimension = len(sample[0]) if len(sample) else 0
+    links = int((collection.metadata or {}).get("hnsw:M", 16)) * 2
+    return Component(
+        f"chroma[{shard}]",
+        count * (dimension * 4 + links * 4 + 16),
+        estimate=True,
+        detail={"elements": count, "dimension": dimension},
+    )
+
+
+def _flashrank_component() -> Component | None:
+    from src.rag.re_ranker import get_re_ranker
+
+    if not get_re_ranker.cache_info().currsize:
+        return None
+    ranker = get_re_ranker().client
+    model_dir = Path(getattr(ranker, "model_dir", ""))
+    size = _directory_bytes(model_dir) if model_dir.is_dir() else 0
+    return Component("flashrank", size, estimate=True, detail={"model_dir": str(model_dir)})
+
+
+def _embedding_component() -> Component | None:
+    from src.rag.embeddings import get_embedding_model
+    from src.rag.local_embeddings import LocalEmbeddings
+
+    if not get_embedding_model.cache_info().currsize:
+        return None
+    embeddings = get_embedding_model()
+    if not isinstance(embeddings, LocalEmbeddings) or embeddings._model is None:
+        return None
+    size = 0
+    for value in embeddings._model.state_dict().values():
+        # Dynamically quantized layers keep (weight, bias) tuples of packed tensors
+        for tensor in value if isinstance(value, tuple) else (value,):
+            if hasattr(tensor, "element_size"):
+                size += tensor.numel() * tensor.element_size()
+    return Component(
+        "local_embeddings",
+        size,
+        estimate=True,
+        detail={"model": settings.local_embedding_model},
+    )
+
+
+def _dedup_component() -> Component | None:
+    from src.rag.dedup import loaded_dedup_index
+
+    index = loaded_dedup_index()
+    if index is None:
+        return None
+    return Component(
+        "dedup_index",
+        deep_sizeof([index._signatures, index._entries, index._buckets]),
+        detail={"chunks": len(index)},
+    )
+
+
+def _retrieval_cache_component() -> Component | None:
+    from src.rag.retriever import get_retrieval_cache
+
+    cache = get_retrieval_cache()
+    if not len(cache):
+        return None
+    return Component(
+        "retrieval_cache",
+        deep_sizeof(cache._entries),
+        detail={"entries": len(cache), "hits": cache.hits, "misses": cache.misses},
+    )
+
+
+def component_sizes(extra: dict[str, object] | None = None) -> list[Component]:
+    """Size every loaded component; ``extra`` adds named objects (e.g. API caches)."""
+    components = _shard_components()
+    for collect in (
+        _flashrank_component,
+        _embedding_component,
+        _dedup_component,
+        _retrieval_cache_component,
+    ):
+        try:
+            component = collect()
+        except Exception as e:  # an unloadable model must not break the report
+            logger.warning("Memory accounting of {} failed: {}", collect.__name__, e)
+            continue
+        if component is not None:
+            components.append(component)
+    for name, obj in (extra or {}).items():
+        components.append(Component(name, deep_sizeof(obj)))
+    return components
+
+
+# ---------------------------------------------------------------------------
+# Process totals and thresholds
+# ---------------------------------------------------------------------------
+
+
+def process_memory(pid: int) -> dict[str, int]:
+    """Return the memory breakdown of a process in kB.
+
+    ``rss`` counts shared pages in full for every process, ``pss`` divides
+    them between the processes sharing them, so ``pss`` is the number that
+    shows copy-on-write savings.  Returns an empty dict where ``/proc`` is
+    not available.
+    """
+    fields = {
+        "Rss": "rss",
+        "Pss": "pss",
+        "Shared_Clean": "shared",
+        "Shared_Dirty": "shared",
+        "Private_Clean": "private",
+        "Private_Dirty": "private",
+    }
+    usage: dict[str, int] = {}
+    try:
+        lines = Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines()
+    except OSError:
+        return usage
+
+    for line in lines:
+        name, _, value = line.partition(":")
+        key = fields.get(name)
+        if key:
+            usage[key] = usage.get(key, 0) + int(value.split()[0])
+    return usage
+
+
+def memory_limit() -> int | None:
+    """The cgroup (container) memory limit in bytes, ``None`` if unlimited or unknown."""
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            value = Path(path).read_text().strip()
+        except OSError:
+            continue
+        # cgroup v1 reports "unlimited" as a huge page-aligned number
+        if value.isdigit() and int(value) < 1 << 60:
+            return int(value)
+        return None
+    return None
+
+
+def threshold_warnings(rss: int, components: list[Component] = ()) -> list[str]:
+    """Messages for every threshold that ``rss`` (bytes) or a component crosses."""
+    warnings = []
+    if settings.memory_warn_rss_mb and rss > settings.memory_warn_rss_mb * MB:
+        warnings.append(
+            f"RSS {rss / MB:.0f} MB exceeds MEMORY_WARN_RSS_MB={settings.memory_warn_rss_mb}"
+        )
+    limit = memory_limit()
+    if limit and settings.memory_warn_limit_fraction and (
+        rss > settings.memory_warn_limit_fraction * limit
+    ):
+        warnings.append(
+            f"RSS {rss / MB:.0f} MB is {rss / limit:.0%} of the {limit / MB:.0f} MB memory limit"
+        )
+    if settings.memory_warn_component_mb:
+        for component in components:
+            if component.bytes > settings.memory_warn_component_mb * MB:
+                warnings.append(
+                    f"{component.name} holds {component.bytes / MB:.0f} MB "
+                    f"(MEMORY_WARN_COMPONENT_MB={settings.memory_warn_component_mb})"
+                )
+    return warnings
+
+
+def check_memory() -> list[str]:
+    """Cheap periodic check of this process's RSS against the thresholds; logs warnings."""
+    rss = process_memory(os.getpid()).get("rss", 0) * 1024
+    metrics.set_gauge("memory.rss_mb", rss / MB)
+    warnings = threshold_warnings(rss)
+    for warning in warnings:
+        logger.warning("Memory: {}", warning)
+    return warnings
+
+
+async def watch_memory(interval: float) -> None:
+    """Run ``check_memory`` every ``interval`` seconds (for the app's lifespan)."""
+    while True:
+        await asyncio.sleep(interval)
+        await asyncio.to_thread(check_memory)
+
+
+def memory_report(extra: dict[str, object] | None = None) -> dict:
+    """Per-component sizes of this process, its RSS/PSS and threshold warnings."""
+    started = time.perf_counter()
+    components = component_sizes(extra)
+    usage = process_memory(os.getpid())
+    rss = usage.get("rss", 0) * 1024
+    accounted = sum(component.bytes for component in components)
+    warnings = threshold_warnings(rss, components)
+    for warning in warnings:
+        logger.warning("Memory: {}", warning)
+    return {
+        "pid": os.getpid(),
+        "rss_bytes": rss,
+        "pss_bytes": usage.get("pss", 0) * 1024,
+        "limit_bytes": memory_limit(),
+        "accounted_bytes": accounted,
+        "unaccounted_bytes": max(rss - accounted, 0),
+        "components": [asdict(c) for c in sorted(components, key=lambda c: -c.bytes)],
+        "tracemalloc": tracemalloc.is_tracing(),
+        "warnings": warnings,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+# ---------------------------------------------------------------------------
+# tracemalloc snapshots
+# ---------------------------------------------------------------------------
+
+_snapshots: OrderedDict[str, tracemalloc.Snapshot] = OrderedDict()
+
+_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def start_tracing(frames: int | None = None) -> None:
+    """Start tracing Python allocations (slows allocation-heavy code noticeably)."""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames or settings.tracemalloc_frames)
+        logger.info("Started tracemalloc")
+
+
+def stop_tracing() -> None:
+    """Stop tracing and drop the stored snapshots."""
+    tracemalloc.stop()
+    _snapshots.clear()
+    logger.info("Stopped tracemalloc")
+
+
+def _stat(stat) -> dict:
+    return {
+        "location": str(stat.traceback[0]) if stat.traceback else "?",
+        "size_bytes": stat.size,
+        "count": stat.count,
+        "size_diff_bytes": getattr(stat, "size_diff", stat.size),
+        "count_diff": getattr(stat, "count_diff", stat.count),
+    }
+
+
+def take_snapshot(label: str | None = None, top: int = 20) -> dict:
+    """Store a tracemalloc snapshot under ``label`` and return its top allocation sites."""
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("tracemalloc is not tracing; start it first")
+    label = label or time.strftime("%H:%M:%S")
+    snapshot = tracemalloc.take_snapshot().filter_traces(_FILTERS)
+    _snapshots[label] = snapshot
+    _snapshots.move_to_end(label)
+    while len(_snapshots) > MAX_SNAPSHOTS:
+        _snapshots.popitem(last=False)
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "label": label,
+        "traced_bytes": current,
+        "peak_bytes": peak,
+        "top": [_stat(s) for s in snapshot.statistics("lineno")[:top]],
+    }
+
+
+def list_snapshots() -> list[str]:
+    return list(_snapshots)
+
+
+def compare_snapshots(base: str, target: str | None = None, top: int = 20) -> dict:
+    """Top allocation sites by growth from snapshot ``base`` to ``target`` (default: now)."""
+    if base not in _snapshots:
+        raise KeyError(base)
+    if target is None:
+        target = take_snapshot()["label"]
+    elif target not in _snapshots:
+        raise KeyError(target)
+    diff = _snapshots[target].compare_to(_snapshots[base], "lineno")
+    return {"base": base, "target": target, "top": [_stat(s) for s in diff[:top]]}
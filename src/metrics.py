@@ -0,0 +1,65 @@
+"""Lightweight in-process metrics – counters, gauges and timings.
+
+Metrics are kept per process and exposed as JSON through ``GET /api/v1/metrics``.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+_lock = threading.Lock()
+_counters: dict[str, float] = {}
+_gauges: dict[str, float] = {}
+_timings: dict[str, dict[str, float]] = {}
+
+
+def increment(name: str, value: float = 1) -> None:
+    """Add ``value`` to the counter ``name``."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def set_gauge(name: str, value: float) -> None:
+    """Set the gauge ``name`` to ``value``."""
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name: str, value: float) -> None:
+    """Record one observation (typically a latency in seconds) for ``name``."""
+    with _lock:
+        timing = _timings.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+        timing["count"] += 1
+        timing["total"] += value
+        timing["max"] = max(timing["max"], value)
+
+
+@contextmanager
+def timer(name: str) -> Iterator[None]:
+    """Context manager that observes the elapsed wall-clock time under ``name``."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started)
+
+
+def snapshot() -> dict:
+    """Return a copy of every metric, with the mean added to each timing."""
+    with _lock:
+        timings = {
+            name: {**timing, "mean": timing["total"] / timing["count"] if timing["count"] else 0.0}
+            for name, timing in _timings.items()
+        }
+        return {"counters": dict(_counters), "gauges": dict(_gauges), "timings": timings}
+
+
+def reset() -> None:
+    """Clear all metrics (mainly for tests)."""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _timings.clear()
@@ -0,0 +1,20 @@
+"""Claim normalisation shared by request coalescing and caching."""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = " .!?;:,\"'"
+
+
+def normalize_claim(claim: str) -> str:
+    """Return a canonical form of ``claim`` so trivially different copies compare equal.
+
+    Applies Unicode NFKC folding (smart quotes, full-width characters), lower-cases,
+    collapses whitespace and strips surrounding quotes and trailing punctuation.
+    """
+    text = unicodedata.normalize("NFKC", claim).casefold()
+    text = _WHITESPACE_RE.sub(" ", text)
+    return text.strip(_TRAILING_PUNCTUATION)
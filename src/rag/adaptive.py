@@ -0,0 +1,124 @@
+"""Adaptive retrieval depth and early-stopping re-ranking.
+
+A fixed ``retriever_top_k`` sends up to ``2 × k`` candidates per shard into
+the cross-encoder for every query.  Most queries do not need that many: the
+first few candidates are often clearly decisive (several passages score high)
+or clearly irrelevant (nothing scores above noise).
+
+:func:`adaptive_rerank` instead fetches ``k_initial`` candidates per leg and
+re-ranks them in fused order, ``batch`` at a time.  After every batch the
+re-ranker score distribution decides:
+
+* ``decisive``   – the ``top_n``-th best score is at least ``high``
+* ``irrelevant`` – the best score is below ``low``
+* ``margin``     – the latest batch's best is more than ``margin`` below the
+  ``top_n``-th best, so candidates further down the fused order are unlikely
+  to enter the top ``top_n``
+
+Otherwise the next batch is re-ranked, and once every candidate at the
+current depth has been scored the depth doubles (up to ``k_max``) and only
+the new candidates are re-ranked.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from langchain_core.documents import Document
+
+from src.config import settings
+
+
+@dataclass
+class AdaptiveResult:
+    documents: list[Document]  # Top ``top_n`` with ``relevance_score`` metadata, best first
+    reranked: int  # Passages scored by the cross-encoder
+    depth: int  # Final per-leg retrieval depth
+    stop: str  # "decisive", "irrelevant", "margin" or "exhausted"
+
+
+def _key(doc: Document) -> str:
+    return doc.id or doc.page_content
+
+
+def stop_reason(
+    ranked: list[float],
+    batch_best: float,
+    first_batch: bool,
+    top_n: int,
+    high: float,
+    low: float,
+    margin: float,
+) -> str | None:
+    """Classify the score distribution so far (``ranked`` sorted best first)."""
+    if ranked[0] < low:
+        return "irrelevant"
+    if len(ranked) < top_n:
+        return None
+    nth = ranked[top_n - 1]
+    if nth >= high:
+        return "decisive"
+    if not first_batch and batch_best < nth - margin:
+        return "margin"
+    return None
+
+
+def adaptive_rerank(
+    query: str,
+    fetch: Callable[[int], list[Document]],
+    score: Callable[[str, list[Document]], list[float]],
+    top_n: int | None = None,
+    k_initial: int | None = None,
+    k_max: int | None = None,
+    batch: int | None = None,
+    high: float | None = None,
+    low: float | None = None,
+    margin: float | None = None,
+) -> AdaptiveResult:
+    """Retrieve and re-rank ``query`` with adaptive depth (see the module docstring).
+
+    Args:
+        query: The search query string.
+        fetch: Returns the fused candidates for a per-leg depth, best first.
+        score: Cross-encoder relevance of each document, in input order.
+        top_n .. margin: Override the ``settings.adaptive_*`` defaults.
+    """
+    top_n = top_n or settings.retriever_top_n
+    k_max = k_max or settings.retriever_top_k
+    k = min(k_initial or settings.adaptive_k_initial, k_max)
+    batch = batch or settings.adaptive_rerank_batch
+    high = settings.adaptive_high if high is None else high
+    low = settings.adaptive_low if low is None else low
+    margin = settings.adaptive_margin if margin is None else margin
+
+    scored: dict[str, tuple[Document, float]] = {}
+    stop = "exhausted"
+    while True:
+        candidates = [doc for doc in fetch(k) if _key(doc) not in scored]
+        for start in range(0, len(candidates), batch):
+            chunk = candidates[start : start + batch]
+            scores = score(query, chunk)
+            for doc, value in zip(chunk, scores):
+                scored[_key(doc)] = (doc, value)
+            ranked = sorted((value for _, value in scored.values()), reverse=True)
+            reason = stop_reason(
+                ranked, max(scores), len(scored) == len(chunk), top_n, high, low, margin
+            )
+            if reason:
+                stop = reason
+                break
+        if stop != "exhausted" or k >= k_max or not candidates:
+            break
+        k = min(2 * k, k_max)
+
+    best = sorted(scored.values(), key=lambda pair: pair[1], reverse=True)[:top_n]
+    documents = [
+        Document(
+            page_content=doc.page_content,
+            metadata={**doc.metadata, "relevance_score": value},
+            id=doc.id,
+        )
+        for doc, value in best
+    ]
+    return AdaptiveResult(documents=documents, reranked=len(scored), depth=k, stop=stop)
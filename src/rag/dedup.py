@@ -0,0 +1,403 @@
+"""Near-duplicate chunk detection at ingest time (MinHash + LSH).
+
+Syndicated web results are often verbatim or lightly edited copies of one
+story.  ``deduplicate`` drops a chunk before it is embedded when its word
+shingles are estimated (by MinHash) to overlap an already stored chunk – or an
+earlier chunk of another source in the same batch – by at least
+``settings.dedup_threshold`` (Jaccard).  The skipped copy's source is recorded
+on the surviving chunk as ``alternate_sources`` (a space-separated string of
+URLs, since Chroma metadata values must be scalars).
+
+Candidates are found through an LSH index over the signatures of stored
+chunks: ``settings.dedup_bands`` bands of ``num_perm / bands`` rows, so only
+chunks sharing a whole band are compared.  The index is persisted append-only
+next to the Chroma data (``<chroma_persist_dir>/dedup``) and updated by
+``record_chunks`` whenever ``add_documents`` stores chunks; other worker
+processes pick up appended records on their next lookup.  A knowledge base
+ingested before deduplication existed is indexed once from the collections.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import re
+import shutil
+import threading
+import zlib
+from collections.abc import Iterable
+from pathlib import Path
+
+import numpy as np
+from langchain_core.documents import Document
+from loguru import logger
+
+from src import metrics
+from src.config import settings
+
+SHINGLE_WORDS = 5
+ALTERNATE_SOURCES = "alternate_sources"
+
+_PRIME = np.uint64(4294967291)  # largest prime below 2**32
+_WORD_RE = re.compile(r"\w+")
+
+
+class MinHasher:
+    """MinHash signatures of word shingles with ``num_perm`` universal hash functions."""
+
+    def __init__(self, num_perm: int, seed: int = 1) -> None:
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        # a·x + b stays below 2**64 for 32-bit a, b and x, so uint64 never wraps
+        self._a = rng.integers(1, 2**32, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 2**32, num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        words = _WORD_RE.findall(text.lower())
+        shingles = {
+            " ".join(words[i : i + SHINGLE_WORDS])
+            for i in range(max(1, len(words) - SHINGLE_WORDS + 1))
+        }
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode()) for shingle in shingles), np.uint64, len(shingles)
+        )
+        permuted = (np.outer(hashes, self._a) + self._b) % _PRIME
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Jaccard similarity estimated from two MinHash signatures."""
+    return float(np.count_nonzero(a == b)) / len(a)
+
+
+class NearDuplicateIndex:
+    """LSH index of MinHash signatures, optionally persisted append-only in ``directory``.
+
+    Each entry is a dict with the chunk's ``id``, ``shard`` and ``source``.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = 128,
+        bands: int = 16,
+        threshold: float = 0.8,
+        directory: str | Path | None = None,
+    ) -> None:
+        if num_perm % bands:
+            raise ValueError(f"DEDUP_NUM_PERM ({num_perm}) must be a multiple of DEDUP_BANDS")
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.directory = Path(directory) if directory else None
+        # Band hash → position, or a list of positions once bands collide;
+        # most bands are unique, and a bare int costs a fraction of a list
+        self._buckets: list[dict[int, int | list[int]]] = [{} for _ in range(bands)]
+        self._signatures: list[np.ndarray] = []
+        self._entries: list[dict] = []
+        self._loaded_bytes = 0  # how much of the entry log this process has read
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def signature(self, text: str) -> np.ndarray:
+        return self.hasher.signature(text)
+
+    def _band_keys(self, signature: np.ndarray) -> list[int]:
+        # Python's bytes hash is salted per process, which is fine: buckets
+        # are rebuilt from the persisted signatures, never stored
+        return [
+            hash(signature[band * self.rows : (band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def _insert(self, signature: np.ndarray, entry: dict) -> None:
+        position = len(self._entries)
+        self._signatures.append(signature)
+        self._entries.append(entry)
+        for buckets, key in zip(self._buckets, self._band_keys(signature)):
+            found = buckets.get(key)
+            if found is None:
+                buckets[key] = position
+            elif isinstance(found, int):
+                buckets[key] = [found, position]
+            else:
+                found.append(position)
+
+    def find(self, signature: np.ndarray) -> dict | None:
+        """Return the most similar entry at or above the threshold, if any."""
+        with self._lock:
+            self._refresh()
+            candidates: set[int] = set()
+            for buckets, key in zip(self._buckets, self._band_keys(signature)):
+                found = buckets.get(key)
+                if isinstance(found, int):
+                    candidates.add(found)
+                elif found is not None:
+                    candidates.update(found)
+            best, best_score = None, self.threshold
+            for position in candidates:
+                score = similarity(signature, self._signatures[position])
+                if score >= best_score:
+                    best, best_score = self._entries[position], score
+            return best
+
+    def add(self, items: Iterable[tuple[np.ndarray, dict]]) -> None:
+        """Index ``(signature, entry)`` pairs and append them to the persisted log."""
+        items = list(items)
+        if not items:
+            return
+        with self._lock:
+            if self.directory is None:
+                for signature, entry in items:
+                    self._insert(signature, entry)
+                return
+            with self._log_lock():
+                if not self.exists:
+                    self._write_meta()
+                self._refresh()
+                self._loaded_bytes += self._append_unlocked(
+                    items, len(self._entries), self._loaded_bytes
+                )
+                for signature, entry in items:
+                    self._insert(signature, entry)
+
+    # -- persistence ---------------------------------------------------------
+
+    @property
+    def _signatures_path(self) -> Path:
+        return self.directory / "signatures.bin"
+
+    @property
+    def _entries_path(self) -> Path:
+        return self.directory / "chunks.jsonl"
+
+    @property
+    def exists(self) -> bool:
+        return self.directory is not None and (self.directory / "meta.json").exists()
+
+    def _log_lock(self):
+        # Serialises appends (and bootstrap) across worker processes
+        self.directory.mkdir(parents=True, exist_ok=True)
+        return _FileLock(self.directory / "lock")
+
+    def _refresh(self) -> None:
+        """Load records other processes appended since the last look (lock held)."""
+        if self.directory is None:
+            return
+        size = self._entries_path.stat().st_size if self._entries_path.exists() else 0
+        if size == self._loaded_bytes:
+            return
+        if size < self._loaded_bytes:  # reset or rebuilt by another process: start over
+            self._buckets = [{} for _ in range(self.bands)]
+            self._signatures, self._entries = [], []
+            self._loaded_bytes = 0
+        with open(self._entries_path, "rb") as f:
+            f.seek(self._loaded_bytes)
+            data = f.read(size - self._loaded_bytes)
+        data = data[: data.rfind(b"\n") + 1]  # complete records only
+        lines = data.splitlines()
+        if not lines:
+            return
+        row_bytes = self.hasher.num_perm * 4
+        with open(self._signatures_path, "rb") as f:
+            f.seek(len(self._entries) * row_bytes)
+            rows = np.frombuffer(f.read(len(lines) * row_bytes), np.uint32)
+        for signature, line in zip(rows.reshape(len(lines), -1), lines):
+            self._insert(signature, json.loads(line))
+        self._loaded_bytes += len(data)
+
+    def bootstrap(self, chunks: Iterable[tuple[str, str, Document]]) -> None:
+        """Create the persisted index from ``(id, shard, document)`` of already stored chunks."""
+        with self._lock, self._log_lock():
+            if self.exists:
+                return
+            self._signatures_path.write_bytes(b"")
+            self._entries_path.write_bytes(b"")
+            count = written = 0
+            batch: list[tuple[np.ndarray, dict]] = []
+            for chunk_id, shard, doc in chunks:
+                batch.append((self.signature(doc.page_content), _entry(chunk_id, shard, doc)))
+                if len(batch) >= 1000:
+                    written += self._append_unlocked(batch, count, written)
+                    count += len(batch)
+                    batch = []
+            self._append_unlocked(batch, count, written)
+            count += len(batch)
+            self._write_meta()  # last: a bootstrap cut short is redone
+        logger.info("Built near-duplicate index of {} stored chunk(s)", count)
+
+    def _append_unlocked(
+        self, items: list[tuple[np.ndarray, dict]], entries: int, entries_bytes: int
+    ) -> int:
+        """Append records to the log (file lock held); returns the bytes of entries written.
+
+        ``entries`` complete records, ``entries_bytes`` long, are in the log
+        already.  Whatever follows them – signature rows or a torn entry left
+        by a crash between (or during) the two writes – is cut off first, so
+        that row ``i`` of the signatures stays paired with entry ``i``.
+        """
+        if not items:
+            return 0
+        for path, size in (
+            (self._signatures_path, entries * self.hasher.num_perm * 4),
+            (self._entries_path, entries_bytes),
+        ):
+            if path.exists() and path.stat().st_size > size:
+                os.truncate(path, size)
+        # Signatures go first, so a reader that sees an entry also finds its row
+        with open(self._signatures_path, "ab") as f:
+            f.write(np.stack([signature for signature, _ in items]).tobytes())
+        lines = "".join(json.dumps(entry) + "\n" for _, entry in items).encode()
+        with open(self._entries_path, "ab") as f:
+            f.write(lines)
+        return len(lines)
+
+    def _write_meta(self) -> None:
+        (self.directory / "meta.json").write_text(
+            json.dumps({"num_perm": self.hasher.num_perm, "bands": self.bands})
+        )
+
+    def matches_layout(self) -> bool:
+        try:
+            meta = json.loads((self.directory / "meta.json").read_text())
+        except (OSError, ValueError):
+            return False
+        return meta == {"num_perm": self.hasher.num_perm, "bands": self.bands}
+
+
+class _FileLock:
+    def __init__(self, path: Path) -> None:
+        self._path = path
+
+    def __enter__(self) -> None:
+        self._file = open(self._path, "a")
+        fcntl.flock(self._file, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc) -> None:
+        fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+
+
+def _entry(chunk_id: str, shard: str, doc: Document) -> dict:
+    return {"id": chunk_id, "shard": shard, "source": doc.metadata.get("source", "")}
+
+
+def index_dir() -> Path:
+    """Directory holding the persisted near-duplicate index."""
+    return Path(settings.chroma_persist_dir) / "dedup"
+
+
+def _stored_chunks() -> Iterable[tuple[str, str, Document]]:
+    from src.rag.vector_store import get_all_documents, list_shards
+
+    for shard in list_shards():
+        for doc in get_all_documents(shard):
+            yield doc.id, shard, doc
+
+
+# Opened indexes by directory, so a changed CHROMA_PERSIST_DIR gets its own
+_indexes: dict[str, NearDuplicateIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_dedup_index() -> NearDuplicateIndex:
+    """Return the near-duplicate index of the knowledge base, building it on first use."""
+    directory = index_dir()
+    index = _indexes.get(str(directory))
+    if index is not None:
+        return index
+    with _indexes_lock:
+        index = _indexes.get(str(directory))
+        if index is None:
+            index = NearDuplicateIndex(
+                num_perm=settings.dedup_num_perm,
+                bands=settings.dedup_bands,
+                threshold=settings.dedup_threshold,
+                directory=directory,
+            )
+            if index.exists and not index.matches_layout():
+                logger.info("Near-duplicate index was built with other settings; rebuilding it")
+                shutil.rmtree(directory, ignore_errors=True)
+            # Without a Chroma directory there is nothing stored to index yet
+            if not index.exists and Path(settings.chroma_persist_dir).exists():
+                index.bootstrap(_stored_chunks())
+            _indexes[str(directory)] = index
+    return index
+
+
+def loaded_dedup_index() -> NearDuplicateIndex | None:
+    """The index if this process has opened it (``None`` otherwise)."""
+    return _indexes.get(str(index_dir()))
+
+
+def reset_dedup_index() -> None:
+    """Forget the index (after the knowledge base was cleared or replaced)."""
+    shutil.rmtree(index_dir(), ignore_errors=True)
+    _indexes.pop(str(index_dir()), None)
+
+
+def add_alternate_source(metadata: dict, source: str) -> bool:
+    """Record ``source`` as another source of the chunk with ``metadata``; ``True`` if new."""
+    if not source or source == metadata.get("source"):
+        return False
+    sources = str(metadata.get(ALTERNATE_SOURCES, "")).split()
+    if source in sources:
+        return False
+    metadata[ALTERNATE_SOURCES] = " ".join([*sources, source])
+    return True
+
+
+def deduplicate(chunks: list[Document]) -> list[Document]:
+    """Drop chunks that near-duplicate a stored chunk or another source's chunk in the batch.
+
+    Repeated passages within one source are kept: they are that document's own text.
+    """
+    if not settings.dedup_enabled or not chunks:
+        return chunks
+
+    index = get_dedup_index()
+    batch = NearDuplicateIndex(
+        num_perm=settings.dedup_num_perm,
+        bands=settings.dedup_bands,
+        threshold=settings.dedup_threshold,
+    )
+    survivors: list[Document] = []
+    stored_alternates: dict[tuple[str, str], set[str]] = {}
+    for chunk in chunks:
+        signature = index.signature(chunk.page_content)
+        source = chunk.metadata.get("source", "")
+
+        stored = index.find(signature)
+        if stored is not None:
+            if source and source != stored["source"]:
+                stored_alternates.setdefault((stored["shard"], stored["id"]), set()).add(source)
+            continue
+
+        earlier = batch.find(signature)
+        if earlier is not None and earlier["source"] != source:
+            add_alternate_source(survivors[earlier["position"]].metadata, source)
+            continue
+
+        batch.add([(signature, {"position": len(survivors), "source": source})])
+        survivors.append(chunk)
+
+    skipped = len(chunks) - len(survivors)
+    if skipped:
+        metrics.increment("ingest.near_duplicates", skipped)
+        logger.info("Skipped {} near-duplicate chunk(s) of {}", skipped, len(chunks))
+    if stored_alternates:
+        from src.rag.vector_store import add_alternate_sources
+
+        add_alternate_sources(stored_alternates)
+    return survivors
+
+
+def record_chunks(shard: str, documents: list[Document]) -> None:
+    """Index chunks just stored in ``shard`` so later copies are detected."""
+    if not settings.dedup_enabled:
+        return
+    index = get_dedup_index()
+    index.add((index.signature(doc.page_content), _entry(doc.id, shard, doc)) for doc in documents)
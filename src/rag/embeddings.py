@@ -4,19 +4,34 @@ from __future__ import annotations
 
 from functools import lru_cache
 
+from langchain_core.embeddings import Embeddings
 from langchain_openai import OpenAIEmbeddings
 
 from src.config import settings
 
 
 @lru_cache(maxsize=1)
-def get_embedding_model() -> OpenAIEmbeddings:
+def get_embedding_model() -> Embeddings:
     """Return a cached embedding model instance.
 
-    Uses OpenAI embeddings by default. Swap this out for
-    sentence-transformers or another provider if preferred.
+    ``settings.embedding_provider`` selects OpenAI embeddings (the default)
+    or a local sentence-transformer on CPU (see ``src.rag.local_embeddings``).
     """
+    if settings.embedding_provider == "local":
+        from src.rag.local_embeddings import LocalEmbeddings
+
+        return LocalEmbeddings()
     return OpenAIEmbeddings(
         model=settings.openai_embedding_model,
         api_key=settings.openai_api_key,
+        base_url=settings.openai_base_url or None,
+        # OpenAI-compatible servers generally accept text, not token IDs
+        check_embedding_ctx_length=not settings.openai_base_url,
     )
+
+
+def embedding_model_name() -> str:
+    """Identify the vector space stored embeddings belong to."""
+    if settings.embedding_provider == "local":
+        return f"local:{settings.local_embedding_model}"
+    return settings.openai_embedding_model
@@ -0,0 +1,292 @@
+"""Evidence packing – turn retrieved chunks or web results into a compact prompt.
+
+Neighbouring chunks share ``chunk_overlap`` characters and syndicated web
+results are often verbatim copies, so joining everything wastes input tokens.
+``pack_evidence`` merges overlapping chunks of the same source, drops
+near-duplicate passages and fits the rest into a token budget by score.
+"""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+import tiktoken
+from langchain_core.documents import Document
+from loguru import logger
+
+from src import metrics
+from src.config import settings
+
+SEPARATOR = "\n\n---\n\n"
+
+# Items that would be cut below this many tokens are dropped instead
+MIN_TRUNCATED_TOKENS = 64
+
+_WORD_RE = re.compile(r"\w+")
+
+
+@dataclass
+class EvidenceItem:
+    """A single passage of evidence with its provenance and ranking score."""
+
+    text: str
+    source: str
+    title: str = ""
+    source_type: str = "file"
+    score: float = 0.0
+
+
+@dataclass
+class PackedEvidence:
+    """Result of ``pack_evidence``."""
+
+    text: str
+    items: list[EvidenceItem] = field(default_factory=list)
+    tokens_before: int = 0
+    tokens_after: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+# ---------------------------------------------------------------------------
+# Conversion & formatting
+# ---------------------------------------------------------------------------
+
+
+def items_from_documents(documents: list[Document]) -> list[EvidenceItem]:
+    """Build evidence items from (re-ranked) documents of the RAG store."""
+    items = []
+    for rank, doc in enumerate(documents):
+        # Try source_url first (web results), fallback to source (file paths)
+        source = doc.metadata.get("source_url") or doc.metadata.get("source", "unknown")
+        # FlashRank scores are in [0, 1]; without one, keep the retrieval order
+        score = doc.metadata.get("relevance_score")
+        items.append(
+            EvidenceItem(
+                text=doc.page_content,
+                source=source,
+                title=doc.metadata.get("title", ""),
+                source_type=doc.metadata.get("source_type", "file"),
+                score=float(score) if score is not None else -float(rank),
+            )
+        )
+    return items
+
+
+def items_from_web_results(results: list[dict]) -> list[EvidenceItem]:
+    """Build evidence items from structured Tavily results."""
+    return [
+        EvidenceItem(
+            text=result.get("content", "No content available"),
+            source=result.get("url", "No URL"),
+            title=result.get("title", "No title"),
+            source_type="web",
+            score=float(result.get("score", 0.0)),
+        )
+        for result in results
+    ]
+
+
+def format_rag_item(index: int, item: EvidenceItem) -> str:
+    """Format an item the way RAG evidence is presented to the LLM."""
+    source_label = f"{item.title} ({item.source})" if item.title else item.source
+    return f"[{index}] (source: {source_label})\n{item.text}"
+
+
+def format_web_item(index: int, item: EvidenceItem) -> str:
+    """Format an item the way web search results are presented to the LLM."""
+    return f"[{index}] {item.title}\nURL: {item.source}\nContent: {item.text}"
+
+
+# ---------------------------------------------------------------------------
+# Token counting
+# ---------------------------------------------------------------------------
+
+
+# Fallback ratio when the tokenizer files cannot be loaded (e.g. offline)
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=1)
+def _get_encoding() -> tiktoken.Encoding | None:
+    try:
+        try:
+            return tiktoken.encoding_for_model(settings.openai_model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logger.warning("Tokenizer unavailable, estimating token counts instead: {}", e)
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Count the tokens of ``text`` with the tokenizer of the evaluation model."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[: max_tokens * CHARS_PER_TOKEN]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+
+# ---------------------------------------------------------------------------
+# Overlap merging & near-duplicate removal
+# ---------------------------------------------------------------------------
+
+
+def _overlap_length(first: str, second: str, min_overlap: int) -> int:
+    """Return the length of the longest suffix of ``first`` that prefixes ``second``."""
+    if len(first) < min_overlap or len(second) < min_overlap:
+        return 0
+    probe = second[:min_overlap]
+    start = first.find(probe)
+    while start != -1:
+        length = len(first) - start
+        if second.startswith(first[start:]) and length < len(second):
+            return length
+        start = first.find(probe, start + 1)
+    return 0
+
+
+def merge_overlapping(items: list[EvidenceItem], min_overlap: int) -> list[EvidenceItem]:
+    """Stitch together chunks of the same source whose edges overlap.
+
+    The merged item keeps the position and the best score of its parts.
+    """
+    merged = list(items)
+    changed = True
+    while changed:
+        changed = False
+        for i, first in enumerate(merged):
+            for j, second in enumerate(merged):
+                if i == j or first.source != second.source:
+                    continue
+                overlap = _overlap_length(first.text, second.text, min_overlap)
+                if not overlap:
+                    continue
+                first.text += second.text[overlap:]
+                first.score = max(first.score, second.score)
+                del merged[j]
+                changed = True
+                break
+            if changed:
+                break
+    return merged
+
+
+def _shingles(text: str, size: int = 5) -> set[tuple[str, ...]]:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= size:
+        return {tuple(words)}
+    return {tuple(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+def drop_near_duplicates(items: list[EvidenceItem], threshold: float) -> list[EvidenceItem]:
+    """Drop passages whose word shingles are mostly contained in a better-scored one."""
+    kept: list[tuple[EvidenceItem, set]] = []
+    for item in sorted(items, key=lambda it: it.score, reverse=True):
+        shingles = _shingles(item.text)
+        duplicate = any(
+            len(shingles & other) / max(1, min(len(shingles), len(other))) >= threshold
+            for _, other in kept
+        )
+        if not duplicate:
+            kept.append((item, shingles))
+    # Preserve the incoming (rank) order of the survivors
+    survivors = {id(item) for item, _ in kept}
+    return [item for item in items if id(item) in survivors]
+
+
+# ---------------------------------------------------------------------------
+# Packing
+# ---------------------------------------------------------------------------
+
+
+def _joined_tokens(items: list[EvidenceItem], formatter: Callable) -> int:
+    return count_tokens(SEPARATOR.join(formatter(i, item) for i, item in enumerate(items, 1)))
+
+
+def pack_evidence(
+    items: list[EvidenceItem],
+    formatter: Callable[[int, EvidenceItem], str] = format_rag_item,
+    token_budget: int | None = None,
+) -> PackedEvidence:
+    """Merge, deduplicate and budget evidence items into a single prompt section.
+
+    Args:
+        items: Evidence items in retrieval / rerank order.
+        formatter: Renders one item (``format_rag_item`` or ``format_web_item``).
+        token_budget: Maximum tokens for the packed text; defaults to
+            ``settings.evidence_token_budget`` (0 disables the budget).
+
+    Returns:
+        The packed evidence text, the items it contains and token counts
+        before and after packing.
+    """
+    if token_budget is None:
+        token_budget = settings.evidence_token_budget
+
+    tokens_before = _joined_tokens(items, formatter)
+
+    candidates = merge_overlapping(
+        [EvidenceItem(**vars(item)) for item in items], settings.evidence_min_overlap
+    )
+    merged_away = len(items) - len(candidates)
+    deduplicated = drop_near_duplicates(candidates, settings.evidence_dedup_threshold)
+    duplicates = len(candidates) - len(deduplicated)
+
+    # Highest-scoring evidence claims the budget first.  Every item is
+    # tokenised once: its cost is its formatted text plus the separator before
+    # it, kept as a running total.  An item over the budget is truncated to
+    # what is left (or skipped), and smaller items after it may still fit.
+    packed: list[EvidenceItem] = []
+    used = 0
+    separator_tokens = count_tokens(SEPARATOR)
+    for item in sorted(deduplicated, key=lambda it: it.score, reverse=True):
+        position = len(packed) + 1
+        overhead = separator_tokens if packed else 0
+        cost = overhead + count_tokens(formatter(position, item))
+        if not token_budget or used + cost <= token_budget:
+            packed.append(item)
+            used += cost
+            continue
+        full_text, item.text = item.text, ""
+        available = token_budget - used - overhead - count_tokens(formatter(position, item))
+        if available < MIN_TRUNCATED_TOKENS:
+            item.text = full_text
+            continue
+        item.text = _truncate_to_tokens(full_text, available)
+        packed.append(item)
+        used = token_budget
+
+    text = SEPARATOR.join(formatter(i, item) for i, item in enumerate(packed, 1))
+    result = PackedEvidence(
+        text=text, items=packed, tokens_before=tokens_before, tokens_after=count_tokens(text)
+    )
+
+    metrics.increment("evidence.tokens_before", result.tokens_before)
+    metrics.increment("evidence.tokens_after", result.tokens_after)
+    metrics.increment("evidence.tokens_saved", result.tokens_saved)
+    metrics.increment("evidence.items_merged", merged_away)
+    metrics.increment("evidence.items_deduplicated", duplicates)
+    metrics.increment("evidence.items_over_budget", len(deduplicated) - len(packed))
+    logger.info(
+        "Packed {} evidence item(s) into {} ({} merged, {} duplicate(s)): {} → {} tokens",
+        len(items),
+        len(packed),
+        merged_away,
+        duplicates,
+        result.tokens_before,
+        result.tokens_after,
+    )
+    return result
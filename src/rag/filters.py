@@ -0,0 +1,217 @@
+"""Metadata filters for retrieval and the secondary indexes that apply them.
+
+``RetrievalFilter`` restricts a search by recency, source type and source
+domain.  ``MetadataIndex`` holds those three attributes of every chunk of a
+shard as NumPy columns (row-aligned with the shard's BM25 index), so a filter
+resolves to the set of allowed rows with a few vectorised comparisons.  Both
+retrieval legs then only score those rows: BM25 restricts its matrix product
+to them and the vector leg passes their IDs to Chroma's filtered search – the
+top-k is taken from the filtered set instead of filtering a global top-k.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from collections.abc import Callable, Sequence
+from datetime import UTC, datetime
+from pathlib import Path
+from urllib.parse import urlparse
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from src.rag.shards import FILE_SHARD, parse_date
+
+
+class RetrievalFilter(BaseModel):
+    """Restrictions applied before retrieval scoring.  Unset fields match everything."""
+
+    max_age_days: float | None = Field(
+        default=None,
+        gt=0,
+        description="Only chunks published (or ingested) within this many days.",
+    )
+    source_types: list[str] | None = Field(
+        default=None, description='Only these source types, e.g. ["web"] or ["file"].'
+    )
+    allow_domains: list[str] | None = Field(
+        default=None, description="Only chunks from these domains (subdomains included)."
+    )
+    deny_domains: list[str] | None = Field(
+        default=None, description="Never chunks from these domains (subdomains included)."
+    )
+
+    @property
+    def is_empty(self) -> bool:
+        return not any(
+            (self.max_age_days, self.source_types, self.allow_domains, self.deny_domains)
+        )
+
+    def cutoff(self, now: float | None = None) -> float | None:
+        """Oldest allowed timestamp, or ``None`` without a recency window."""
+        if self.max_age_days is None:
+            return None
+        return (now or time.time()) - self.max_age_days * 86400
+
+
+def domain_of(url: str) -> str:
+    """Lower-cased host of ``url`` without a leading ``www.``."""
+    if "//" not in url:
+        return ""  # file paths and placeholders
+    return (urlparse(url).hostname or "").lower().removeprefix("www.")
+
+
+def _matches_domain(domain: str, patterns: Sequence[str]) -> bool:
+    for pattern in patterns:
+        pattern = pattern.lower().removeprefix("www.")
+        if domain == pattern or domain.endswith(f".{pattern}"):
+            return True
+    return False
+
+
+def chunk_timestamp(metadata: dict) -> float:
+    """Publication time of a chunk, falling back to its ingestion time (NaN if unknown)."""
+    published = parse_date(metadata.get("published_date"))
+    if published is not None:
+        return published.timestamp()
+    return float(metadata.get("ingested_at", np.nan))
+
+
+class MetadataIndex:
+    """Columnar secondary index over chunk metadata, row-aligned with a BM25 index.
+
+    Args:
+        timestamps: Publication/ingestion time of every row (NaN if unknown).
+        source_types: Category code of every row into ``type_names``.
+        domains: Category code of every row into ``domain_names``.
+    """
+
+    def __init__(
+        self,
+        timestamps: np.ndarray,
+        source_types: np.ndarray,
+        type_names: list[str],
+        domains: np.ndarray,
+        domain_names: list[str],
+    ) -> None:
+        self.timestamps = timestamps
+        self.source_types = source_types
+        self.type_names = type_names
+        self.domains = domains
+        self.domain_names = domain_names
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @classmethod
+    def build(cls, metadatas: Sequence[dict]) -> MetadataIndex:
+        """Index the filterable attributes of ``metadatas`` (one per row)."""
+        timestamps = np.array([chunk_timestamp(m) for m in metadatas], dtype=np.float64)
+        type_names, source_types = np.unique(
+            [m.get("source_type", FILE_SHARD) for m in metadatas] or [""], return_inverse=True
+        )
+        domain_names, domains = np.unique(
+            [domain_of(m.get("source_url", "")) for m in metadatas] or [""],
+            return_inverse=True,
+        )
+        n = len(metadatas)
+        return cls(
+            timestamps,
+            source_types[:n].astype(np.int32),
+            type_names.tolist(),
+            domains[:n].astype(np.int32),
+            domain_names.tolist(),
+        )
+
+    def save(self, directory: str | Path) -> None:
+        """Write the index next to a saved BM25 index (see ``BM25Index.save``)."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / "timestamps.npy", self.timestamps)
+        np.save(directory / "source_types.npy", self.source_types)
+        np.save(directory / "domains.npy", self.domains)
+        (directory / "categories.json").write_text(
+            json.dumps({"source_types": self.type_names, "domains": self.domain_names})
+        )
+
+    @classmethod
+    def load(cls, directory: str | Path, mmap: bool = True) -> MetadataIndex:
+        """Load an index written by ``save``, memory-mapped by default."""
+        directory = Path(directory)
+        mode = "r" if mmap else None
+        categories = json.loads((directory / "categories.json").read_text())
+        return cls(
+            np.load(directory / "timestamps.npy", mmap_mode=mode),
+            np.load(directory / "source_types.npy", mmap_mode=mode),
+            categories["source_types"],
+            np.load(directory / "domains.npy", mmap_mode=mode),
+            categories["domains"],
+        )
+
+    def rows(self, retrieval_filter: RetrievalFilter | None) -> np.ndarray | None:
+        """Rows matching ``retrieval_filter``; ``None`` when nothing is filtered."""
+        if retrieval_filter is None or retrieval_filter.is_empty:
+            return None
+        mask = np.ones(len(self), dtype=bool)
+
+        cutoff = retrieval_filter.cutoff()
+        if cutoff is not None:
+            # NaN (unknown date) compares False, so undated chunks are excluded
+            mask &= self.timestamps >= cutoff
+        # Categorical filters are resolved on the (few) category names first
+        types, allow, deny = (
+            retrieval_filter.source_types,
+            retrieval_filter.allow_domains,
+            retrieval_filter.deny_domains,
+        )
+        if types:
+            wanted = _codes(self.type_names, lambda name: name in types)
+            mask &= np.isin(self.source_types, wanted)
+        if allow:
+            wanted = _codes(self.domain_names, lambda name: _matches_domain(name, allow))
+            mask &= np.isin(self.domains, wanted)
+        if deny:
+            unwanted = _codes(self.domain_names, lambda name: _matches_domain(name, deny))
+            mask &= ~np.isin(self.domains, unwanted)
+        return np.flatnonzero(mask)
+
+
+def _codes(names: list[str], predicate: Callable[[str], bool]) -> list[int]:
+    return [code for code, name in enumerate(names) if predicate(name)]
+
+
+def shard_may_match(shard: str, retrieval_filter: RetrievalFilter | None) -> bool:
+    """Whether ``shard`` can hold chunks matching ``retrieval_filter``.
+
+    Lets sharded retrieval skip whole shards (e.g. the ``file`` shard for a
+    web-only filter, or web buckets older than the recency window).
+    """
+    if retrieval_filter is None or retrieval_filter.is_empty:
+        return True
+    if shard == FILE_SHARD:
+        types = retrieval_filter.source_types
+        return not types or any(t != "web" for t in types)
+    if not shard.startswith("web-"):
+        return True  # default shard: mixed content
+    if retrieval_filter.source_types and "web" not in retrieval_filter.source_types:
+        return False
+    cutoff = retrieval_filter.cutoff()
+    bucket_end = _bucket_end(shard.removeprefix("web-"))
+    return cutoff is None or bucket_end is None or bucket_end >= cutoff
+
+
+def _bucket_end(bucket: str) -> float | None:
+    """End (exclusive) of a web shard's time bucket as a timestamp."""
+    try:
+        if "-w" in bucket:
+            year, week = bucket.split("-w")
+            start = datetime.fromisocalendar(int(year), int(week), 1)
+            return start.replace(tzinfo=UTC).timestamp() + 7 * 86400
+        if "-" in bucket:
+            year, month = (int(part) for part in bucket.split("-"))
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+            return datetime(year, month, 1, tzinfo=UTC).timestamp()
+        return datetime(int(bucket) + 1, 1, 1, tzinfo=UTC).timestamp()
+    except ValueError:
+        return None
@@ -0,0 +1,309 @@
+"""Hybrid (vector + BM25) retrieval with concurrent legs and ID-based fusion.
+
+``BM25Index`` precomputes the full Okapi BM25 weight of every (term, chunk)
+pair into a sparse matrix, so scoring a query is a single sparse
+matrix-vector product instead of a Python loop over every document per query
+term.  ``HybridRetriever`` runs the vector and BM25 legs concurrently and
+fuses the two ranked lists on chunk IDs with NumPy.
+"""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Callable, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer
+
+from src.rag.filters import MetadataIndex, RetrievalFilter
+
+
+def default_tokenizer(text: str) -> list[str]:
+    """Whitespace tokenisation, identical to ``BM25Retriever``'s default."""
+    return text.split()
+
+
+class BM25Index:
+    """Okapi BM25 over a precomputed sparse term-document weight matrix.
+
+    Scores match ``rank_bm25.BM25Okapi`` (including its epsilon floor for
+    negative IDFs), but all per-document work is done once at build time.
+
+    Args:
+        vocabulary: Term → column of ``weights``.
+        weights: CSC matrix of shape (n_chunks, n_terms) holding the BM25
+            contribution of each term to each chunk.
+        ids: Chunk ID of every row.
+    """
+
+    def __init__(
+        self,
+        vocabulary: dict[str, int],
+        weights: sparse.csc_matrix,
+        ids: Sequence[str],
+        tokenizer: Callable[[str], list[str]] = default_tokenizer,
+    ) -> None:
+        self.vocabulary = vocabulary
+        self.weights = weights
+        self.ids = list(ids)
+        self.tokenizer = tokenizer
+        self.row_of = {chunk_id: row for row, chunk_id in enumerate(self.ids)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the weight matrix arrays."""
+        return self.weights.data.nbytes + self.weights.indices.nbytes + self.weights.indptr.nbytes
+
+    @classmethod
+    def build(
+        cls,
+        texts: Sequence[str],
+        ids: Sequence[str],
+        k1: float = 1.5,
+        b: float = 0.75,
+        epsilon: float = 0.25,
+        tokenizer: Callable[[str], list[str]] = default_tokenizer,
+    ) -> BM25Index:
+        """Tokenise ``texts`` and precompute their BM25 weight matrix."""
+        vectorizer = CountVectorizer(analyzer=tokenizer, dtype=np.float32)
+        tf = vectorizer.fit_transform(texts).tocsr()  # (n_chunks, n_terms)
+        n_docs = tf.shape[0]
+
+        doc_len = np.asarray(tf.sum(axis=1)).ravel()
+        avgdl = doc_len.mean() if n_docs else 0.0
+        doc_freq = np.diff(tf.tocsc().indptr)
+
+        idf = np.log(n_docs - doc_freq + 0.5) - np.log(doc_freq + 0.5)
+        if idf.size:
+            idf[idf < 0] = epsilon * idf.mean()
+
+        # BM25 term weight for every non-zero (chunk, term) entry
+        rows = np.repeat(np.arange(n_docs), np.diff(tf.indptr))
+        norm = k1 * (1 - b + b * doc_len[rows] / avgdl) if avgdl else k1
+        data = idf[tf.indices] * tf.data * (k1 + 1) / (tf.data + norm)
+        weights = sparse.csr_matrix(
+            (data.astype(np.float32), tf.indices, tf.indptr), shape=tf.shape
+        ).tocsc()
+        return cls(
+            {term: int(col) for term, col in vectorizer.vocabulary_.items()},
+            weights,
+            ids,
+            tokenizer,
+        )
+
+    def save(self, directory: str | Path) -> None:
+        """Write the index as plain ``.npy`` arrays that ``load`` can memory-map."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / "data.npy", self.weights.data)
+        np.save(directory / "indices.npy", self.weights.indices)
+        np.save(directory / "indptr.npy", self.weights.indptr)
+        (directory / "vocabulary.json").write_text(json.dumps(self.vocabulary))
+        (directory / "ids.json").write_text(
+            json.dumps({"shape": list(self.weights.shape), "ids": self.ids})
+        )
+
+    @classmethod
+    def load(cls, directory: str | Path, mmap: bool = True) -> BM25Index:
+        """Load an index written by ``save``.
+
+        With ``mmap`` the weight arrays stay on disk and are paged in on
+        demand, so rarely queried indexes cost almost no resident memory.
+        """
+        directory = Path(directory)
+        mode = "r" if mmap else None
+        arrays = [
+            np.load(directory / f"{name}.npy", mmap_mode=mode)
+            for name in ("data", "indices", "indptr")
+        ]
+        meta = json.loads((directory / "ids.json").read_text())
+        weights = sparse.csc_matrix(tuple(arrays), shape=tuple(meta["shape"]), copy=False)
+        vocabulary = json.loads((directory / "vocabulary.json").read_text())
+        return cls(vocabulary, weights, meta["ids"])
+
+    def scores(self, query: str, rows: np.ndarray | None = None) -> np.ndarray:
+        """Return the BM25 score of every chunk (or only of ``rows``) for ``query``."""
+        n = len(self.ids) if rows is None else len(rows)
+        terms = [self.vocabulary[t] for t in self.tokenizer(query) if t in self.vocabulary]
+        if not terms:
+            return np.zeros(n, dtype=np.float32)
+        cols, counts = np.unique(terms, return_counts=True)
+        weights = self.weights[:, cols]
+        if rows is not None:
+            weights = weights[rows]
+        return weights @ counts.astype(np.float32)
+
+    def search(
+        self, query: str, k: int, rows: np.ndarray | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Return ``(rows, scores)`` of the top ``k`` chunks, best first.
+
+        ``rows`` restricts scoring to a candidate set (see ``MetadataIndex``).
+        """
+        scores = self.scores(query, rows)
+        k = min(k, len(scores))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return (top if rows is None else rows[top]), scores[top]
+
+
+def fuse(
+    ranked_lists: Sequence[np.ndarray],
+    weights: Sequence[float],
+    method: str = "rrf",
+    scores: Sequence[np.ndarray] | None = None,
+    c: int = 60,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Fuse ranked lists of integer chunk keys into one ranking.
+
+    ``rrf`` is weighted reciprocal-rank fusion (the ``EnsembleRetriever``
+    formula); ``weighted`` sums min-max normalised leg scores.
+
+    Returns:
+        ``(keys, fused_scores)`` sorted best first.
+    """
+    contributions = []
+    for i, (keys, weight) in enumerate(zip(ranked_lists, weights)):
+        if method == "weighted" and scores is not None:
+            leg = np.asarray(scores[i], dtype=np.float64)
+            spread = leg.max() - leg.min() if leg.size else 0.0
+            normalised = (leg - leg.min()) / spread if spread else np.ones_like(leg)
+            contributions.append(weight * normalised)
+        else:
+            contributions.append(weight / (np.arange(1, len(keys) + 1) + c))
+
+    all_keys = np.concatenate(ranked_lists) if ranked_lists else np.empty(0, dtype=np.int64)
+    if not all_keys.size:
+        return all_keys, np.empty(0)
+    unique, inverse = np.unique(all_keys, return_inverse=True)
+    fused = np.zeros(len(unique))
+    np.add.at(fused, inverse, np.concatenate(contributions))
+    order = np.argsort(-fused, kind="stable")
+    return unique[order], fused[order]
+
+
+@lru_cache(maxsize=1)
+def _leg_executor() -> ThreadPoolExecutor:
+    # Created lazily so a pre-forking master never starts threads
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="retrieval-leg")
+
+
+class HybridRetriever(BaseRetriever):
+    """Vector + BM25 retriever that runs both legs in parallel and fuses on chunk IDs.
+
+    ``vector_store`` only needs ``similarity_search_with_score(query, k)``
+    returning documents with their ``id`` set (as ``Chroma`` does), plus
+    ``get_by_ids`` when ``documents`` is omitted.  ``documents`` are the
+    chunks indexed by ``bm25`` in row order; without them BM25 hits are
+    hydrated from the vector store on demand.  ``metadata_index`` (row-aligned
+    with ``bm25``) enables ``RetrievalFilter`` pre-filtering.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    vector_store: Any
+    bm25: BM25Index
+    documents: list[Document] | None = None
+    metadata_index: MetadataIndex | None = None
+    k: int = 20
+    weights: tuple[float, float] = (0.7, 0.3)
+    fusion: str = "rrf"
+
+    def _vector_leg(
+        self, query: str, embedding: Future | None, ids: list[str] | None, k: int
+    ) -> list[tuple[Document, float]]:
+        # Restricting the HNSW search to ``ids`` makes Chroma pre-filter
+        kwargs = {"ids": ids} if ids is not None else {}
+        if embedding is not None:
+            return self.vector_store.similarity_search_by_vector_with_relevance_scores(
+                embedding.result(), k=k, **kwargs
+            )
+        return self.vector_store.similarity_search_with_score(query, k=k, **kwargs)
+
+    def _hydrate(self, rows: list[int]) -> dict[int, Document]:
+        if self.documents is not None:
+            return {row: self.documents[row] for row in rows}
+        if not rows:
+            return {}
+        ids = [self.bm25.ids[row] for row in rows]
+        by_id = {doc.id: doc for doc in self.vector_store.get_by_ids(ids)}
+        return {row: by_id[self.bm25.ids[row]] for row in rows if self.bm25.ids[row] in by_id}
+
+    def search(
+        self,
+        query: str,
+        embedding: Future | None = None,
+        retrieval_filter: RetrievalFilter | None = None,
+        k: int | None = None,
+    ) -> list[tuple[Document, float]]:
+        """Return fused ``(document, score)`` pairs, best first.
+
+        Args:
+            query: The search query string.
+            embedding: Optional future resolving to the query embedding, so
+                callers searching several stores embed the query only once.
+            retrieval_filter: Optional metadata restrictions, resolved through
+                ``metadata_index`` before either leg scores anything.
+            k: Candidates per leg (defaults to ``self.k``).
+        """
+        k = k or self.k
+        rows = ids = None
+        if retrieval_filter is not None and self.metadata_index is not None:
+            rows = self.metadata_index.rows(retrieval_filter)
+            if rows is not None:
+                if not rows.size:
+                    return []
+                ids = [self.bm25.ids[row] for row in rows.tolist()]
+
+        vector_future = _leg_executor().submit(self._vector_leg, query, embedding, ids, k)
+        bm25_rows, bm25_scores = self.bm25.search(query, k, rows)
+        vector_hits = vector_future.result()
+
+        # Chunks the vector store knows but the BM25 index does not yet get
+        # keys past the end of the index
+        extra: dict[int, Document] = {}
+        vector_rows = np.empty(len(vector_hits), dtype=np.int64)
+        for i, (doc, _) in enumerate(vector_hits):
+            row = self.bm25.row_of.get(doc.id)
+            if row is None:
+                row = len(self.bm25) + len(extra)
+                extra[row] = doc
+            vector_rows[i] = row
+        # Chroma returns distances: smaller is better
+        vector_scores = -np.array([score for _, score in vector_hits], dtype=np.float64)
+
+        keys, fused = fuse(
+            [vector_rows, bm25_rows],
+            self.weights,
+            method=self.fusion,
+            scores=[vector_scores, bm25_scores],
+        )
+        # Vector hits come with their documents; only BM25-only hits need hydrating
+        known = {row: doc for row, (doc, _) in zip(vector_rows.tolist(), vector_hits)}
+        missing = [key for key in keys.tolist() if key not in known and key not in extra]
+        known.update(self._hydrate(missing))
+        known.update(extra)
+        return [
+            (known[key], float(score))
+            for key, score in zip(keys.tolist(), fused)
+            if key in known
+        ]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        return [doc for doc, _ in self.search(query)]
@@ -0,0 +1,241 @@
+"""Double-buffered per-shard indexes with debounced background rebuilds.
+
+Readers get the published index of a shard with a plain dict lookup.  A write
+only marks its shard dirty; one builder thread waits until writes have been
+quiet for ``settings.index_rebuild_debounce`` seconds (but no longer than
+``settings.index_rebuild_max_delay`` after the first pending write), builds the
+next generation off the request path and publishes it with a single reference
+swap.  Until then readers keep using the previous generation, so no request
+pays for a rebuild and a burst of writes costs one rebuild.
+
+Only a shard that has never been built is built on the reading thread (once,
+however many readers wait for it).  ``invalidate`` is for destructive changes
+– a cleared or replaced collection – where serving the previous generation
+would be wrong; it drops the index and discards any build in flight.
+
+Writes made by other processes are picked up through ``watch``, which
+returns a destructive-change count and a version per shard from shared
+storage (``src.rag.shards.shard_versions``).  It is checked at most every
+``settings.index_watch_interval`` seconds, by readers and by a running
+builder: a moved shard version marks that shard dirty, a moved
+destructive-change count invalidates every index.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections.abc import Callable
+from typing import Generic, TypeVar
+
+from loguru import logger
+
+from src import metrics
+from src.config import settings
+
+T = TypeVar("T")
+
+Versions = tuple[int, dict[str, int]]
+
+
+class IndexManager(Generic[T]):
+    def __init__(
+        self,
+        build: Callable[[str], T],
+        debounce: float | None = None,
+        max_delay: float | None = None,
+        watch: Callable[[], Versions] | None = None,
+        watch_interval: float | None = None,
+    ) -> None:
+        self._build = build
+        self._debounce = debounce
+        self._max_delay = max_delay
+        self._watch = watch
+        self._watch_interval = watch_interval
+        # Versions the published indexes reflect; inherited by forked workers,
+        # so they catch up on writes made after the parent built its indexes
+        self._seen: Versions | None = None
+        self._next_check = 0.0
+        self._check_lock = threading.Lock()
+        self._published: dict[str, T] = {}
+        self._generation: dict[str, int] = {}
+        self._epoch: dict[str, int] = {}  # bumped by invalidate(); stale builds are dropped
+        self._build_locks: dict[str, threading.Lock] = {}
+        self._dirty: set[str] = set()
+        self._first_dirty = self._last_dirty = 0.0
+        self._building = False
+        self._cond = threading.Condition()
+        self._pid: int | None = None
+
+    @property
+    def debounce(self) -> float:
+        return settings.index_rebuild_debounce if self._debounce is None else self._debounce
+
+    @property
+    def max_delay(self) -> float:
+        return settings.index_rebuild_max_delay if self._max_delay is None else self._max_delay
+
+    @property
+    def watch_interval(self) -> float:
+        if self._watch_interval is None:
+            return settings.index_watch_interval
+        return self._watch_interval
+
+    def get(self, shard: str) -> T:
+        """Return the published index of ``shard``, building it here if it has none yet."""
+        self.check_outside_writes()
+        index = self._published.get(shard)
+        if index is not None:
+            return index
+        with self._build_lock(shard):
+            index = self._published.get(shard)
+            if index is None:
+                epoch = self._epoch.get(shard, 0)
+                index = self._build(shard)
+                self._publish(shard, index, epoch)
+        return index
+
+    def _build_lock(self, shard: str) -> threading.Lock:
+        # Serialises builds of one shard, so a reader of a never-built shard
+        # waits for a build in progress instead of starting another
+        with self._cond:
+            return self._build_locks.setdefault(shard, threading.Lock())
+
+    def generation(self, shard: str) -> int:
+        """How many times ``shard`` has been published (0 = never built)."""
+        return self._generation.get(shard, 0)
+
+    def generations(self) -> dict[str, int]:
+        """Publish count of every shard built so far."""
+        with self._cond:
+            return dict(self._generation)
+
+    def items(self) -> list[tuple[str, T]]:
+        return list(self._published.items())
+
+    def mark_dirty(self, shard: str) -> None:
+        """Schedule a background rebuild of ``shard`` (debounced)."""
+        now = time.monotonic()
+        with self._cond:
+            self._ensure_builder()
+            if not self._dirty:
+                self._first_dirty = now
+            self._dirty.add(shard)
+            self._last_dirty = now
+            self._cond.notify_all()
+
+    def invalidate(self, shard: str | None) -> None:
+        """Drop the index of ``shard`` (``None`` drops all of them) and any build in flight."""
+        with self._cond:
+            shards = list(self._published) + list(self._dirty) if shard is None else [shard]
+            for name in shards:
+                self._published.pop(name, None)
+                self._epoch[name] = self._epoch.get(name, 0) + 1
+                self._dirty.discard(name)
+
+    def check_outside_writes(self, force: bool = False) -> None:
+        """Mark shards written by other processes dirty; invalidate all after a reset.
+
+        Rate-limited to one read of ``watch`` per ``watch_interval`` unless
+        ``force``; concurrent callers skip the check instead of waiting.
+        """
+        if self._watch is None:
+            return
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return
+        if not self._check_lock.acquire(blocking=force):
+            return
+        try:
+            self._next_check = now + self.watch_interval
+            try:
+                versions = self._watch()
+            except Exception as e:
+                logger.warning("Checking shard versions failed: {}", e)
+                return
+            seen, self._seen = self._seen, versions
+            if seen is None or versions == seen:
+                return
+            resets, shards = versions
+            if resets != seen[0]:
+                metrics.increment("index.outside_invalidations")
+                self.invalidate(None)
+                return
+            for shard, version in shards.items():
+                if version != seen[1].get(shard) and shard in self._published:
+                    self.mark_dirty(shard)
+        finally:
+            self._check_lock.release()
+
+    def wait_idle(self, timeout: float | None = None) -> bool:
+        """Block until no rebuild is pending or running; ``False`` on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._dirty and not self._building, timeout)
+
+    def _publish(self, shard: str, index: T, epoch: int) -> bool:
+        with self._cond:
+            if self._epoch.get(shard, 0) != epoch:
+                return False
+            self._published[shard] = index  # the atomic swap readers observe
+            self._generation[shard] = self._generation.get(shard, 0) + 1
+            return True
+
+    def _ensure_builder(self) -> None:
+        # Called with ``_cond`` held; threads do not survive fork(), so a forked
+        # worker starts its own builder
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name="index-builder", daemon=True).start()
+
+    def _next_batch(self) -> dict[str, int]:
+        while True:
+            with self._cond:
+                timeout = None
+                if self._dirty:
+                    now = time.monotonic()
+                    ready_at = min(
+                        self._last_dirty + self.debounce, self._first_dirty + self.max_delay
+                    )
+                    if now >= ready_at:
+                        break
+                    timeout = ready_at - now
+                if self._watch is not None:
+                    timeout = min(timeout or self.watch_interval, self.watch_interval)
+                self._cond.wait(timeout)
+            self.check_outside_writes()
+        # Record the versions this batch will reflect, so the writes behind
+        # it are not picked up again as outside writes once it is published
+        self.check_outside_writes(force=True)
+        with self._cond:
+            batch = {shard: self._epoch.get(shard, 0) for shard in self._dirty}
+            self._dirty.clear()
+            self._building = True
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            for shard, epoch in batch.items():
+                started = time.perf_counter()
+                try:
+                    with self._build_lock(shard):
+                        index = self._build(shard)
+                except Exception as e:
+                    # Readers keep the previous generation; the next write retries
+                    logger.error("Background rebuild of shard '{}' failed: {}", shard, e)
+                    metrics.increment("index.rebuild_failures")
+                    continue
+                elapsed = time.perf_counter() - started
+                if self._publish(shard, index, epoch):
+                    metrics.increment("index.rebuilds")
+                    metrics.observe("index.rebuild_seconds", elapsed)
+                    logger.info(
+                        "Published generation {} of shard '{}' (built in {:.2f}s)",
+                        self.generation(shard),
+                        shard,
+                        elapsed,
+                    )
+            with self._cond:
+                self._building = False
+                self._cond.notify_all()
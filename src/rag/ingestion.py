@@ -13,6 +13,7 @@ from langchain_text_splitters import RecursiveCharacterTextSplitter
 from loguru import logger
 
 from src.config import settings
+from src.rag.dedup import deduplicate
 
 
 def load_documents(data_dir: str | Path = "data") -> list[Document]:
@@ -23,7 +24,7 @@ def load_documents(data_dir: str | Path = "data") -> list[Document]:
     """
     data_path = Path(data_dir)
     if not data_path.exists():
-        logger.warning(f"Data directory '{data_path}' does not exist.")
+        logger.warning("Data directory '{}' does not exist.", data_path)
         return []
 
     documents: list[Document] = []
@@ -35,24 +36,33 @@ def load_documents(data_dir: str | Path = "data") -> list[Document]:
     documents.extend(txt_loader.load())
 
 
-    logger.info(f"Loaded {len(documents)} document(s) from '{data_path}'.")
+    logger.info("Loaded {} document(s) from '{}'.", len(documents), data_path)
     return documents
 
 def load_text_content(content: str) -> list[Document]:
     document = Document(page_content=content, metadata={"source": "text"})
     return [document]
 
-def split_documents(documents: list[Document]) -> list[Document]:
-    """Split documents into chunks suitable for embedding."""
-    splitter = RecursiveCharacterTextSplitter(
+
+def make_splitter() -> RecursiveCharacterTextSplitter:
+    """The splitter every ingestion path uses (``chunk_size`` / ``chunk_overlap``)."""
+    return RecursiveCharacterTextSplitter(
         chunk_size=settings.chunk_size,
         chunk_overlap=settings.chunk_overlap,
         length_function=len,
         separators=["\n\n", "\n", ". ", " ", ""],
     )
-    chunks = splitter.split_documents(documents)
-    logger.info(f"Split into {len(chunks)} chunk(s).")
-    return chunks
+
+
+def split_documents(documents: list[Document], dedup: bool = True) -> list[Document]:
+    """Split documents into chunks suitable for embedding.
+
+    With ``dedup`` (and ``settings.dedup_enabled``) near-duplicate chunks are
+    dropped before they reach the embedding model; see ``src.rag.dedup``.
+    """
+    chunks = make_splitter().split_documents(documents)
+    logger.info("Split into {} chunk(s).", len(chunks))
+    return deduplicate(chunks) if dedup else chunks
 
 
 def ingest(data_dir: str | Path = "data") -> list[Document]:
@@ -80,13 +90,12 @@ def ingest_text_content(content: str, metadata: dict | None = None) -> list[Docu
         logger.warning("Empty content provided for ingestion")
         return []
 
-    # Split the document into chunks using the existing splitter
-    chunks = split_documents(load_text_content(content))
-
-    # Apply caller-supplied metadata to every chunk so provenance is preserved
+    # Apply caller-supplied metadata before splitting so provenance is preserved
+    # on every chunk (and near-duplicates are told apart by their source)
+    documents = load_text_content(content)
     if metadata:
-        for chunk in chunks:
-            chunk.metadata.update(metadata)
+        documents[0].metadata.update(metadata)
+    chunks = split_documents(documents)
 
-    logger.info(f"Ingested text content into {len(chunks)} chunk(s)")
+    logger.info("Ingested text content into {} chunk(s)", len(chunks))
     return chunks
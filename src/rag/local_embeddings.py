@@ -0,0 +1,203 @@
+"""Local CPU embeddings with a sentence-transformer and dynamic batching.
+
+``LocalEmbeddings`` runs ``settings.local_embedding_model`` in-process, so
+query embeddings need no network round trip and bulk ingestion is not
+bound by API rate limits.  Backends:
+
+* ``torch`` – the plain PyTorch model
+* ``int8``  – PyTorch with dynamically int8-quantized ``Linear`` layers
+* ``onnx``  – ONNX Runtime (needs ``sentence-transformers[onnx]``, 3.2+);
+  ``LOCAL_EMBEDDING_ONNX_FILE`` selects pre-quantized weights from the model
+  repository, e.g. ``onnx/model_qint8_avx512.onnx``
+
+All calls go through one :class:`DynamicBatcher` thread that owns the model:
+requests arriving while a forward pass runs are encoded together in the next
+one, so concurrent queries share passes instead of contending for CPU cores.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from loguru import logger
+
+from src import metrics
+from src.config import settings
+
+
+@dataclass
+class _Request:
+    texts: list[str]
+    future: Future = field(default_factory=Future)
+
+
+class DynamicBatcher:
+    """Serve ``encode`` calls from a single worker thread in dynamic batches.
+
+    Each pass takes every request already queued (up to ``max_batch`` texts),
+    optionally waiting ``max_wait`` seconds for more.  Requests larger than
+    ``max_batch`` are split across passes.  The worker starts on first use
+    and again in a forked child, whose threads do not survive the fork.
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[list[str]], np.ndarray],
+        max_batch: int = 64,
+        max_wait: float = 0.0,
+    ) -> None:
+        self._encode = encode
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: queue.SimpleQueue[_Request] = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._pid: int | None = None
+
+    def submit(self, texts: list[str]) -> Future:
+        """Queue ``texts``; the future resolves to their ``(len(texts), dim)`` embeddings."""
+        self._ensure_worker()
+        request = _Request(list(texts))
+        self._queue.put(request)
+        return request.future
+
+    def _ensure_worker(self) -> None:
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.SimpleQueue()
+                threading.Thread(target=self._run, name="embedding-batcher", daemon=True).start()
+                self._pid = os.getpid()
+
+    def _collect(self) -> list[_Request]:
+        batch = [self._queue.get()]
+        size = len(batch[0].texts)
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                if timeout > 0:
+                    request = self._queue.get(timeout=timeout)
+                else:
+                    request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            texts = [text for request in batch for text in request.texts]
+            try:
+                parts = [
+                    self._encode(texts[start : start + self.max_batch])
+                    for start in range(0, len(texts), self.max_batch)
+                ]
+                vectors = np.concatenate(parts) if parts else np.empty((0, 0), np.float32)
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            metrics.increment("embeddings.local.passes")
+            metrics.increment("embeddings.local.texts", len(texts))
+            metrics.observe("embeddings.local.batch_requests", len(batch))
+            offset = 0
+            for request in batch:
+                request.future.set_result(vectors[offset : offset + len(request.texts)])
+                offset += len(request.texts)
+
+
+def load_sentence_transformer():
+    """Load ``settings.local_embedding_model`` with the configured backend and threads."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    threads = settings.local_embedding_threads
+    if threads > 0:
+        torch.set_num_threads(threads)
+
+    backend = settings.local_embedding_backend
+    started = time.perf_counter()
+    if backend == "onnx":
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        model_kwargs: dict = {"provider": "CPUExecutionProvider", "session_options": options}
+        if settings.local_embedding_onnx_file:
+            model_kwargs["file_name"] = settings.local_embedding_onnx_file
+        model = SentenceTransformer(
+            settings.local_embedding_model, device="cpu", backend="onnx", model_kwargs=model_kwargs
+        )
+    elif backend in ("torch", "int8"):
+        model = SentenceTransformer(settings.local_embedding_model, device="cpu")
+        if backend == "int8":
+            model = torch.ao.quantization.quantize_dynamic(
+                model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+    else:
+        raise ValueError(f"Unknown LOCAL_EMBEDDING_BACKEND '{backend}'")
+
+    logger.info(
+        "Loaded local embedding model '{}' ({}) in {:.1f}s",
+        settings.local_embedding_model,
+        backend,
+        time.perf_counter() - started,
+    )
+    return model
+
+
+class LocalEmbeddings(Embeddings):
+    """LangChain ``Embeddings`` backed by an in-process sentence-transformer."""
+
+    def __init__(self, model=None, max_batch: int | None = None, max_wait: float | None = None):
+        self._model = model
+        self._model_lock = threading.Lock()
+        self.batcher = DynamicBatcher(
+            self._encode,
+            max_batch=max_batch or settings.local_embedding_max_batch,
+            max_wait=(
+                settings.local_embedding_max_wait_ms / 1000 if max_wait is None else max_wait
+            ),
+        )
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = load_sentence_transformer()
+        return self._model
+
+    def _encode(self, texts: list[str]) -> np.ndarray:
+        return self.model.encode(
+            texts,
+            batch_size=len(texts),
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.batcher.submit(texts).result().tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.batcher.submit([text]).result()[0].tolist()
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return (await asyncio.wrap_future(self.batcher.submit(texts))).tolist()
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return (await asyncio.wrap_future(self.batcher.submit([text])))[0].tolist()
@@ -0,0 +1,133 @@
+"""Cache of re-ranked retrieval results.
+
+Repeated and popular claims run the same query embedding, vector search,
+BM25 scoring and FlashRank re-ranking every time, even when their verdict
+cannot be reused.  ``RetrievalCache`` keeps the outcome – the re-ranked
+chunk IDs with their relevance scores – in a bounded LRU keyed by the
+normalized query, the filter, the retrieval settings and the index
+generation: ``kb_generation()`` (bumped by every knowledge-base write, in
+any worker) plus the publish count of every shard's hybrid index.  A write
+or a background index rebuild therefore makes older entries unreachable
+without explicit invalidation; they are dropped as soon as another
+generation is seen.
+
+Only IDs are cached.  A hit hydrates the documents from Chroma, so the
+cache stays small and metadata updates (such as alternate sources) are
+picked up.  Hits, misses and the hit ratio are reported through
+``src.metrics`` (``retrieval.cache.*``).
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+
+from langchain_core.documents import Document
+
+from src import metrics
+from src.normalize import normalize_claim
+from src.rag.filters import RetrievalFilter
+
+# (chunk id, relevance score) pairs, best first
+Ranking = list[tuple[str, float | None]]
+
+
+class RetrievalCache:
+    """Bounded LRU of re-ranked chunk IDs for one index generation.
+
+    Args:
+        max_entries: Cached queries (``0`` disables the cache).
+        hydrate: Loads documents by ID; documents it cannot find are omitted.
+    """
+
+    def __init__(
+        self, max_entries: int, hydrate: Callable[[list[str]], list[Document]]
+    ) -> None:
+        self.max_entries = max_entries
+        self._hydrate = hydrate
+        self._entries: OrderedDict[Hashable, Ranking] = OrderedDict()
+        self._generation: Hashable = None
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(query: str, retrieval_filter: RetrievalFilter | None, *parts: Hashable) -> tuple:
+        """Cache key of a query; ``parts`` are the settings that shape its result."""
+        filters = (
+            retrieval_filter.model_dump_json(exclude_none=True)
+            if retrieval_filter is not None and not retrieval_filter.is_empty
+            else ""
+        )
+        return (normalize_claim(query), filters, *parts)
+
+    def get(self, key: Hashable, generation: Hashable) -> list[Document] | None:
+        """Return the cached documents of ``key`` at ``generation``, or ``None``."""
+        with self._lock:
+            self._roll(generation)
+            ranking = self._entries.get(key)
+            if ranking is not None:
+                self._entries.move_to_end(key)
+        if ranking is None:
+            self._count(hit=False)
+            return None
+
+        with metrics.timer("retrieval.cache.hydrate"):
+            by_id = {doc.id: doc for doc in self._hydrate([chunk_id for chunk_id, _ in ranking])}
+        if len(by_id) < len(ranking):
+            # Chunks deleted without a generation bump (e.g. a snapshot import in progress)
+            metrics.increment("retrieval.cache.stale")
+            with self._lock:
+                self._entries.pop(key, None)
+            self._count(hit=False)
+            return None
+
+        self._count(hit=True)
+        documents = []
+        for chunk_id, score in ranking:
+            doc = by_id[chunk_id]
+            metadata = dict(doc.metadata or {})
+            if score is not None:
+                metadata["relevance_score"] = score
+            documents.append(Document(page_content=doc.page_content, metadata=metadata, id=doc.id))
+        return documents
+
+    def put(self, key: Hashable, generation: Hashable, documents: list[Document]) -> None:
+        """Remember the re-ranked ``documents`` of ``key``; documents without an ID are not."""
+        if self.max_entries <= 0 or any(doc.id is None for doc in documents):
+            return
+        ranking = [(doc.id, doc.metadata.get("relevance_score")) for doc in documents]
+        with self._lock:
+            if generation != self._generation:
+                return  # the index changed while the query ran
+            self._entries[key] = ranking
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            metrics.set_gauge("retrieval.cache.entries", len(self._entries))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generation = None
+            self.hits = self.misses = 0
+
+    def _roll(self, generation: Hashable) -> None:
+        # Called with ``_lock`` held: entries of other generations can never hit again
+        if generation != self._generation:
+            self._entries.clear()
+            self._generation = generation
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            ratio = self.hits / (self.hits + self.misses)
+        metrics.increment("retrieval.cache.hits" if hit else "retrieval.cache.misses")
+        metrics.set_gauge("retrieval.cache.hit_ratio", ratio)
+
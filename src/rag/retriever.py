@@ -2,63 +2,331 @@
 
 from __future__ import annotations
 
+from concurrent.futures import Future, ThreadPoolExecutor
 from functools import lru_cache
 
-from langchain_classic.retrievers import EnsembleRetriever
-from langchain_community.retrievers import BM25Retriever
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
 from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
 from loguru import logger
 
+from src import metrics
 from src.config import settings
-from src.rag.vector_store import get_all_documents, get_vector_store
+from src.rag.adaptive import adaptive_rerank
+from src.rag.embeddings import get_embedding_model
+from src.rag.filters import MetadataIndex, RetrievalFilter, shard_may_match
+from src.rag.hybrid import BM25Index, HybridRetriever
+from src.rag.index_manager import IndexManager
+from src.rag.re_ranker import rerank_scores
+from src.rag.retrieval_cache import RetrievalCache
+from src.rag.shards import (
+    DEFAULT_SHARD,
+    is_cold,
+    kb_generation,
+    lexical_index_dir,
+    shard_versions,
+)
+from src.rag.vector_store import get_all_documents, get_vector_store, list_shards
 
 
-@lru_cache(maxsize=1)
-def get_hybrid_retriever() -> EnsembleRetriever:
-    """Return a hybrid retriever combining vector similarity and BM25 keyword search.
+def _build_shard_retriever(shard: str) -> HybridRetriever:
+    """Build the hybrid retriever of one shard.
 
-    Both retrievers operate over the same document set stored in the vector store.
-    The result is cached; call ``clear_retriever_caches()`` after ingesting new
-    documents.
+    A persisted lexical index (written for cold shards or installed from a
+    snapshot) is reused when it covers the whole collection; its hits are
+    hydrated from Chroma on demand instead of loading every chunk.  Cold
+    shards keep it memory-mapped, hot shards load it into memory.
     """
-    vector_store = get_vector_store()
-    vector_retriever = vector_store.as_retriever(
-        search_kwargs={"k": settings.retriever_top_k},
-    )
+    store = get_vector_store(shard)
+    index_dir = lexical_index_dir(shard)
+    cold = is_cold(shard)
 
-    # Load all documents from the vector store so BM25 indexes the same corpus
-    documents = get_all_documents()
+    if (index_dir / "timestamps.npy").exists():
+        bm25 = BM25Index.load(index_dir, mmap=cold)
+        if len(bm25) == store._collection.count():
+            logger.info(
+                "Loaded persisted BM25 index of shard '{}' ({} chunks, {})",
+                shard,
+                len(bm25),
+                "memory-mapped" if cold else "resident",
+            )
+            return _hybrid(store, bm25, MetadataIndex.load(index_dir, mmap=cold), documents=None)
+
+    # Load all documents from the shard so BM25 indexes the same corpus
+    documents = get_all_documents(shard)
 
     if not documents:
         logger.warning(
-            "Vector store is empty – BM25 retriever will be initialised with a "
-            "placeholder document.  Ingest data to get meaningful results."
+            "Shard '{}' is empty – BM25 index will be initialised with a placeholder document.  "
+            "Ingest data to get meaningful results.",
+            shard,
         )
-        # BM25Retriever.from_documents requires at least one document
-        documents = [Document(page_content="(empty knowledge base)", metadata={"source": "placeholder"})]
+        documents = [
+            Document(
+                page_content="(empty knowledge base)",
+                metadata={"source": "placeholder"},
+                id="placeholder",
+            )
+        ]
 
-    bm25_retriever = BM25Retriever.from_documents(
-        documents=documents, k=settings.retriever_top_k,
+    bm25 = BM25Index.build(
+        [doc.page_content for doc in documents], [doc.id for doc in documents]
+    )
+    metadata_index = MetadataIndex.build([doc.metadata for doc in documents])
+    logger.info(
+        "Built BM25 index of shard '{}' over {} chunk(s) ({:.1f} MB)",
+        shard,
+        len(bm25),
+        bm25.nbytes / 1e6,
     )
 
-    return EnsembleRetriever(
-        retrievers=[vector_retriever, bm25_retriever], weights=[0.7, 0.3],
+    if cold:
+        bm25.save(index_dir)
+        metadata_index.save(index_dir)
+        return _hybrid(
+            store,
+            BM25Index.load(index_dir, mmap=True),
+            MetadataIndex.load(index_dir),
+            documents=None,
+        )
+    return _hybrid(store, bm25, metadata_index, documents)
+
+
+def _hybrid(
+    store,
+    bm25: BM25Index,
+    metadata_index: MetadataIndex,
+    documents: list[Document] | None,
+) -> HybridRetriever:
+    return HybridRetriever(
+        vector_store=store,
+        bm25=bm25,
+        metadata_index=metadata_index,
+        documents=documents,
+        k=settings.retriever_top_k,
+        weights=(settings.hybrid_vector_weight, settings.hybrid_bm25_weight),
+        fusion=settings.hybrid_fusion,
+    )
+
+
+# Published retrievers per shard; rebuilt in the background after writes, in
+# this process or (seen through the shard registry) in any other worker
+_shard_indexes: IndexManager[HybridRetriever] = IndexManager(
+    _build_shard_retriever, watch=shard_versions
+)
+
+
+def get_shard_retriever(shard: str = DEFAULT_SHARD) -> HybridRetriever:
+    """Return the published hybrid retriever of one shard, building it if it has none."""
+    return _shard_indexes.get(shard)
+
+
+def mark_shard_dirty(shard: str) -> None:
+    """Rebuild the retriever of ``shard`` in the background after new writes.
+
+    Queries keep using the current generation until the new one is swapped
+    in; chunks missing from its BM25 index are still found by the vector leg.
+    """
+    _shard_indexes.mark_dirty(shard)
+
+
+def invalidate_shard(shard: str | None) -> None:
+    """Drop the retriever of ``shard`` (``None`` drops all of them) right away.
+
+    For destructive changes (cleared or replaced collections); plain writes
+    use ``mark_shard_dirty``.
+    """
+    _shard_indexes.invalidate(shard)
+
+
+def wait_for_rebuilds(timeout: float | None = None) -> bool:
+    """Block until pending background rebuilds are published; ``False`` on timeout."""
+    return _shard_indexes.wait_idle(timeout)
+
+
+def warm_shards() -> None:
+    """Build the retriever of every shard ahead of the first query."""
+    for shard in list_shards():
+        get_shard_retriever(shard)
+
+
+def reset_vector_retriever() -> None:
+    """Rebind the vector leg of already-built shard retrievers to the current stores.
+
+    Used after ``reopen_vector_store()`` so the (expensive) BM25 legs are kept.
+    """
+    for shard, retriever in _shard_indexes.items():
+        retriever.vector_store = get_vector_store(shard)
+
+
+@lru_cache(maxsize=1)
+def _shard_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="retrieval-shard")
+
+
+class ShardedRetriever(BaseRetriever):
+    """Fan a query out to every shard's hybrid retriever in parallel and merge.
+
+    The query is embedded once and shared by all shards.  Candidates are
+    merged by their fused score; the cross-encoder re-ranker decides the
+    final order.
+    """
+
+    k: int = 20
+
+    def search(
+        self,
+        query: str,
+        retrieval_filter: RetrievalFilter | None = None,
+        k: int | None = None,
+        embedding: Future | None = None,
+    ) -> list[Document]:
+        """Return merged candidates from every shard that can match ``retrieval_filter``.
+
+        ``k`` overrides the per-leg depth; ``embedding`` is a future of the
+        query embedding, for callers that search the same query repeatedly.
+        """
+        k = k or self.k
+        shards = [shard for shard in list_shards() if shard_may_match(shard, retrieval_filter)]
+        if not shards:
+            return []
+        if len(shards) == 1:
+            hits = get_shard_retriever(shards[0]).search(query, embedding, retrieval_filter, k)
+            return [doc for doc, _ in hits]
+
+        executor = _shard_executor()
+        if embedding is None:
+            embedding = executor.submit(get_embedding_model().embed_query, query)
+        futures = [
+            executor.submit(
+                lambda s=shard: get_shard_retriever(s).search(
+                    query, embedding, retrieval_filter, k
+                )
+            )
+            for shard in shards
+        ]
+        hits = [hit for future in futures for hit in future.result()]
+        hits.sort(key=lambda hit: hit[1], reverse=True)
+        return [doc for doc, _ in hits[: 2 * k]]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        return self.search(query)
+
+
+@lru_cache(maxsize=1)
+def get_hybrid_retriever() -> ShardedRetriever:
+    """Return the hybrid retriever combining vector similarity and BM25 keyword search.
+
+    Each shard has its own legs operating over the same document set stored
+    in its collection; they run concurrently and are fused on chunk IDs
+    (weighted reciprocal-rank fusion by default, see ``settings.hybrid_fusion``).
+    Shard indexes are published per shard and rebuilt in the background after
+    writes (see ``mark_shard_dirty``), so the returned object never goes stale.
+    """
+    return ShardedRetriever(k=settings.retriever_top_k)
+
+
+def _adaptive_context(query: str, retrieval_filter: RetrievalFilter | None) -> list[Document]:
+    """Retrieve shallow first and stop re-ranking early (see ``src.rag.adaptive``)."""
+    retriever = get_hybrid_retriever()
+    # Embed once, however often the depth is widened
+    embedding = _shard_executor().submit(get_embedding_model().embed_query, query)
+    result = adaptive_rerank(
+        query,
+        fetch=lambda k: retriever.search(query, retrieval_filter, k=k, embedding=embedding),
+        score=rerank_scores,
     )
+    metrics.increment("retrieval.adaptive.queries")
+    metrics.increment("retrieval.adaptive.reranked", result.reranked)
+    metrics.increment(f"retrieval.adaptive.stop.{result.stop}")
+    metrics.observe("retrieval.adaptive.depth", result.depth)
+    return result.documents
+
+
+def _reranked_context(query: str, retrieval_filter: RetrievalFilter | None) -> list[Document]:
+    """Fetch ``retriever_top_k`` candidates per leg and re-rank all of them."""
+    candidates = get_hybrid_retriever().search(query, retrieval_filter)
+    if not candidates:
+        return []
+    # Scores come back by position: chunk metadata (an NDJSON record's own
+    # ``id`` field, say) cannot be mistaken for the candidate it belongs to
+    scores = rerank_scores(query, candidates)
+    order = sorted(range(len(candidates)), key=lambda i: scores[i], reverse=True)
+    return [
+        Document(
+            page_content=candidates[i].page_content,
+            metadata={**candidates[i].metadata, "relevance_score": scores[i]},
+            id=candidates[i].id,
+        )
+        for i in order[: settings.retriever_top_n]
+    ]
+
+
+def _hydrate(ids: list[str]) -> list[Document]:
+    """Load chunks by ID from whichever shards hold them."""
+    missing, documents = set(ids), []
+    for shard in list_shards():
+        found = get_vector_store(shard).get_by_ids(list(missing))
+        documents.extend(found)
+        missing.difference_update(doc.id for doc in found)
+        if not missing:
+            break
+    return documents
+
 
+# Re-ranked chunk IDs of recent queries, per index generation
+_retrieval_cache = RetrievalCache(settings.retrieval_cache_size, _hydrate)
 
-def get_context_after_re_ranker(query: str) -> list[Document]:
+
+def get_retrieval_cache() -> RetrievalCache:
+    """Return this process's retrieval cache (for stats and memory accounting)."""
+    return _retrieval_cache
+
+
+def _index_generation() -> tuple:
+    """Changes whenever the knowledge base is written or a shard index is republished."""
+    return kb_generation(), tuple(sorted(_shard_indexes.generations().items()))
+
+
+def get_context_after_re_ranker(
+    query: str, retrieval_filter: RetrievalFilter | None = None
+) -> list[Document]:
     """Retrieve documents via the hybrid retriever and re-rank them.
 
+    Results are cached per index generation (see ``src.rag.retrieval_cache``),
+    so a repeated query costs one document lookup by ID.
+
     Args:
         query: The search query string.
+        retrieval_filter: Optional recency / source type / domain restrictions,
+            applied through the shards' metadata indexes before scoring.
 
     Returns:
         Re-ranked list of documents relevant to the query.
     """
-    # Lazy import to avoid circular dependency (re_ranker → retriever → re_ranker)
-    from src.rag.re_ranker import get_re_ranker_retriever
+    cache = _retrieval_cache if settings.retrieval_cache_size > 0 else None
+    if cache is not None:
+        cache.max_entries = settings.retrieval_cache_size
+        key = cache.key(
+            query,
+            retrieval_filter,
+            settings.adaptive_retrieval,
+            settings.retriever_top_k,
+            settings.retriever_top_n,
+        )
+        generation = _index_generation()
+        docs = cache.get(key, generation)
+        if docs is not None:
+            logger.debug("Retrieval cache hit for query: {}", query[:100])
+            return docs
 
-    re_ranker_retriever = get_re_ranker_retriever()
-    docs: list[Document] = re_ranker_retriever.invoke(query)
-    logger.info(f"Re-ranker returned {len(docs)} document(s) for query: {query[:100]}")
-    return docs
\ No newline at end of file
+    if settings.adaptive_retrieval:
+        docs = _adaptive_context(query, retrieval_filter)
+    else:
+        docs = _reranked_context(query, retrieval_filter)
+    if cache is not None:
+        cache.put(key, generation, docs)
+    logger.info("Re-ranker returned {} document(s) for query: {}", len(docs), query[:100])
+    return docs
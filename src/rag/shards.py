@@ -0,0 +1,201 @@
+"""Shard layout of the knowledge base.
+
+With ``settings.shard_collections`` enabled, chunks are stored in one Chroma
+collection per shard – curated files in ``file``, web-synced chunks in
+``web-<time bucket>`` – and each shard gets its own HNSW graph and BM25 index.
+A web sync then only invalidates the indexes of the shard it wrote to, and
+shards that have not been written for ``settings.shard_cold_after_days`` keep
+their lexical index memory-mapped instead of resident.
+
+With sharding disabled everything lives in the single ``default`` shard,
+which maps onto ``settings.chroma_collection_name`` as before.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import threading
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+
+from src.config import settings
+
+DEFAULT_SHARD = "default"
+FILE_SHARD = "file"
+
+_lock = threading.Lock()
+
+
+def parse_date(value: str | None) -> datetime | None:
+    """Parse an ISO-8601 or RFC 2822 date (as Tavily returns them); ``None`` if invalid."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=UTC)
+
+
+def _time_bucket(moment: datetime) -> str:
+    if settings.shard_time_bucket == "year":
+        return f"{moment.year:04d}"
+    if settings.shard_time_bucket == "week":
+        year, week, _ = moment.isocalendar()
+        return f"{year:04d}-w{week:02d}"
+    return f"{moment.year:04d}-{moment.month:02d}"
+
+
+def shard_for(metadata: dict) -> str:
+    """Return the shard a chunk with ``metadata`` belongs to."""
+    if not settings.shard_collections:
+        return DEFAULT_SHARD
+    if metadata.get("source_type") != "web":
+        return FILE_SHARD
+    moment = parse_date(metadata.get("published_date")) or datetime.now(UTC)
+    return f"web-{_time_bucket(moment)}"
+
+
+def collection_name(shard: str) -> str:
+    """Chroma collection backing ``shard``."""
+    if shard == DEFAULT_SHARD:
+        return settings.chroma_collection_name
+    return f"{settings.chroma_collection_name}__{shard}"
+
+
+def shard_of_collection(name: str) -> str | None:
+    """Inverse of ``collection_name``; ``None`` for unrelated collections."""
+    if name == settings.chroma_collection_name:
+        return DEFAULT_SHARD
+    prefix = f"{settings.chroma_collection_name}__"
+    return name[len(prefix) :] if name.startswith(prefix) else None
+
+
+# ---------------------------------------------------------------------------
+# Write bookkeeping (shared by all worker processes through small files under a file lock)
+# ---------------------------------------------------------------------------
+
+
+def _registry_path() -> Path:
+    return Path(settings.chroma_persist_dir) / "shards.json"
+
+
+@contextmanager
+def _locked() -> Iterator[None]:
+    """Serialize read-modify-write of the bookkeeping files across threads and processes."""
+    with _lock:
+        directory = Path(settings.chroma_persist_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        with open(directory / "shards.lock", "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    # A unique temporary name: a shared one can be replaced away by another writer
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{uuid.uuid4().hex}.tmp")
+    tmp.write_text(text)
+    tmp.replace(path)
+
+
+def _read_registry() -> dict[str, dict]:
+    try:
+        return json.loads(_registry_path().read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _generation_path() -> Path:
+    return Path(settings.chroma_persist_dir) / "generation"
+
+
+def _resets_path() -> Path:
+    return Path(settings.chroma_persist_dir) / "resets"
+
+
+def _read_counter(path: Path) -> int:
+    try:
+        return int(path.read_text())
+    except (OSError, ValueError):
+        return 0
+
+
+def kb_generation() -> int:
+    """Monotonic counter of knowledge-base changes (bumped on every write)."""
+    return _read_counter(_generation_path())
+
+
+def set_generation(value: int) -> None:
+    """Overwrite the knowledge-base generation (e.g. after importing a snapshot)."""
+    with _locked():
+        _write_atomic(_generation_path(), str(value))
+
+
+def bump_generation() -> int:
+    """Advance the knowledge-base generation and return the new value."""
+    with _locked():
+        generation = kb_generation() + 1
+        _write_atomic(_generation_path(), str(generation))
+    return generation
+
+
+def record_write(shard: str) -> None:
+    """Remember that ``shard`` was just written to."""
+    with _locked():
+        _write_atomic(_generation_path(), str(kb_generation() + 1))
+        registry = _read_registry()
+        entry = registry.setdefault(shard, {})
+        entry["updated_at"] = time.time()
+        entry["writes"] = entry.get("writes", 0) + 1
+        _write_atomic(_registry_path(), json.dumps(registry))
+
+
+def forget(shard: str | None = None) -> None:
+    """Drop the bookkeeping of ``shard`` (or of every shard) after a destructive change."""
+    with _locked():
+        _write_atomic(_generation_path(), str(kb_generation() + 1))
+        _write_atomic(_resets_path(), str(_read_counter(_resets_path()) + 1))
+        registry = _read_registry() if shard else {}
+        registry.pop(shard, None)
+        _write_atomic(_registry_path(), json.dumps(registry))
+
+
+def shard_versions() -> tuple[int, dict[str, int]]:
+    """Destructive-change count and per-shard write counts, as every process sees them.
+
+    Indexes built from a shard are stale once its write count moves, and
+    every index is invalid once the destructive-change count (bumped by
+    ``forget``) moves.
+    """
+    registry = _read_registry()
+    return _read_counter(_resets_path()), {
+        shard: entry.get("writes", 0) for shard, entry in registry.items()
+    }
+
+
+def is_cold(shard: str) -> bool:
+    """Whether ``shard`` has not been written for ``settings.shard_cold_after_days``."""
+    if not settings.shard_collections or shard == DEFAULT_SHARD:
+        return False
+    updated_at = _read_registry().get(shard, {}).get("updated_at")
+    if updated_at is None:
+        return False
+    return time.time() - updated_at > settings.shard_cold_after_days * 86400
+
+
+def lexical_index_dir(shard: str) -> Path:
+    """Directory holding the persisted BM25 index of ``shard``."""
+    return Path(settings.chroma_persist_dir) / "lexical" / shard
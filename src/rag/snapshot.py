@@ -0,0 +1,292 @@
+"""Portable knowledge-base snapshots for fast replica bootstrap.
+
+A snapshot is a directory bundle::
+
+    manifest.json                  format version, generation, checksums
+    shards/<shard>/vectors.npy     float32 embeddings (n_chunks, dim)
+    shards/<shard>/texts.bin       UTF-8 chunk texts, concatenated
+    shards/<shard>/offsets.npy     int64 start offset of every text (n_chunks + 1)
+    shards/<shard>/metadatas.jsonl chunk metadata, one object per line
+    shards/<shard>/ids.json, data.npy, indices.npy, indptr.npy, vocabulary.json
+                                   prebuilt BM25 index (see ``BM25Index.save``)
+    shards/<shard>/timestamps.npy, source_types.npy, domains.npy, categories.json
+                                   prebuilt metadata index (see ``MetadataIndex.save``)
+
+All arrays are plain ``.npy`` files, so they are read memory-mapped.
+Importing restores the Chroma collections from the stored vectors (no
+embedding calls) and installs the lexical indexes where the retriever looks
+for them, so a fresh process loads them instead of re-reading and
+re-tokenising every chunk.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import shutil
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+from src.config import settings
+from src.rag.dedup import reset_dedup_index
+from src.rag.embeddings import embedding_model_name
+from src.rag.filters import MetadataIndex
+from src.rag.hybrid import BM25Index
+from src.rag.shards import (
+    forget,
+    kb_generation,
+    lexical_index_dir,
+    record_write,
+    set_generation,
+)
+from src.rag.vector_store import clear_retriever_caches, get_vector_store, list_shards
+
+FORMAT_VERSION = 1
+
+# Files installed into ``lexical_index_dir`` on import
+LEXICAL_FILES = (
+    "ids.json",
+    "data.npy",
+    "indices.npy",
+    "indptr.npy",
+    "vocabulary.json",
+    "timestamps.npy",
+    "source_types.npy",
+    "domains.npy",
+    "categories.json",
+)
+
+_BATCH_SIZE = 5000
+
+
+class SnapshotError(Exception):
+    """Raised for missing, corrupt or incompatible snapshot bundles."""
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _batches(collection, total: int) -> Iterator[dict]:
+    for offset in range(0, total, _BATCH_SIZE):
+        yield collection.get(
+            limit=_BATCH_SIZE,
+            offset=offset,
+            include=["embeddings", "documents", "metadatas"],
+        )
+
+
+def _export_shard(shard: str, directory: Path) -> dict:
+    """Write one (non-empty) shard; vectors are streamed batch by batch."""
+    collection = get_vector_store(shard)._collection
+    total = collection.count()
+    directory.mkdir(parents=True, exist_ok=True)
+
+    vectors = None
+    ids: list[str] = []
+    texts: list[str] = []
+    metadatas: list[dict] = []
+    offsets = np.zeros(total + 1, dtype=np.int64)
+    with (directory / "texts.bin").open("wb") as text_file, (
+        directory / "metadatas.jsonl"
+    ).open("w", encoding="utf-8") as meta_file:
+        for batch in _batches(collection, total):
+            embeddings = np.asarray(batch["embeddings"], dtype=np.float32)
+            if vectors is None:
+                vectors = np.lib.format.open_memmap(
+                    directory / "vectors.npy",
+                    mode="w+",
+                    dtype=np.float32,
+                    shape=(total, embeddings.shape[1]),
+                )
+            start = len(ids)
+            vectors[start : start + len(embeddings)] = embeddings
+            for i, (text, meta) in enumerate(zip(batch["documents"], batch["metadatas"])):
+                encoded = text.encode("utf-8")
+                text_file.write(encoded)
+                offsets[start + i + 1] = offsets[start + i] + len(encoded)
+                meta_file.write(json.dumps(meta or {}) + "\n")
+                texts.append(text)
+                metadatas.append(meta or {})
+            ids.extend(batch["ids"])
+
+    dim = vectors.shape[1]
+    vectors.flush()
+    del vectors
+    np.save(directory / "offsets.npy", offsets[: len(ids) + 1])
+
+    # Lexical indexes are built once here instead of on every replica
+    BM25Index.build(texts, ids).save(directory)
+    MetadataIndex.build(metadatas).save(directory)
+    return {"count": len(ids), "dim": dim}
+
+
+def export_snapshot(path: str | Path) -> dict:
+    """Write a snapshot of every shard to the (new) directory ``path``.
+
+    Returns:
+        The snapshot manifest.
+    """
+    path = Path(path)
+    if path.exists() and any(path.iterdir()):
+        raise SnapshotError(f"Snapshot directory '{path}' is not empty")
+    generation = kb_generation()
+    started = time.perf_counter()
+
+    shards = {}
+    for shard in list_shards():
+        if not get_vector_store(shard)._collection.count():
+            continue
+        shards[shard] = _export_shard(shard, path / "shards" / shard)
+        logger.info("Exported shard '{}' ({} chunks)", shard, shards[shard]["count"])
+
+    files = {
+        str(file.relative_to(path)): _sha256(file)
+        for file in sorted(path.rglob("*"))
+        if file.is_file()
+    }
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "generation": generation,
+        "created_at": time.time(),
+        "collection_name": settings.chroma_collection_name,
+        "embedding_model": embedding_model_name(),
+        "sharded": settings.shard_collections,
+        "shards": shards,
+        "files": files,
+        "checksum": hashlib.sha256(json.dumps(files, sort_keys=True).encode()).hexdigest(),
+    }
+    (path / "manifest.json").write_text(json.dumps(manifest, indent=2))
+    logger.info(
+        "Exported snapshot generation {} to '{}' in {:.1f}s",
+        generation,
+        path,
+        time.perf_counter() - started,
+    )
+    return manifest
+
+
+def read_manifest(path: str | Path) -> dict:
+    """Read a snapshot manifest and check its format version."""
+    manifest_path = Path(path) / "manifest.json"
+    try:
+        manifest = json.loads(manifest_path.read_text())
+    except (OSError, ValueError) as e:
+        raise SnapshotError(f"Cannot read snapshot manifest '{manifest_path}': {e}") from e
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise SnapshotError(
+            f"Unsupported snapshot format {manifest.get('format_version')} "
+            f"(expected {FORMAT_VERSION})"
+        )
+    return manifest
+
+
+def verify_snapshot(path: str | Path) -> dict:
+    """Check every file of the bundle against the manifest checksums."""
+    path = Path(path)
+    manifest = read_manifest(path)
+    files = manifest["files"]
+    expected = hashlib.sha256(json.dumps(files, sort_keys=True).encode()).hexdigest()
+    if manifest["checksum"] != expected:
+        raise SnapshotError("Manifest checksum mismatch")
+    for name, digest in files.items():
+        file = path / name
+        if not file.is_file():
+            raise SnapshotError(f"Missing snapshot file '{name}'")
+        if _sha256(file) != digest:
+            raise SnapshotError(f"Checksum mismatch for '{name}'")
+    return manifest
+
+
+def _read_texts(directory: Path) -> tuple[np.ndarray, np.ndarray]:
+    offsets = np.load(directory / "offsets.npy", mmap_mode="r")
+    if not offsets[-1]:
+        return offsets, np.empty(0, dtype=np.uint8)  # numpy cannot map empty files
+    return offsets, np.memmap(directory / "texts.bin", dtype=np.uint8, mode="r")
+
+
+def _import_shard(shard: str, directory: Path, count: int) -> None:
+    store = get_vector_store(shard)
+    store.reset_collection()  # drop whatever the replica had
+    collection = store._collection
+
+    ids = json.loads((directory / "ids.json").read_text())["ids"]
+    vectors = np.load(directory / "vectors.npy", mmap_mode="r")
+    offsets, texts = _read_texts(directory)
+    with (directory / "metadatas.jsonl").open(encoding="utf-8") as meta_file:
+        for start in range(0, count, _BATCH_SIZE):
+            end = min(start + _BATCH_SIZE, count)
+            metadatas = [json.loads(next(meta_file)) or None for _ in range(start, end)]
+            documents = [
+                bytes(texts[offsets[i] : offsets[i + 1]]).decode("utf-8")
+                for i in range(start, end)
+            ]
+            collection.add(
+                ids=ids[start:end],
+                embeddings=np.ascontiguousarray(vectors[start:end]),
+                documents=documents,
+                metadatas=metadatas,
+            )
+
+    target = lexical_index_dir(shard)
+    shutil.rmtree(target, ignore_errors=True)
+    target.mkdir(parents=True)
+    for name in LEXICAL_FILES:
+        shutil.copyfile(directory / name, target / name)
+
+
+def import_snapshot(path: str | Path, verify: bool = True) -> dict:
+    """Replace the local knowledge base with the snapshot at ``path``.
+
+    Args:
+        path: Snapshot directory written by ``export_snapshot``.
+        verify: Check file checksums before importing.
+
+    Returns:
+        The snapshot manifest.
+    """
+    path = Path(path)
+    manifest = verify_snapshot(path) if verify else read_manifest(path)
+    if manifest["embedding_model"] != embedding_model_name():
+        raise SnapshotError(
+            f"Snapshot embeddings come from '{manifest['embedding_model']}', "
+            f"but the configured embedding model is '{embedding_model_name()}'"
+        )
+    if manifest["sharded"] != settings.shard_collections:
+        raise SnapshotError(
+            f"Snapshot was taken with SHARD_COLLECTIONS={manifest['sharded']}; "
+            "set the same value before importing"
+        )
+
+    started = time.perf_counter()
+    for shard in list_shards():
+        if shard not in manifest["shards"]:
+            get_vector_store(shard).delete_collection()
+            shutil.rmtree(lexical_index_dir(shard), ignore_errors=True)
+    get_vector_store.cache_clear()
+    forget()  # other workers drop their indexes of the replaced collections
+
+    for shard, info in manifest["shards"].items():
+        _import_shard(shard, path / "shards" / shard, info["count"])
+        record_write(shard)
+        logger.info("Imported shard '{}' ({} chunks)", shard, info["count"])
+
+    # The replica now serves exactly the snapshot's generation
+    set_generation(manifest["generation"])
+    reset_dedup_index()  # rebuilt from the imported chunks on the next ingest
+    clear_retriever_caches()
+    logger.info(
+        "Imported snapshot generation {} from '{}' in {:.1f}s",
+        manifest["generation"],
+        path,
+        time.perf_counter() - started,
+    )
+    return manifest
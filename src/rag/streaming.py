@@ -0,0 +1,110 @@
+"""Incremental chunking of streamed uploads.
+
+Uploads arrive as byte pieces of arbitrary size.  ``StreamingChunker`` cuts
+them with the ``split_documents`` splitter while holding only a window of a
+few chunks: once the buffer reaches ``window`` characters it is split, every
+chunk but the last is released and the buffer restarts at the last chunk,
+which may continue in the next piece.  Chunks keep the configured size and
+overlap; a few boundaries can differ from splitting the whole text at once.
+``NdjsonChunker`` does the same for one JSON document per line.
+"""
+
+from __future__ import annotations
+
+import codecs
+import json
+
+from langchain_core.documents import Document
+
+from src.config import settings
+from src.rag.ingestion import make_splitter
+
+TEXT_KEYS = ("text", "content", "page_content")
+
+
+class StreamingChunker:
+    """Chunk one plain-text document fed as bytes; ``metadata`` is copied onto every chunk."""
+
+    def __init__(self, metadata: dict, window: int | None = None) -> None:
+        self.metadata = metadata
+        self.window = window or 8 * settings.chunk_size
+        self.documents = 1
+        self._splitter = make_splitter()
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._buffer = ""
+
+    def _chunks(self, texts: list[str]) -> list[Document]:
+        return [Document(page_content=text, metadata=dict(self.metadata)) for text in texts]
+
+    def feed(self, data: bytes) -> list[Document]:
+        """Add a piece of the upload; returns the chunks that can no longer change."""
+        self._buffer += self._decoder.decode(data)
+        if len(self._buffer) < self.window:
+            return []
+        texts = self._splitter.split_text(self._buffer)
+        if len(texts) < 2:
+            return []
+        # The last chunk may still grow: keep the text from its start on
+        self._buffer = self._buffer[self._buffer.rfind(texts[-1]) :]
+        return self._chunks(texts[:-1])
+
+    def close(self) -> list[Document]:
+        """End of upload: returns the remaining chunks."""
+        self._buffer += self._decoder.decode(b"", final=True)
+        texts = self._splitter.split_text(self._buffer) if self._buffer.strip() else []
+        self._buffer = ""
+        return self._chunks(texts)
+
+
+class NdjsonChunker:
+    """Chunk newline-delimited JSON documents fed as bytes.
+
+    Each line is an object with the text under ``text``, ``content`` or
+    ``page_content``, an optional ``metadata`` object, and any further scalar
+    fields (e.g. ``source``, ``title``), which become metadata as well.
+    Malformed lines are counted in ``invalid`` and skipped.
+    """
+
+    def __init__(self, metadata: dict, max_line_bytes: int | None = None) -> None:
+        self.metadata = metadata
+        self.max_line_bytes = max_line_bytes or settings.ingest_max_record_mb * 1024 * 1024
+        self.documents = 0
+        self.invalid = 0
+        self._splitter = make_splitter()
+        self._buffer = b""
+
+    def _document(self, line: bytes) -> Document | None:
+        try:
+            record = json.loads(line)
+            text = next(record[key] for key in TEXT_KEYS if isinstance(record.get(key), str))
+        except (ValueError, StopIteration, AttributeError, TypeError):
+            self.invalid += 1
+            return None
+        metadata = dict(self.metadata)
+        extra = record.get("metadata") if isinstance(record.get("metadata"), dict) else {}
+        for key, value in {**record, **extra}.items():
+            # Chroma only stores scalar metadata
+            if key not in TEXT_KEYS and isinstance(value, (str, int, float, bool)):
+                metadata[key] = value
+        self.documents += 1
+        return Document(page_content=text, metadata=metadata)
+
+    def _split(self, lines: list[bytes]) -> list[Document]:
+        documents = [doc for line in lines if line.strip() and (doc := self._document(line))]
+        return self._splitter.split_documents(documents) if documents else []
+
+    def feed(self, data: bytes) -> list[Document]:
+        """Add a piece of the upload; returns the chunks of every completed line."""
+        self._buffer += data
+        lines = self._buffer.split(b"\n")
+        self._buffer = lines.pop()
+        if len(self._buffer) > self.max_line_bytes:
+            raise ValueError(
+                f"NDJSON record exceeds INGEST_MAX_RECORD_MB={settings.ingest_max_record_mb}"
+            )
+        return self._split(lines)
+
+    def close(self) -> list[Document]:
+        """End of upload: returns the chunks of a final line without a newline."""
+        lines, self._buffer = [self._buffer], b""
+        return self._split(lines)
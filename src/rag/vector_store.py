@@ -2,67 +2,163 @@
 
 from __future__ import annotations
 
-from functools import lru_cache
+import shutil
+import time
+import uuid
+from functools import cache
 
 from langchain_chroma import Chroma
 from langchain_core.documents import Document
 from loguru import logger
 
 from src.config import settings
+from src.rag.dedup import (
+    add_alternate_source,
+    get_dedup_index,
+    record_chunks,
+    reset_dedup_index,
+)
 from src.rag.embeddings import get_embedding_model
+from src.rag.shards import (
+    DEFAULT_SHARD,
+    collection_name,
+    forget,
+    lexical_index_dir,
+    record_write,
+    shard_for,
+    shard_of_collection,
+)
 
 
-@lru_cache(maxsize=1)
-def get_vector_store() -> Chroma:
-    """Return a persistent ChromaDB vector store instance."""
+@cache
+def get_vector_store(shard: str = DEFAULT_SHARD) -> Chroma:
+    """Return a persistent ChromaDB vector store instance for ``shard``.
+
+    Without sharding there is only the ``default`` shard, i.e. the
+    ``settings.chroma_collection_name`` collection.
+    """
     return Chroma(
-        collection_name=settings.chroma_collection_name,
+        collection_name=collection_name(shard),
         embedding_function=get_embedding_model(),
         persist_directory=settings.chroma_persist_dir,
         collection_metadata={"hnsw:space": "cosine"}
     )
 
 
+def list_shards() -> list[str]:
+    """Return the shards that currently have a collection, ``default`` first."""
+    if not settings.shard_collections:
+        return [DEFAULT_SHARD]
+    client = get_vector_store()._client
+    # chromadb returns names or Collection objects depending on the version
+    names = [getattr(c, "name", c) for c in client.list_collections()]
+    shards = {shard_of_collection(name) for name in names} - {None}
+    # The default collection only matters if data was stored before sharding
+    if DEFAULT_SHARD in shards and not get_vector_store()._collection.count():
+        shards.discard(DEFAULT_SHARD)
+    return sorted(shards, key=lambda shard: (shard != DEFAULT_SHARD, shard))
+
+
+def reopen_vector_store() -> None:
+    """Drop the cached Chroma client so the next call opens a fresh one.
+
+    Needed in forked worker processes: chromadb caches one ``System`` (and its
+    SQLite connections) per persist directory, and those must not be shared
+    across a ``fork()``.
+    """
+    from chromadb.api.client import SharedSystemClient
+
+    SharedSystemClient.clear_system_cache()
+    get_vector_store.cache_clear()
+
+
 def add_documents(documents: list[Document]) -> None:
-    """Add document chunks to the vector store and invalidate retriever caches."""
+    """Add document chunks to their shards and schedule a rebuild of only their indexes."""
     if not documents:
         logger.warning("No documents to add.")
         return
 
-    store = get_vector_store()
-    store.add_documents(documents)
-    logger.info(f"Added {len(documents)} document(s) to vector store.")
+    if settings.dedup_enabled:
+        # Load (or first build) the near-duplicate index before this write, so
+        # a first build from the collections does not already contain the
+        # chunks that record_chunks adds below
+        get_dedup_index()
+
+    by_shard: dict[str, list[Document]] = {}
+    ingested_at = time.time()
+    for doc in documents:
+        # Recency filters fall back to this for chunks without a published date
+        doc.metadata.setdefault("ingested_at", ingested_at)
+        # Known up front so the near-duplicate index can refer to the chunk
+        doc.id = doc.id or str(uuid.uuid4())
+        by_shard.setdefault(shard_for(doc.metadata), []).append(doc)
+
+    for shard, shard_docs in by_shard.items():
+        get_vector_store(shard).add_documents(shard_docs)
+        record_write(shard)
+        record_chunks(shard, shard_docs)
+        logger.info("Added {} document(s) to vector store shard '{}'.", len(shard_docs), shard)
 
-    # Invalidate cached retrievers so they rebuild with the new documents
-    clear_retriever_caches()
+    # Rebuild the touched shards' retrievers in the background
+    from src.rag.retriever import mark_shard_dirty
+
+    for shard in by_shard:
+        mark_shard_dirty(shard)
+
+
+def add_alternate_sources(alternates: dict[tuple[str, str], set[str]]) -> None:
+    """Record further sources of stored chunks whose near-duplicates were skipped.
+
+    Args:
+        alternates: Source URLs keyed by the ``(shard, chunk id)`` they duplicate.
+    """
+    by_shard: dict[str, dict[str, set[str]]] = {}
+    for (shard, chunk_id), sources in alternates.items():
+        by_shard.setdefault(shard, {})[chunk_id] = sources
+
+    from src.rag.retriever import mark_shard_dirty
+
+    for shard, sources_by_id in by_shard.items():
+        collection = get_vector_store(shard)._collection
+        data = collection.get(ids=list(sources_by_id), include=["metadatas"])
+        ids, metadatas = [], []
+        for chunk_id, metadata in zip(data["ids"], data["metadatas"]):
+            metadata = dict(metadata or {})
+            changed = [add_alternate_source(metadata, s) for s in sorted(sources_by_id[chunk_id])]
+            if any(changed):
+                ids.append(chunk_id)
+                metadatas.append(metadata)
+        if ids:
+            collection.update(ids=ids, metadatas=metadatas)
+            record_write(shard)
+            mark_shard_dirty(shard)
+            logger.info("Recorded alternate sources on {} chunk(s) in shard '{}'.", len(ids), shard)
 
 
 def clear_retriever_caches() -> None:
-    """Clear cached hybrid retriever and re-ranker so they rebuild with fresh data.
+    """Clear every cached shard retriever so they rebuild with fresh data.
 
-    Uses lazy imports to avoid circular dependency with retriever / re_ranker modules.
+    Uses lazy imports to avoid circular dependency with the retriever module.
     """
-    from src.rag.retriever import get_hybrid_retriever
-    from src.rag.re_ranker import get_re_ranker_retriever
+    from src.rag.retriever import invalidate_shard
 
-    get_hybrid_retriever.cache_clear()
-    get_re_ranker_retriever.cache_clear()
+    invalidate_shard(None)
     logger.info("Cleared retriever caches after document update.")
 
 
-def get_all_documents() -> list[Document]:
-    """Retrieve all documents stored in the vector store.
+def get_all_documents(shard: str = DEFAULT_SHARD) -> list[Document]:
+    """Retrieve all documents stored in one shard of the vector store.
 
     Returns:
-        List of Document objects with page_content and metadata.
+        List of Document objects with id, page_content and metadata.
     """
-    store = get_vector_store()
+    store = get_vector_store(shard)
     data = store.get(include=["documents", "metadatas"])
     documents = [
-        Document(page_content=text, metadata=meta or {})
-        for text, meta in zip(data["documents"], data["metadatas"])
+        Document(page_content=text, metadata=meta or {}, id=doc_id)
+        for doc_id, text, meta in zip(data["ids"], data["documents"], data["metadatas"])
     ]
-    logger.info(f"Retrieved {len(documents)} document(s) from vector store.")
+    logger.info("Retrieved {} document(s) from vector store shard '{}'.", len(documents), shard)
     return documents
 
 
@@ -71,7 +167,7 @@ def similarity_search(query: str, k: int | None = None) -> list[Document]:
     k = k or settings.retriever_top_k
     store = get_vector_store()
     results = store.similarity_search(query, k=k)
-    logger.debug(f"Retrieved {len(results)} result(s) for query: {query[:80]}...")
+    logger.debug("Retrieved {} result(s) for query: {}...", len(results), query[:80])
     return results
 
 
@@ -90,43 +186,56 @@ def similarity_search_with_scores(query: str, k: int | None = None) -> list[tupl
     store = get_vector_store()
     results = store.similarity_search_with_score(query, k=k)
     logger.debug(
-        f"Retrieved {len(results)} result(s) with scores for query: {query[:80]}..."
+        "Retrieved {} result(s) with scores for query: {}...", len(results), query[:80]
     )
     return results
 
 
 def clear_collection() -> None:
-    """Delete all documents from the vector store collection.
+    """Delete all documents from every shard collection of the vector store.
     
-    This removes all embeddings and documents but keeps the collection itself.
+    This removes all embeddings and documents but keeps the collections themselves.
     Useful for starting fresh with new data.
     """
     try:
-        store = get_vector_store()
-        collection = store._collection
-        
-        # Get all document IDs
-        data = store.get()
-        ids = data.get("ids", [])
-        
-        if not ids:
+        cleared = 0
+        for shard in list_shards():
+            store = get_vector_store(shard)
+            collection = store._collection
+
+            # Get all document IDs
+            ids = store.get().get("ids", [])
+            if not ids:
+                continue
+
+            # Delete all documents by their IDs
+            collection.delete(ids=ids)
+            cleared += len(ids)
+            logger.info(
+                "Cleared {} document(s) from collection '{}'.",
+                len(ids),
+                collection_name(shard),
+            )
+
+        if not cleared:
             logger.info("Collection is already empty.")
             return
-        
-        # Delete all documents by their IDs
-        collection.delete(ids=ids)
-        logger.info(f"Cleared {len(ids)} document(s) from collection '{settings.chroma_collection_name}'.")
-        
-        # Clear retriever caches since the data changed
+
+        # Persisted lexical indexes describe the old data
+        shutil.rmtree(lexical_index_dir(DEFAULT_SHARD).parent, ignore_errors=True)
+        reset_dedup_index()
+
+        # Clear retriever caches since the data changed (other workers see the reset)
+        forget()
         clear_retriever_caches()
         
     except Exception as e:
-        logger.error(f"Error clearing collection: {e}")
+        logger.error("Error clearing collection: {}", e)
         raise
 
 
 def reset_collection() -> None:
-    """Completely delete and recreate the collection.
+    """Completely delete and recreate the collection (and every shard collection).
     
     This removes the entire collection and creates a fresh one.
     Use this if you want a complete reset including collection metadata.
@@ -137,23 +246,30 @@ def reset_collection() -> None:
         # Get the persistent client
         client = chromadb.PersistentClient(path=settings.chroma_persist_dir)
         
-        # Delete the collection if it exists
-        try:
-            client.delete_collection(name=settings.chroma_collection_name)
-            logger.info(f"Deleted collection '{settings.chroma_collection_name}'.")
-        except Exception:
-            logger.warning(f"Collection '{settings.chroma_collection_name}' does not exist.")
+        # Delete the collection and all shard collections if they exist
+        names = [getattr(c, "name", c) for c in client.list_collections()]
+        shard_names = [name for name in names if shard_of_collection(name) is not None]
+        if not shard_names:
+            logger.warning("Collection '{}' does not exist.", settings.chroma_collection_name)
+        for name in shard_names:
+            client.delete_collection(name=name)
+            logger.info("Deleted collection '{}'.", name)
+
+        # Drop shard bookkeeping and persisted lexical indexes
+        forget()
+        shutil.rmtree(lexical_index_dir(DEFAULT_SHARD).parent, ignore_errors=True)
+        reset_dedup_index()
         
-        # Clear the cached vector store so it gets recreated
+        # Clear the cached vector stores so they get recreated
         get_vector_store.cache_clear()
         
         # Recreate the collection by calling get_vector_store
-        store = get_vector_store()
-        logger.info(f"Recreated collection '{settings.chroma_collection_name}'.")
+        get_vector_store()
+        logger.info("Recreated collection '{}'.", settings.chroma_collection_name)
         
         # Clear retriever caches
         clear_retriever_caches()
         
     except Exception as e:
-        logger.error(f"Error resetting collection: {e}")
+        logger.error("Error resetting collection: {}", e)
         raise
@@ -0,0 +1,232 @@
+"""Pre-forking production launcher.
+
+``uvicorn --workers N`` spawns fresh interpreters, so every worker loads the
+FlashRank model, the BM25 index and the Chroma collection on its own and
+memory grows linearly with the worker count.  This launcher instead loads the
+read-only models and index structures once in a master process and then
+``fork()``s the workers, so they share those pages copy-on-write.
+
+The Chroma client is warmed in the master (which pulls the persisted segment
+files into the OS page cache) but reopened in every worker: SQLite handles
+must never be used across a ``fork()``.
+"""
+
+from __future__ import annotations
+
+import gc
+import os
+import signal
+import socket
+import time
+from collections.abc import Callable
+
+import uvicorn
+from loguru import logger
+
+from src.config import settings
+from src.memory import process_memory, threshold_warnings
+
+# A worker that dies young is respawned after this delay, doubled for every
+# further early death of its slot (up to the maximum), so a worker that
+# crashes on startup does not make the master spin
+_RESPAWN_DELAY = 0.5
+_RESPAWN_MAX_DELAY = 30.0
+# A worker that lived this long counts as healthy and resets its slot's backoff
+_RESPAWN_STABLE_AFTER = 30.0
+
+
+def preload() -> None:
+    """Load the app, the agent graph and every read-only index before forking."""
+    from src.api.app import app  # noqa: F401 – compiles the agent graph
+    from src.rag.re_ranker import get_re_ranker
+    from src.rag.retriever import warm_shards
+
+    started = time.perf_counter()
+    warm_shards()  # BM25 indexes + document lists + Chroma collections
+    get_re_ranker()  # FlashRank ONNX model
+    logger.info("Preloaded models and indexes in {:.2f}s", time.perf_counter() - started)
+
+    # Move everything allocated so far into the permanent generation so the
+    # cyclic GC never touches (and therefore never dirties) the shared pages.
+    gc.collect()
+    gc.freeze()
+
+
+def reopen_after_fork(slot: int | None = None) -> None:
+    """Give a freshly forked worker its own Chroma client, log writer thread and log file."""
+    from src.logger import setup_logger
+    from src.rag.retriever import reset_vector_retriever
+    from src.rag.vector_store import reopen_vector_store
+
+    setup_logger(worker=slot)  # threads do not survive fork(); restart the enqueued sinks
+    reopen_vector_store()
+    reset_vector_retriever()
+
+
+def log_memory_report(workers: dict[int, int]) -> None:
+    """Log resident and proportional memory for the master and every worker.
+
+    Warns when the total crosses a threshold (see ``src.memory.threshold_warnings``).
+    """
+    rows = [("master", os.getpid())] + [
+        (f"worker-{slot}", pid) for pid, slot in sorted(workers.items(), key=lambda w: w[1])
+    ]
+    total_rss = total_pss = 0
+    for name, pid in rows:
+        usage = process_memory(pid)
+        if not usage:
+            continue
+        total_rss += usage.get("rss", 0)
+        total_pss += usage.get("pss", 0)
+        logger.info(
+            "Memory {} (pid={}): rss={:.1f} MB, pss={:.1f} MB, shared={:.1f} MB, "
+            "private={:.1f} MB",
+            name,
+            pid,
+            usage.get("rss", 0) / 1024,
+            usage.get("pss", 0) / 1024,
+            usage.get("shared", 0) / 1024,
+            usage.get("private", 0) / 1024,
+        )
+    if total_rss:
+        logger.info(
+            "Memory total: rss={:.1f} MB, pss={:.1f} MB ({:.1f} MB saved by sharing)",
+            total_rss / 1024,
+            total_pss / 1024,
+            (total_rss - total_pss) / 1024,
+        )
+        # PSS sums to what the processes really use together, i.e. what the
+        # container limit is charged for
+        for warning in threshold_warnings(total_pss * 1024):
+            logger.warning("Memory (all processes): {}", warning)
+
+
+def _serve_worker(sock: socket.socket, slot: int) -> None:
+    """Run one uvicorn server on the inherited listening socket (never returns)."""
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    status = 0
+    try:
+        reopen_after_fork(slot)
+
+        from src.api.app import app
+
+        config = uvicorn.Config(app, log_level=settings.log_level.lower())
+        uvicorn.Server(config).run(sockets=[sock])
+    except Exception as e:
+        logger.error("Worker {} crashed: {}", os.getpid(), e)
+        status = 1
+    finally:
+        os._exit(status)
+
+
+def _spawn(sock: socket.socket, slot: int) -> int:
+    pid = os.fork()
+    if pid == 0:
+        _serve_worker(sock, slot)
+    logger.info("Started worker-{} (pid={})", slot, pid)
+    return pid
+
+
+def supervise(
+    spawn: Callable[[int], int],
+    workers: int,
+    stopping: Callable[[], bool],
+    poll: float = 0.5,
+) -> dict[int, int]:
+    """Start ``workers`` with ``spawn(slot)`` and respawn dead ones until ``stopping()``.
+
+    A worker that dies within ``_RESPAWN_STABLE_AFTER`` seconds of its start
+    is respawned with exponential backoff; one that ran longer is replaced
+    right away.  A per-worker memory report is logged every
+    ``settings.memory_report_interval`` seconds (0 disables it).
+
+    Returns:
+        The live workers (pid → slot) when ``stopping()`` turned true.
+    """
+    children: dict[int, int] = {}  # pid → worker slot
+    started: dict[int, float] = {}  # slot → start time
+    early_deaths: dict[int, int] = {}  # slot → consecutive deaths before _RESPAWN_STABLE_AFTER
+    respawn_at: dict[int, float] = {}  # slot → when to start it again
+
+    def start(slot: int) -> None:
+        children[spawn(slot)] = slot
+        started[slot] = time.monotonic()
+
+    for slot in range(workers):
+        start(slot)
+
+    next_report = time.monotonic() + settings.memory_report_interval
+    while not stopping():
+        now = time.monotonic()
+        for slot, at in list(respawn_at.items()):
+            if now >= at:
+                del respawn_at[slot]
+                start(slot)
+
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            if not respawn_at:
+                break
+            pid = 0
+        if pid and pid in children:
+            slot = children.pop(pid)
+            if now - started[slot] < _RESPAWN_STABLE_AFTER:
+                failures = early_deaths.get(slot, 0)
+                delay = min(_RESPAWN_DELAY * 2**failures, _RESPAWN_MAX_DELAY)
+                early_deaths[slot] = failures + 1
+            else:
+                delay = 0.0
+                early_deaths[slot] = 0
+            logger.warning(
+                "worker-{} (pid={}) exited with status {}, respawning in {:.1f}s",
+                slot,
+                pid,
+                status,
+                delay,
+            )
+            respawn_at[slot] = now + delay
+            continue
+
+        if settings.memory_report_interval and time.monotonic() >= next_report:
+            log_memory_report(children)
+            next_report = time.monotonic() + settings.memory_report_interval
+        time.sleep(poll)
+    return children
+
+
+def run_prefork(workers: int | None = None) -> None:
+    """Preload indexes, fork ``workers`` uvicorn workers and supervise them.
+
+    Dead workers are respawned (see ``supervise``); SIGINT/SIGTERM shut
+    every worker down.
+    """
+    workers = workers or settings.api_workers
+    if settings.api_reload:
+        logger.warning("api_reload is ignored by the pre-forking launcher")
+
+    sock = socket.create_server((settings.api_host, settings.api_port), backlog=2048)
+    sock.set_inheritable(True)
+    logger.info("Listening on {}:{} with {} workers", settings.api_host, settings.api_port, workers)
+
+    if settings.api_preload:
+        preload()
+
+    stopping = False
+
+    def _stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, _stop)
+    signal.signal(signal.SIGTERM, _stop)
+
+    children = supervise(lambda slot: _spawn(sock, slot), workers, lambda: stopping)
+
+    logger.info("Shutting down workers")
+    for pid in children:
+        os.kill(pid, signal.SIGTERM)
+    for pid in children:
+        os.waitpid(pid, 0)
+    sock.close()
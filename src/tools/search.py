@@ -10,7 +10,7 @@ from src.config import settings
 
 
 @tool
-def web_search_tool(query: str) -> dict:
+def web_search_tool(query: str, timeout: float | None = None) -> dict:
     """Search the web for up-to-date information about a topic.
 
     Use this tool when the local knowledge base does not contain
@@ -18,6 +18,7 @@ def web_search_tool(query: str) -> dict:
 
     Args:
         query: The search query string
+        timeout: Seconds to wait for the search (Tavily's default of 60 when omitted)
 
     Returns:
         Dict with 'formatted' (str) for LLM and 'structured' (list) for metadata
@@ -30,7 +31,9 @@ def web_search_tool(query: str) -> dict:
                 "structured": []
             }
 
-        client = TavilyClient(api_key=settings.tavily_api_key)
+        client = TavilyClient(
+            api_key=settings.tavily_api_key, api_base_url=settings.tavily_base_url or None
+        )
         
         # Perform search with basic depth and limit results to 5
         response = client.search(
@@ -38,11 +41,12 @@ def web_search_tool(query: str) -> dict:
             search_depth="advanced",
             max_results=5,
             include_answer=False,
-            include_raw_content=False
+            include_raw_content=False,
+            timeout=timeout or 60,
         )
         
         if not response.get("results"):
-            logger.warning(f"No web search results found for query: {query[:100]}")
+            logger.warning("No web search results found for query: {}", query[:100])
             return {
                 "formatted": "No relevant web search results found.",
                 "structured": []
@@ -61,14 +65,18 @@ def web_search_tool(query: str) -> dict:
                 f"Content: {content}"
             )
         
-        logger.info(f"Retrieved {len(formatted_results)} web search results for query: {query[:100]}")
+        logger.info(
+            "Retrieved {} web search results for query: {}",
+            len(formatted_results),
+            query[:100],
+        )
         return {
             "formatted": "\n\n---\n\n".join(formatted_results),
             "structured": response["results"]
         }
         
     except Exception as e:
-        logger.error(f"Error performing web search: {e}")
+        logger.error("Error performing web search: {}", e)
         return {
             "formatted": f"Error performing web search: {str(e)}",
             "structured": []
@@ -0,0 +1,63 @@
+"""Tests for adaptive retrieval depth."""
+
+from langchain_core.documents import Document
+
+from src.rag.adaptive import adaptive_rerank
+
+CORPUS = [Document(page_content=f"chunk {i}", id=str(i)) for i in range(100)]
+
+
+def make_fetch(calls: list[int]):
+    def fetch(k: int) -> list[Document]:
+        calls.append(k)
+        return CORPUS[: 2 * k]  # both legs, fused
+
+    return fetch
+
+
+def score_by(table: dict[str, float]):
+    def score(query: str, documents: list[Document]) -> list[float]:
+        return [table.get(doc.id, 0.1) for doc in documents]
+
+    return score
+
+
+def run(scores: dict[str, float], calls: list[int], **overrides):
+    params = dict(top_n=3, k_initial=3, k_max=20, batch=3, high=0.9, low=0.02, margin=0.3)
+    params.update(overrides)
+    return adaptive_rerank("q", make_fetch(calls), score_by(scores), **params)
+
+
+def test_decisive_first_batch_stops_early():
+    calls = []
+    result = run({"0": 0.99, "1": 0.95, "2": 0.97}, calls)
+    assert result.stop == "decisive"
+    assert result.reranked == 3 and calls == [3]
+    assert [doc.id for doc in result.documents] == ["0", "2", "1"]
+    assert result.documents[0].metadata["relevance_score"] == 0.99
+
+
+def test_irrelevant_stops_without_widening():
+    calls = []
+    result = run({}, calls, low=0.5)
+    assert result.stop == "irrelevant"
+    assert result.reranked == 3 and calls == [3]
+
+
+def test_ambiguous_widens_and_finds_deep_candidate():
+    """Mid scores everywhere → widen; a strong chunk deep in the fused order is found."""
+    calls = []
+    scores = {str(i): 0.6 for i in range(100)}
+    scores["25"] = 0.95
+    result = run(scores, calls, margin=1.0)
+    assert calls == [3, 6, 12, 20]
+    assert result.documents[0].id == "25"
+    assert result.reranked == 40  # each candidate scored once
+
+
+def test_margin_stops_once_batches_fall_behind():
+    calls = []
+    scores = {"0": 0.8, "1": 0.75, "2": 0.7}  # the rest score 0.1
+    result = run(scores, calls)
+    assert result.stop == "margin"
+    assert result.reranked == 6
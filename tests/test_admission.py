@@ -0,0 +1,77 @@
+"""Tests for admission control and load shedding."""
+
+import asyncio
+
+import pytest
+
+from src.api.admission import AdmissionController, AdmissionRejectedError
+
+
+async def _hold(controller: AdmissionController, seconds: float) -> None:
+    async with controller.slot():
+        await asyncio.sleep(seconds)
+
+
+@pytest.mark.asyncio
+async def test_concurrency_cap_queues_overflow():
+    """Requests beyond the cap should wait for a slot, not run concurrently."""
+    controller = AdmissionController(max_concurrency=2, max_queue=10, queue_timeout=5)
+    running = peak = 0
+
+    async def work():
+        nonlocal running, peak
+        async with controller.slot():
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.02)
+            running -= 1
+
+    await asyncio.gather(*(work() for _ in range(6)))
+    assert peak == 2
+    assert controller.active == 0
+    assert controller.queue_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_full_queue_is_rejected_with_retry_after():
+    """Once the queue is full, requests should be shed immediately with 503."""
+    controller = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=5)
+    holder = asyncio.ensure_future(_hold(controller, 0.1))
+    waiter = asyncio.ensure_future(_hold(controller, 0))
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(AdmissionRejectedError) as exc_info:
+        await _hold(controller, 0)
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.retry_after >= 1
+
+    await asyncio.gather(holder, waiter)
+
+
+@pytest.mark.asyncio
+async def test_queue_deadline_rejects_waiters():
+    """A request waiting longer than the queue timeout should get a 503."""
+    controller = AdmissionController(max_concurrency=1, max_queue=5, queue_timeout=0.02)
+    holder = asyncio.ensure_future(_hold(controller, 0.1))
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(AdmissionRejectedError) as exc_info:
+        await _hold(controller, 0)
+    assert exc_info.value.status_code == 503
+    assert controller.queue_depth == 0
+
+    await holder
+    assert controller.active == 0
+
+
+def test_token_bucket_rate_limits_per_client():
+    """A client exceeding its burst should get 429 without affecting others."""
+    controller = AdmissionController(
+        max_concurrency=1, max_queue=1, queue_timeout=1, rate_per_minute=60, burst=2
+    )
+    controller.check_rate("a")
+    controller.check_rate("a")
+    with pytest.raises(AdmissionRejectedError) as exc_info:
+        controller.check_rate("a")
+    assert exc_info.value.status_code == 429
+    controller.check_rate("b")
@@ -20,3 +20,85 @@ async def test_health_check(client):
     response = await client.get("/api/v1/health")
     assert response.status_code == 200
     assert response.json() == {"status": "ok"}
+
+
+@pytest.mark.asyncio
+async def test_verify_etag_revalidation(client, monkeypatch, tmp_path):
+    """A matching If-None-Match should get a 304 (GET) until the knowledge base changes."""
+    from src.api import routes
+    from src.config import settings
+    from src.rag.shards import bump_generation
+
+    monkeypatch.setattr(settings, "chroma_persist_dir", str(tmp_path))
+    calls = []
+
+    async def fake_verify(claim, filters=None, deadline=None, idempotency_key=None):
+        calls.append(claim)
+        return {
+            "verification_data": "ok",
+            "evidence_source": "RAG Store",
+            "source_urls": [],
+            "claim_verdict": True,
+        }
+
+    monkeypatch.setattr(routes, "_verify", fake_verify)
+
+    first = await client.post("/api/v1/verify", json={"claim": "The sky is blue."})
+    etag = first.headers["ETag"]
+    assert "must-revalidate" in first.headers["Cache-Control"]
+
+    # Same normalized claim → same validator, graph not run
+    cached = await client.get(
+        "/api/v1/verify", params={"claim": "the sky is BLUE"}, headers={"If-None-Match": etag}
+    )
+    assert cached.status_code == 304
+    assert cached.headers["Cache-Control"].startswith("private")
+    assert len(calls) == 1
+
+    # RFC 9110: only GET/HEAD may answer a matching If-None-Match with 304
+    posted = await client.post(
+        "/api/v1/verify", json={"claim": "The sky is blue."}, headers={"If-None-Match": etag}
+    )
+    assert posted.status_code == 412
+    assert len(calls) == 1
+
+    bump_generation()
+    fresh = await client.post(
+        "/api/v1/verify", json={"claim": "The sky is blue."}, headers={"If-None-Match": etag}
+    )
+    assert fresh.status_code == 200
+    assert fresh.headers["ETag"] != etag
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_traffic_capture_is_written_in_the_background(client, monkeypatch, tmp_path):
+    """Captured /verify requests should land in the capture file, off the request path."""
+    import json
+
+    from src.api import routes
+    from src.config import settings
+
+    async def fake_verify(claim, filters=None, deadline=None, idempotency_key=None):
+        return {
+            "verification_data": "ok",
+            "evidence_source": "RAG Store",
+            "source_urls": [],
+            "claim_verdict": True,
+        }
+
+    capture = tmp_path / "capture.jsonl"
+    monkeypatch.setattr(settings, "chroma_persist_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "traffic_capture_path", str(capture))
+    monkeypatch.setattr(routes, "_verify", fake_verify)
+
+    for claim in ("First claim.", "Second claim."):
+        response = await client.post(
+            "/api/v1/verify", json={"claim": claim}, headers={"X-Client-Id": "tester"}
+        )
+        assert response.status_code == 200
+    routes._capture_queue.join()
+
+    records = [json.loads(line) for line in capture.read_text().splitlines()]
+    assert [record["claim"] for record in records] == ["First claim.", "Second claim."]
+    assert all(record["client"] == "tester" for record in records)
@@ -0,0 +1,59 @@
+"""Tests for the two-tier claim evaluation cascade."""
+
+from src import metrics
+from src.agents import cascade
+from src.agents.state import ClaimEvaluation
+from src.config import settings
+
+
+def _evaluation(confidence, evidence_found=True):
+    return ClaimEvaluation(
+        evidence_found=evidence_found,
+        confidence=confidence,
+        verification_data="",
+        claim_verdict=True,
+    )
+
+
+class FakeEvaluator:
+    def __init__(self, evaluation):
+        self.evaluation = evaluation
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        return self.evaluation
+
+
+def _install(monkeypatch, small, large):
+    monkeypatch.setattr(settings, "cascade_small_model", "small")
+    monkeypatch.setattr(settings, "openai_model", "large")
+    evaluators = {"small": FakeEvaluator(small), "large": FakeEvaluator(large)}
+    monkeypatch.setattr(cascade, "get_evaluator", evaluators.__getitem__)
+    metrics.reset()
+    return evaluators
+
+
+def test_escalation_reason_band_and_disagreement():
+    assert cascade.escalation_reason(_evaluation(0.95), 0.9) is None
+    assert cascade.escalation_reason(_evaluation(0.6), 0.9) == "uncertain"
+    assert cascade.escalation_reason(_evaluation(0.95), 0.1) == "disagrees_with_retrieval"
+    assert cascade.escalation_reason(_evaluation(0.1, evidence_found=False), 0.1) is None
+    assert cascade.escalation_reason(_evaluation(0.95), None) is None
+
+
+def test_confident_small_model_is_accepted(monkeypatch):
+    evaluators = _install(monkeypatch, _evaluation(0.95), _evaluation(0.5))
+    assert cascade.evaluate_claim([], retrieval_score=0.9).confidence == 0.95
+    assert evaluators["large"].calls == 0
+    assert metrics.snapshot()["gauges"]["cascade.escalation_rate"] == 0
+
+
+def test_uncertain_small_model_is_escalated(monkeypatch):
+    evaluators = _install(monkeypatch, _evaluation(0.6), _evaluation(0.9))
+    assert cascade.evaluate_claim([], retrieval_score=0.9).confidence == 0.9
+    assert evaluators["large"].calls == 1
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"]["cascade.escalations.uncertain"] == 1
+    assert snapshot["gauges"]["cascade.escalation_rate"] == 1
+    assert "cascade.large.latency" in snapshot["timings"]
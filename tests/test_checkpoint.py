@@ -0,0 +1,122 @@
+"""Tests for durable graph checkpoints."""
+
+import pytest
+from langchain_core.documents import Document
+
+from src.agents import checkpoint, rag_agent
+from src.agents.state import ClaimEvaluation
+from src.config import settings
+
+
+class FakeSearch:
+    calls = 0
+
+    def invoke(self, args):
+        self.calls += 1
+        result = {"url": "https://example.com/a", "title": "A", "content": "web text"}
+        return {"formatted": "[1] A", "structured": [result]}
+
+
+@pytest.fixture
+def durable(monkeypatch, tmp_path):
+    from src.api import routes
+
+    monkeypatch.setattr(settings, "checkpoint_store_path", str(tmp_path / "checkpoints.db"))
+    checkpoint.get_checkpointer.cache_clear()
+    routes._durable_agent.cache_clear()
+    yield routes
+    checkpoint.get_checkpointer.cache_clear()
+    routes._durable_agent.cache_clear()
+
+
+@pytest.mark.asyncio
+async def test_retry_resumes_at_the_failed_node(durable, monkeypatch):
+    search = FakeSearch()
+    evaluations = []
+    fail_web = [True]
+
+    def evaluate(messages, retrieval_score=None, deadline=None):
+        web = "web search" in messages[1].content
+        evaluations.append("web" if web else "rag")
+        if web and fail_web[0]:
+            raise ValueError("unparseable structured output")
+        return ClaimEvaluation(
+            evidence_found=web,
+            confidence=0.9 if web else 0.2,
+            verification_data="",
+            claim_verdict=web,
+        )
+
+    monkeypatch.setattr(
+        rag_agent,
+        "get_context_after_re_ranker",
+        lambda query, filters=None: [Document(page_content="kb text", metadata={"source": "kb"})],
+    )
+    monkeypatch.setattr(rag_agent, "evaluate_claim", evaluate)
+    monkeypatch.setattr(rag_agent, "web_search_tool", search)
+    monkeypatch.setattr(rag_agent, "split_documents", lambda docs: docs)
+    monkeypatch.setattr(rag_agent, "add_documents", lambda docs: None)
+
+    with pytest.raises(ValueError):
+        await durable._verify("The claim.", idempotency_key="key-1")
+    assert evaluations == ["rag", "web"] and search.calls == 1
+
+    fail_web[0] = False
+    output = await durable._verify("The claim.", idempotency_key="key-1")
+    assert output["evidence_source"] == "WEB" and output["claim_verdict"] is True
+    # Retrieval, the RAG evaluation and the search were not repeated
+    assert evaluations == ["rag", "web", "web"] and search.calls == 1
+
+    # A finished run is reused; another claim under the same key starts afresh
+    assert await durable._verify("the claim", idempotency_key="key-1") == output
+    assert evaluations == ["rag", "web", "web"]
+    await durable._verify("Another claim.", idempotency_key="key-1")
+    assert evaluations[3] == "rag"
+
+
+def test_threads_expire(tmp_path):
+    saver = checkpoint.SqliteCheckpointer(tmp_path / "c.db", ttl_seconds=60)
+    config = {"configurable": {"thread_id": "t", "checkpoint_ns": ""}}
+    data = {"id": "1", "channel_values": {"x": 1}, "channel_versions": {}, "versions_seen": {}}
+    saved = saver.put(config, data, {"step": 0}, {})
+    saver.put_writes(saved, [("x", 2)], "task")
+    loaded = saver.get_tuple(config)
+    assert loaded.checkpoint["channel_values"] == {"x": 1}
+    assert loaded.pending_writes == [("task", "x", 2)]
+
+    saver._conn.execute("UPDATE checkpoints SET created_at = created_at - 120")
+    assert saver.get_tuple(config) is None
+    assert saver.purge_expired() == 1
+
+
+@pytest.mark.asyncio
+async def test_keyed_request_does_not_join_an_unkeyed_run(durable, monkeypatch):
+    """A keyed request must checkpoint under its own thread, even if the claim is in flight."""
+    import asyncio
+    import time
+
+    retrievals = []
+
+    def retrieve(query, filters=None):
+        retrievals.append(query)
+        time.sleep(0.2)
+        return [Document(page_content="kb text", metadata={"source": "kb"})]
+
+    def evaluate(messages, retrieval_score=None, deadline=None):
+        return ClaimEvaluation(
+            evidence_found=True, confidence=0.9, verification_data="", claim_verdict=True
+        )
+
+    monkeypatch.setattr(rag_agent, "get_context_after_re_ranker", retrieve)
+    monkeypatch.setattr(rag_agent, "evaluate_claim", evaluate)
+
+    await asyncio.gather(
+        durable._verify("The claim."),
+        durable._verify("The claim.", idempotency_key="key-2"),
+        durable._verify("the claim", idempotency_key="key-2"),  # joins the keyed run
+    )
+    assert len(retrievals) == 2
+
+    # The keyed run was checkpointed: its retry reuses the verdict
+    await durable._verify("The claim.", idempotency_key="key-2")
+    assert len(retrievals) == 2
@@ -0,0 +1,68 @@
+"""Tests for single-flight request coalescing."""
+
+import asyncio
+
+import pytest
+
+from src.api.coalescing import SingleFlight
+from src.normalize import normalize_claim
+
+
+def test_normalize_claim_folds_trivial_differences():
+    """Case, whitespace and trailing punctuation should not change the key."""
+    assert normalize_claim("  The Earth   is ROUND. ") == normalize_claim("the earth is round")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution():
+    """Concurrent callers with the same key should run the function once."""
+    flight = SingleFlight("test")
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"verdict": True}
+
+    results = await asyncio.gather(*(flight.do("claim", work) for _ in range(5)))
+    assert calls == 1
+    assert all(result == {"verdict": True} for result in results)
+    assert flight.inflight == 0
+
+
+@pytest.mark.asyncio
+async def test_errors_propagate_to_every_waiter():
+    """Every waiter should receive the exception of the shared execution."""
+    flight = SingleFlight("test")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(
+        *(flight.do("claim", fail) for _ in range(3)), return_exceptions=True
+    )
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    # A later call starts a fresh execution instead of reusing the failure
+    async def succeed():
+        return "ok"
+
+    assert await flight.do("claim", succeed) == "ok"
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_shared_execution():
+    """A disconnecting caller must not cancel the work other callers wait on."""
+    flight = SingleFlight("test")
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    first = asyncio.ensure_future(flight.do("claim", work))
+    second = asyncio.ensure_future(flight.do("claim", work))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    assert await second == "done"
@@ -0,0 +1,135 @@
+"""Tests for request deadlines and best-effort verdicts."""
+
+import time
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from langchain_core.documents import Document
+
+from src import deadline, metrics
+from src.agents import cascade, rag_agent
+from src.agents.state import AgentState, ClaimEvaluation
+from src.config import settings
+
+
+def test_parse_timeout_and_call_timeout(monkeypatch):
+    monkeypatch.setattr(settings, "verify_deadline_seconds", 0.0)
+    assert deadline.parse_timeout(None) is None
+    assert deadline.parse_timeout("2.5") == 2.5
+    for bad in ("0", "-1", "soon", "inf", "nan"):
+        with pytest.raises(ValueError):
+            deadline.parse_timeout(bad)
+
+    assert deadline.call_timeout(None, default=30) == 30
+    assert deadline.call_timeout(time.time() + 100, default=30) == 30
+    assert deadline.call_timeout(time.time() + 5) == pytest.approx(5, abs=0.1)
+    with pytest.raises(TimeoutError):
+        deadline.call_timeout(time.time() + settings.deadline_min_call_seconds / 2)
+
+
+def _state(seconds_left, confidence=0.4):
+    return AgentState(
+        query="claim",
+        claim="claim",
+        deadline=time.time() + seconds_left,
+        evidence_found=True,
+        confidence=confidence,
+        evidence_source="RAG Store",
+    )
+
+
+def test_route_skips_web_search_when_budget_is_short():
+    metrics.reset()
+    assert rag_agent.route_after_evaluation(_state(60)) == "web_search"
+    assert rag_agent.route_after_evaluation(_state(1)) == "format_output"
+    assert metrics.snapshot()["counters"]["deadline.web_search_skipped"] == 1
+
+    output = rag_agent.extract_output(rag_agent.format_output_node(_state(1)), "claim")
+    assert output["low_confidence"] is True
+    output = rag_agent.extract_output(rag_agent.format_output_node(_state(1, 0.9)), "claim")
+    assert output["low_confidence"] is False
+
+
+def test_timed_out_evaluations_degrade(monkeypatch):
+    def slow(messages, retrieval_score=None, deadline=None):
+        raise TimeoutError("budget spent")
+
+    monkeypatch.setattr(rag_agent, "evaluate_claim", slow)
+    update = rag_agent.evaluate_rag_node(_state(0))
+    assert update["low_confidence"] and update["claim_verdict"] is False
+    # The web evaluation keeps the RAG verdict already in the state
+    assert rag_agent.evaluate_web_node(_state(0)) == {"low_confidence": True}
+
+
+def test_escalation_skipped_near_deadline(monkeypatch):
+    monkeypatch.setattr(settings, "cascade_small_model", "small")
+    monkeypatch.setattr(settings, "openai_model", "large")
+    calls = []
+
+    class Evaluator:
+        def __init__(self, model):
+            self.model = model
+
+        def invoke(self, messages):
+            calls.append(self.model)
+            return ClaimEvaluation(
+                evidence_found=True, confidence=0.6, verification_data="", claim_verdict=True
+            )
+
+    monkeypatch.setattr(cascade, "_evaluator", lambda model, deadline: Evaluator(model))
+    metrics.reset()
+    cascade.evaluate_claim([], 0.9, deadline=time.time() + 1)
+    assert calls == ["small"]
+    assert metrics.snapshot()["counters"]["deadline.escalations_skipped"] == 1
+    cascade.evaluate_claim([], 0.9, deadline=time.time() + 60)
+    assert calls == ["small", "small", "large"]
+
+
+@pytest.mark.asyncio
+async def test_verify_deadline_header(monkeypatch):
+    from src.api import routes
+    from src.api.app import app
+
+    seen = []
+
+    async def fake_verify(claim, filters=None, deadline=None, idempotency_key=None):
+        seen.append(deadline)
+        return {
+            "verification_data": "best effort",
+            "evidence_source": "RAG Store",
+            "source_urls": [],
+            "claim_verdict": False,
+            "low_confidence": True,
+        }
+
+    monkeypatch.setattr(routes, "_verify", fake_verify)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post(
+            "/api/v1/verify", json={"claim": "x"}, headers={"X-Request-Timeout": "2"}
+        )
+        assert response.status_code == 200
+        assert response.json()["low_confidence"] is True
+        assert response.headers["Cache-Control"] == "no-store" and "ETag" not in response.headers
+        assert seen[0] == pytest.approx(time.time() + 2, abs=1)
+
+        response = await client.post(
+            "/api/v1/verify", json={"claim": "x"}, headers={"X-Request-Timeout": "soon"}
+        )
+        assert response.status_code == 400
+
+
+def test_retrieval_is_bounded_by_the_budget(monkeypatch):
+    def slow(query, filters=None):
+        time.sleep(1.0)
+        return [Document(page_content="late")]
+
+    metrics.reset()
+    monkeypatch.setattr(rag_agent, "get_context_after_re_ranker", slow)
+    started = time.perf_counter()
+    update = rag_agent.retrieve_node(_state(settings.deadline_min_call_seconds + 0.2))
+    assert time.perf_counter() - started < 0.9
+    assert update["context"] == [] and update["low_confidence"] is True
+
+    # Too little budget left to start retrieving at all
+    assert rag_agent.retrieve_node(_state(0))["context"] == []
+    assert metrics.snapshot()["counters"]["deadline.retrieval_skipped"] == 2
@@ -0,0 +1,119 @@
+"""Tests for claim decomposition and parallel sub-claim verification."""
+
+import threading
+import time
+
+import pytest
+from langchain_core.documents import Document
+
+from src.agents import checkpoint, rag_agent
+from src.agents.decompose import split_claims
+from src.agents.state import ClaimEvaluation
+from src.config import settings
+
+PASSAGE = (
+    "Google was founded in 1998 by Larry Page and Sergey Brin. "
+    "It is headquartered in Mountain View. "
+    "Dr. Smith says the U.S. Army runs on Gmail. "
+    "Alphabet bought YouTube in 2006."
+)
+
+
+def test_split_claims():
+    assert split_claims(PASSAGE) == [
+        # The pronoun sentence stays with its referent, abbreviations do not split
+        "Google was founded in 1998 by Larry Page and Sergey Brin. "
+        "It is headquartered in Mountain View.",
+        "Dr. Smith says the U.S. Army runs on Gmail.",
+        "Alphabet bought YouTube in 2006.",
+    ]
+    assert split_claims("The Eiffel Tower is in Paris.") == ["The Eiffel Tower is in Paris."]
+    assert split_claims("Wow. The Eiffel Tower is in Paris.") == [
+        "Wow. The Eiffel Tower is in Paris."
+    ]
+    assert split_claims("Paris is in France. Paris is in France!") == ["Paris is in France."]
+
+    many = " ".join(f"Statement number {i} holds." for i in range(7))
+    merged = split_claims(many, max_claims=3)
+    assert len(merged) == 3 and " ".join(merged) == many
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """Fake retrieval / evaluation: claims mentioning Gmail are false, the rest hold."""
+    monkeypatch.setattr(settings, "decompose_claims", True)
+    evaluated = []
+    lock = threading.Lock()
+
+    def retrieve(query, filters=None):
+        return [Document(page_content=query, metadata={"source": f"kb/{len(query)}"})]
+
+    def evaluate(messages, retrieval_score=None, deadline=None):
+        time.sleep(0.2)
+        claim = messages[1].content.split("\n")[1]
+        with lock:
+            evaluated.append(claim)
+        holds = "Gmail" not in claim
+        return ClaimEvaluation(
+            evidence_found=True, confidence=0.9, verification_data="ok", claim_verdict=holds
+        )
+
+    monkeypatch.setattr(rag_agent, "get_context_after_re_ranker", retrieve)
+    monkeypatch.setattr(rag_agent, "evaluate_claim", evaluate)
+    return evaluated
+
+
+@pytest.mark.asyncio
+async def test_sub_claims_are_verified_in_parallel(pipeline, monkeypatch):
+    started = time.perf_counter()
+    result = await rag_agent.create_rag_agent().ainvoke({"query": PASSAGE})
+    elapsed = time.perf_counter() - started
+    output = rag_agent.extract_output(result, PASSAGE)
+
+    assert len(pipeline) == 3 and elapsed < 0.5  # the slowest branch, not the sum
+    assert [sub["claim_verdict"] for sub in output["sub_claims"]] == [True, False, True]
+    assert output["sub_claims"][1]["claim"].startswith("Dr. Smith")
+    assert output["claim_verdict"] is False and output["low_confidence"] is False
+    assert output["evidence_source"] == "RAG Store" and len(output["source_urls"]) == 3
+    assert output["verification_data"].startswith("1. [TRUE] Google was founded")
+
+    # Without decomposition the passage is one claim
+    pipeline.clear()
+    monkeypatch.setattr(settings, "decompose_claims", False)
+    output = rag_agent.extract_output(
+        await rag_agent.create_rag_agent().ainvoke({"query": PASSAGE}), PASSAGE
+    )
+    assert len(pipeline) == 1 and "sub_claims" not in output
+
+
+@pytest.mark.asyncio
+async def test_retry_reruns_only_failed_sub_claims(pipeline, monkeypatch, tmp_path):
+    from src.api import routes
+
+    evaluate = rag_agent.evaluate_claim
+    fail = [True]
+
+    def flaky(messages, retrieval_score=None, deadline=None):
+        if fail[0] and "Louvre" in messages[1].content:
+            time.sleep(0.3)  # fails after the other branch has finished
+            raise ValueError("unparseable structured output")
+        return evaluate(messages, retrieval_score, deadline)
+
+    monkeypatch.setattr(rag_agent, "evaluate_claim", flaky)
+    monkeypatch.setattr(settings, "checkpoint_store_path", str(tmp_path / "checkpoints.db"))
+    checkpoint.get_checkpointer.cache_clear()
+    routes._durable_agent.cache_clear()
+    try:
+        claim = "Paris is the capital of France. The Louvre is a museum in Paris."
+        with pytest.raises(ValueError):
+            await routes._verify(claim, idempotency_key="key")
+        assert pipeline == ["Paris is the capital of France."]
+
+        fail[0] = False
+        output = await routes._verify(claim, idempotency_key="key")
+        # The finished branch was not verified again
+        assert pipeline == ["Paris is the capital of France.", "The Louvre is a museum in Paris."]
+        assert output["claim_verdict"] is True and len(output["sub_claims"]) == 2
+    finally:
+        checkpoint.get_checkpointer.cache_clear()
+        routes._durable_agent.cache_clear()
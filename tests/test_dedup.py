@@ -0,0 +1,90 @@
+"""Tests for near-duplicate detection at ingest time."""
+
+import random
+
+import pytest
+from langchain_core.documents import Document
+
+from src.config import settings
+from src.rag import dedup
+from src.rag.dedup import NearDuplicateIndex, deduplicate, record_chunks
+
+
+def story(seed: int, words: int = 150) -> str:
+    rng = random.Random(seed)
+    return " ".join(f"w{rng.randrange(1000)}" for _ in range(words))
+
+
+def edited(text: str, changes: int = 2) -> str:
+    """Replace ``changes`` words: an estimated Jaccard similarity of about 0.87."""
+    words = text.split()
+    for i in range(changes):
+        words[(i + 1) * len(words) // (changes + 1)] = "edited"
+    return " ".join(words)
+
+
+@pytest.fixture
+def index_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "chroma_persist_dir", str(tmp_path / "chroma"))
+    dedup._indexes.clear()
+    yield tmp_path / "chroma" / "dedup"
+    dedup._indexes.clear()
+
+
+def test_lsh_finds_lightly_edited_copy_only():
+    index = NearDuplicateIndex()
+    original = story(1)
+    index.add([(index.signature(original), {"id": "a"})])
+    assert index.find(index.signature(edited(original)))["id"] == "a"
+    assert index.find(index.signature(story(2))) is None
+
+
+def test_batch_copies_from_other_sources_are_merged(index_dir):
+    text = story(1)
+    chunks = [
+        Document(page_content=text, metadata={"source": "https://a.example"}),
+        Document(page_content=edited(text), metadata={"source": "https://b.example"}),
+        Document(page_content=text, metadata={"source": "https://a.example"}),  # same source
+        Document(page_content=story(2), metadata={"source": "https://c.example"}),
+    ]
+    survivors = deduplicate(chunks)
+    assert [doc.metadata["source"] for doc in survivors] == [
+        "https://a.example",
+        "https://a.example",
+        "https://c.example",
+    ]
+    assert survivors[0].metadata["alternate_sources"] == "https://b.example"
+
+
+def test_stored_chunks_are_persisted_and_skipped(index_dir, monkeypatch):
+    stored = Document(page_content=story(3), metadata={"source": "https://a.example"}, id="c1")
+    record_chunks("default", [stored])
+    assert (index_dir / "chunks.jsonl").exists()
+
+    updates = {}
+    monkeypatch.setattr(
+        "src.rag.vector_store.add_alternate_sources", lambda alternates: updates.update(alternates)
+    )
+    dedup._indexes.clear()  # a fresh process reads the persisted index
+    copy = Document(page_content=edited(story(3)), metadata={"source": "https://b.example"})
+    assert deduplicate([copy]) == []
+    assert updates == {("default", "c1"): {"https://b.example"}}
+
+
+def test_append_after_a_crash_keeps_signatures_paired(index_dir):
+    """Rows and a torn entry left by a crash between the two writes are cut off."""
+    first, second = story(4), story(5)
+    writer = NearDuplicateIndex(directory=index_dir)
+    writer.add([(writer.signature(first), {"id": "first"})])
+    # Crash: the signature row of a record was written, its entry only partly
+    with open(index_dir / "signatures.bin", "ab") as f:
+        f.write(writer.signature(story(6)).tobytes())
+    with open(index_dir / "chunks.jsonl", "ab") as f:
+        f.write(b'{"id": "to')
+
+    NearDuplicateIndex(directory=index_dir).add([(writer.signature(second), {"id": "second"})])
+
+    reader = NearDuplicateIndex(directory=index_dir)
+    assert reader.find(reader.signature(edited(first)))["id"] == "first"
+    assert reader.find(reader.signature(edited(second)))["id"] == "second"
+    assert len(reader) == 2
@@ -0,0 +1,76 @@
+"""Tests for evidence packing."""
+
+from langchain_core.documents import Document
+
+from src.rag.evidence import (
+    EvidenceItem,
+    drop_near_duplicates,
+    items_from_documents,
+    merge_overlapping,
+    pack_evidence,
+)
+
+
+def test_merge_overlapping_stitches_same_source_chunks():
+    """Chunks sharing an edge from the same source should be merged into one."""
+    first = EvidenceItem(text="alpha beta gamma delta epsilon zeta eta", source="a.txt", score=0.4)
+    second = EvidenceItem(text="epsilon zeta eta theta iota kappa", source="a.txt", score=0.9)
+    merged = merge_overlapping([first, second], min_overlap=10)
+    assert len(merged) == 1
+    assert merged[0].text == "alpha beta gamma delta epsilon zeta eta theta iota kappa"
+    assert merged[0].score == 0.9
+
+
+def test_merge_overlapping_ignores_other_sources():
+    """Overlapping text from different sources must not be merged."""
+    first = EvidenceItem(text="alpha beta gamma delta epsilon zeta eta", source="a.txt")
+    second = EvidenceItem(text="epsilon zeta eta theta iota kappa", source="b.txt")
+    assert len(merge_overlapping([first, second], min_overlap=10)) == 2
+
+
+def test_drop_near_duplicates_keeps_best_scored_copy():
+    """Syndicated copies should collapse to the highest-scoring one."""
+    text = "The company announced record quarterly revenue driven by cloud growth today"
+    items = [
+        EvidenceItem(text=text, source="https://a.example", score=0.5),
+        EvidenceItem(text=text + " (Reuters)", source="https://b.example", score=0.8),
+        EvidenceItem(text="A completely different passage about football", source="c", score=0.1),
+    ]
+    kept = drop_near_duplicates(items, threshold=0.8)
+    assert [item.source for item in kept] == ["https://b.example", "c"]
+
+
+def test_pack_evidence_respects_token_budget():
+    """Packed evidence should stay within the budget, keeping the best items."""
+    docs = [
+        Document(
+            page_content=" ".join(f"term{i}x{j}" for j in range(150)),
+            metadata={"source": f"doc{i}.txt", "relevance_score": 1.0 - i / 10},
+        )
+        for i in range(5)
+    ]
+    packed = pack_evidence(items_from_documents(docs), token_budget=300)
+    assert packed.tokens_after <= 300
+    assert 0 < len(packed.items) < 5
+    assert packed.items[0].source == "doc0.txt"
+    assert packed.tokens_saved > 0
+
+
+def test_pack_evidence_fills_budget_after_oversized_item():
+    """An item too large to fit is skipped, and a smaller, lower-ranked one still fits."""
+    docs = [
+        Document(
+            page_content="lead passage " * 10,
+            metadata={"source": "a.txt", "relevance_score": 0.9},
+        ),
+        Document(
+            page_content=" ".join(f"bulk{j}" for j in range(400)),
+            metadata={"source": "b.txt", "relevance_score": 0.8},
+        ),
+        Document(page_content="short tail", metadata={"source": "c.txt", "relevance_score": 0.1}),
+    ]
+    # Leave too little room after the first item for the second to be truncated
+    budget = pack_evidence(items_from_documents(docs[:1]), token_budget=0).tokens_after + 40
+    packed = pack_evidence(items_from_documents(docs), token_budget=budget)
+    assert [item.source for item in packed.items] == ["a.txt", "c.txt"]
+    assert packed.tokens_after <= budget
@@ -0,0 +1,46 @@
+"""Tests for retrieval filters and the metadata index."""
+
+import time
+
+from src.rag.filters import MetadataIndex, RetrievalFilter, shard_may_match
+
+NOW = time.time()
+METADATAS = [
+    {"source": "data/Google.txt"},
+    {"source_type": "web", "source_url": "https://www.example.com/a", "ingested_at": NOW},
+    {"source_type": "web", "source_url": "https://blog.other.org/b", "ingested_at": NOW},
+    {"source_type": "web", "source_url": "https://example.com/c", "published_date": "2001-01-01"},
+]
+
+
+def test_empty_filter_does_not_restrict():
+    index = MetadataIndex.build(METADATAS)
+    assert index.rows(None) is None
+    assert index.rows(RetrievalFilter()) is None
+
+
+def test_filters_resolve_to_matching_rows():
+    index = MetadataIndex.build(METADATAS)
+    assert index.rows(RetrievalFilter(source_types=["file"])).tolist() == [0]
+    assert index.rows(RetrievalFilter(max_age_days=7)).tolist() == [1, 2]
+    assert index.rows(RetrievalFilter(allow_domains=["example.com"])).tolist() == [1, 3]
+    assert index.rows(RetrievalFilter(deny_domains=["other.org"])).tolist() == [0, 1, 3]
+    assert index.rows(
+        RetrievalFilter(max_age_days=7, allow_domains=["example.com"])
+    ).tolist() == [1]
+
+
+def test_metadata_index_save_and_load(tmp_path):
+    index = MetadataIndex.build(METADATAS)
+    index.save(tmp_path)
+    loaded = MetadataIndex.load(tmp_path)
+    assert loaded.rows(RetrievalFilter(source_types=["web"])).tolist() == [1, 2, 3]
+
+
+def test_shards_outside_the_filter_are_pruned():
+    recent = RetrievalFilter(max_age_days=30)
+    assert not shard_may_match("web-2001-01", recent)
+    assert shard_may_match("file", recent)
+    assert not shard_may_match("file", RetrievalFilter(source_types=["web"]))
+    assert not shard_may_match("web-2099-01", RetrievalFilter(source_types=["file"]))
+    assert shard_may_match("default", RetrievalFilter(source_types=["web"]))
@@ -0,0 +1,105 @@
+"""Tests for the vectorised BM25 index and the hybrid retriever."""
+
+import numpy as np
+from langchain_core.documents import Document
+from rank_bm25 import BM25Okapi
+
+from src.rag.filters import MetadataIndex, RetrievalFilter
+from src.rag.hybrid import BM25Index, HybridRetriever, fuse
+
+CORPUS = [
+    "Google was founded in 1998 by Larry Page and Sergey Brin",
+    "Alphabet became the parent company of Google in 2015",
+    "The Eiffel Tower is located in Paris",
+    "Paris is the capital of France and home to the Louvre",
+    "Larry Page served as CEO of Alphabet",
+]
+
+
+class StubVectorStore:
+    """Returns fixed hits, like Chroma's similarity_search_with_score."""
+
+    def __init__(self, hits):
+        self.hits = hits
+
+    def similarity_search_with_score(self, query, k):
+        return self.hits[:k]
+
+
+def test_bm25_index_matches_rank_bm25():
+    """Vectorised scores should equal rank_bm25's BM25Okapi scores."""
+    index = BM25Index.build(CORPUS, [str(i) for i in range(len(CORPUS))])
+    reference = BM25Okapi([text.split() for text in CORPUS])
+    for query in ["Google Larry Page", "Paris Paris Tower", "unknown words"]:
+        np.testing.assert_allclose(
+            index.scores(query), reference.get_scores(query.split()), rtol=1e-5
+        )
+
+
+def test_bm25_search_returns_best_rows_first():
+    """search() should return the top-k rows in descending score order."""
+    index = BM25Index.build(CORPUS, [str(i) for i in range(len(CORPUS))])
+    rows, scores = index.search("Eiffel Tower Paris", k=2)
+    assert rows[0] == 2
+    assert list(scores) == sorted(scores, reverse=True)
+
+
+def test_rrf_fusion_accumulates_scores_by_key():
+    """A key ranked by both legs should beat keys ranked by only one."""
+    keys, scores = fuse([np.array([1, 2]), np.array([3, 1])], weights=[0.5, 0.5])
+    assert keys[0] == 1
+    assert scores[0] == 0.5 / 61 + 0.5 / 62
+
+
+def test_hybrid_retriever_fuses_on_chunk_ids():
+    """Documents from both legs should be merged by ID, not duplicated."""
+    documents = [Document(page_content=t, id=str(i)) for i, t in enumerate(CORPUS)]
+    new_doc = Document(page_content="Chunk not yet in the BM25 index", id="new")
+    retriever = HybridRetriever(
+        vector_store=StubVectorStore([(documents[0], 0.1), (new_doc, 0.2)]),
+        bm25=BM25Index.build(CORPUS, [d.id for d in documents]),
+        documents=documents,
+        k=2,
+    )
+    results = retriever.invoke("Google founded Larry Page")
+    ids = [doc.id for doc in results]
+    assert ids[0] == "0"
+    assert "new" in ids
+    assert len(ids) == len(set(ids))
+
+
+def test_bm25_index_save_and_mmap_load_roundtrip(tmp_path):
+    """A saved index should load memory-mapped and score identically."""
+    index = BM25Index.build(CORPUS, [str(i) for i in range(len(CORPUS))])
+    index.save(tmp_path)
+    loaded = BM25Index.load(tmp_path, mmap=True)
+    assert loaded.ids == index.ids
+    np.testing.assert_allclose(loaded.scores("Paris Tower"), index.scores("Paris Tower"))
+
+
+def test_hybrid_retriever_prefilters_both_legs():
+    """A filter should restrict BM25 rows and pass the allowed IDs to the vector store."""
+    documents = [
+        Document(page_content=t, id=str(i), metadata={"source_type": "file"})
+        for i, t in enumerate(CORPUS)
+    ]
+    documents[4].metadata = {"source_type": "web", "source_url": "https://news.example.com/a"}
+
+    class RecordingStore(StubVectorStore):
+        def similarity_search_with_score(self, query, k, ids=None):
+            self.ids = ids
+            return [(documents[int(i)], 0.1) for i in ids or []][:k]
+
+    store = RecordingStore([])
+    retriever = HybridRetriever(
+        vector_store=store,
+        bm25=BM25Index.build(CORPUS, [d.id for d in documents]),
+        metadata_index=MetadataIndex.build([d.metadata for d in documents]),
+        documents=documents,
+        k=3,
+    )
+    hits = retriever.search(
+        "Google Larry Page", retrieval_filter=RetrievalFilter(allow_domains=["example.com"])
+    )
+    assert store.ids == ["4"]
+    assert [doc.id for doc, _ in hits] == ["4"]
@@ -0,0 +1,87 @@
+"""Tests for the double-buffered index manager."""
+
+import threading
+
+from src.rag.index_manager import IndexManager
+
+
+class Builder:
+    """Builds ``(shard, n)`` for the n-th build; can be held to simulate a slow rebuild."""
+
+    def __init__(self) -> None:
+        self.builds: list[str] = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, shard: str) -> tuple[str, int]:
+        self.release.wait(5)
+        self.builds.append(shard)
+        return shard, len(self.builds)
+
+
+def test_readers_keep_previous_generation_until_swap():
+    builder = Builder()
+    manager = IndexManager(builder, debounce=0.0, max_delay=1.0)
+    assert manager.get("web") == ("web", 1)  # first read builds in place
+
+    builder.release.clear()
+    manager.mark_dirty("web")
+    # The rebuild is blocked: readers are served the published generation
+    assert manager.get("web") == ("web", 1)
+    assert not manager.wait_idle(timeout=0.1)
+
+    builder.release.set()
+    assert manager.wait_idle(timeout=5)
+    assert manager.get("web") == ("web", 2)
+    assert manager.generation("web") == 2
+
+
+def test_bursts_of_writes_are_debounced():
+    builder = Builder()
+    manager = IndexManager(builder, debounce=0.2, max_delay=5.0)
+    manager.get("web")
+    for _ in range(20):
+        manager.mark_dirty("web")
+    assert manager.wait_idle(timeout=5)
+    assert builder.builds == ["web", "web"]
+
+
+def test_invalidate_discards_build_in_flight():
+    builder = Builder()
+    manager = IndexManager(builder, debounce=0.0, max_delay=1.0)
+    manager.get("web")
+    builder.release.clear()
+    manager.mark_dirty("web")
+    while not manager._building:  # wait for the rebuild to start
+        threading.Event().wait(0.01)
+    manager.invalidate("web")
+    builder.release.set()
+    assert manager.wait_idle(timeout=5)
+    # The stale rebuild was not published; the next read builds afresh
+    assert manager.get("web") == ("web", 3)
+
+
+def test_writes_by_another_process_are_picked_up(monkeypatch, tmp_path):
+    """Two managers share one shard registry, as pre-forked workers do."""
+    from src.config import settings
+    from src.rag.shards import forget, record_write, shard_versions
+
+    monkeypatch.setattr(settings, "chroma_persist_dir", str(tmp_path))
+    writer_builds, reader_builds = Builder(), Builder()
+    writer = IndexManager(writer_builds, 0.0, 1.0, watch=shard_versions, watch_interval=0.01)
+    reader = IndexManager(reader_builds, 0.0, 1.0, watch=shard_versions, watch_interval=0.01)
+    writer.get("web")
+    assert reader.get("web") == ("web", 1)
+
+    record_write("web")  # the writer's own process marks its shard dirty
+    writer.mark_dirty("web")
+    assert writer.wait_idle(timeout=5)
+    reader.check_outside_writes(force=True)  # as the next read would
+    assert reader.wait_idle(timeout=5)
+    assert reader.get("web") == ("web", 2)
+    assert writer_builds.builds == ["web", "web"]
+
+    forget()  # a reset elsewhere drops the index instead of serving deleted chunks
+    reader.check_outside_writes(force=True)
+    assert reader.items() == []
+    assert reader.get("web") == ("web", 3)
@@ -0,0 +1,115 @@
+"""Tests for the persistent verification job store."""
+
+import socket
+
+import httpx
+import pytest
+
+from src.api import jobs
+from src.api.jobs import FAILED, QUEUED, RUNNING, SUCCEEDED, JobStore, check_webhook_url
+
+
+def test_jobs_are_claimed_in_order_and_finished(tmp_path):
+    """Queued jobs should be claimed oldest first and keep their result."""
+    store = JobStore(tmp_path / "jobs.db")
+    first = store.create("first claim")
+    second = store.create("second claim", webhook_url="http://hook")
+
+    claimed = store.claim_next()
+    assert claimed["id"] == first["id"]
+    assert claimed["status"] == RUNNING
+
+    store.finish(first["id"], result={"claim_verdict": True})
+    assert store.get(first["id"])["status"] == SUCCEEDED
+    assert store.get(first["id"])["result"] == {"claim_verdict": True}
+
+    assert store.claim_next()["id"] == second["id"]
+    store.finish(second["id"], error="boom")
+    assert store.get(second["id"])["status"] == FAILED
+    assert store.claim_next() is None
+
+
+def test_results_survive_reopen_and_orphans_are_requeued(tmp_path):
+    """A restarted process should see finished results and re-run orphaned jobs."""
+    store = JobStore(tmp_path / "jobs.db")
+    done = store.create("done")
+    store.claim_next()
+    store.finish(done["id"], result={"claim_verdict": False})
+    orphan = store.create("orphan")
+    store.claim_next()
+    alive = store.create("alive")
+    store.claim_next()
+    # Simulate a crashed owner process: its lease is no longer renewed
+    store._conn.execute("UPDATE jobs SET updated_at = updated_at - 120")
+    store.renew([alive["id"]])
+
+    reopened = JobStore(tmp_path / "jobs.db")
+    assert reopened.get(done["id"])["result"] == {"claim_verdict": False}
+    assert reopened.requeue_orphans(lease_seconds=60) == 1
+    assert reopened.get(orphan["id"])["status"] == QUEUED
+    assert reopened.get(alive["id"])["status"] == RUNNING
+
+
+def test_purge_expired_removes_only_finished_jobs(tmp_path):
+    """Expiry should delete finished jobs and leave pending ones alone."""
+    store = JobStore(tmp_path / "jobs.db")
+    finished = store.create("finished")
+    pending = store.create("pending")
+    store.finish(finished["id"], result={})
+
+    assert store.purge_expired(ttl_seconds=-1) == 1
+    assert store.get(finished["id"]) is None
+    assert store.get(pending["id"]) is not None
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "http://127.0.0.1:8000/hook",
+        "http://10.0.0.5/hook",
+        "http://169.254.169.254/latest/meta-data",
+        "http://[::1]/hook",
+        "http://localhost/hook",
+        "http://metadata.google.internal/",
+        "ftp://example.com/hook",
+    ],
+)
+def test_webhooks_to_internal_hosts_are_rejected(url):
+    """The server must not be made to POST into its own network."""
+    with pytest.raises(ValueError):
+        check_webhook_url(url)
+
+
+def test_public_webhooks_are_accepted():
+    check_webhook_url("https://example.com/hooks/verify")
+    check_webhook_url("http://93.184.216.34:8080/hook")
+
+
+@pytest.mark.asyncio
+async def test_webhook_is_sent_to_the_address_that_was_checked(monkeypatch):
+    """Delivery connects to the validated address, so a rebinding host cannot redirect it."""
+    answers = iter(["93.184.216.34", "127.0.0.1"])
+    sent = []
+
+    def getaddrinfo(host, port, *args, **kwargs):
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (next(answers), port or 443))]
+
+    def handler(request):
+        sent.append(request)
+        return httpx.Response(200)
+
+    transport = httpx.MockTransport(handler)
+    client = httpx.AsyncClient
+    monkeypatch.setattr(socket, "getaddrinfo", getaddrinfo)
+    monkeypatch.setattr(jobs.httpx, "AsyncClient", lambda **kw: client(transport=transport, **kw))
+    job = {"id": "j1", "claim": "c", "status": SUCCEEDED, "result": {}, "error": None}
+
+    await jobs._deliver_webhook({**job, "webhook_url": "https://hooks.example.com/verify"})
+    assert len(sent) == 1
+    assert sent[0].url.host == "93.184.216.34"
+    assert sent[0].headers["Host"] == "hooks.example.com"
+    assert sent[0].extensions["sni_hostname"] == "hooks.example.com"
+
+    # The same name now resolves to loopback: nothing is sent
+    await jobs._deliver_webhook({**job, "webhook_url": "https://hooks.example.com/verify"})
+    assert len(sent) == 1
@@ -0,0 +1,56 @@
+"""Tests for the local embedding backend's dynamic batching."""
+
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from src.rag.local_embeddings import DynamicBatcher, LocalEmbeddings
+
+
+class FakeModel:
+    """Embeds a text as [len(text), 1]; records the size of every forward pass."""
+
+    def __init__(self, delay: float = 0.0) -> None:
+        self.delay = delay
+        self.passes: list[int] = []
+
+    def encode(self, texts, **kwargs):
+        self.passes.append(len(texts))
+        time.sleep(self.delay)
+        return np.array([[len(text), 1.0] for text in texts], dtype=np.float32)
+
+
+def test_concurrent_queries_share_forward_passes():
+    model = FakeModel(delay=0.05)
+    embeddings = LocalEmbeddings(model=model, max_batch=64)
+    results = {}
+
+    def query(i: int) -> None:
+        results[i] = embeddings.embed_query("x" * i)
+
+    threads = [threading.Thread(target=query, args=(i,)) for i in range(1, 21)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(results[i] == [float(i), 1.0] for i in range(1, 21))
+    assert sum(model.passes) == 20
+    assert len(model.passes) < 20  # queries arriving during a pass are batched
+
+
+def test_large_requests_are_split_and_errors_propagate():
+    model = FakeModel()
+    embeddings = LocalEmbeddings(model=model, max_batch=8)
+    vectors = embeddings.embed_documents(["a" * (i + 1) for i in range(20)])
+    assert [v[0] for v in vectors] == [float(i + 1) for i in range(20)]
+    assert max(model.passes) <= 8
+
+    def fail(texts):
+        raise RuntimeError("boom")
+
+    future = DynamicBatcher(fail).submit(["x"])
+    with pytest.raises(RuntimeError, match="boom"):
+        future.result(timeout=5)
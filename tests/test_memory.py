@@ -0,0 +1,66 @@
+"""Tests for memory accounting."""
+
+import numpy as np
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from src import memory
+from src.config import settings
+
+
+def test_deep_sizeof_counts_buffers_and_skips_memory_maps(tmp_path):
+    array = np.zeros(100_000, dtype=np.float64)
+    assert memory.deep_sizeof({"a": array}) > array.nbytes
+
+    np.save(tmp_path / "a.npy", array)
+    mapped = np.load(tmp_path / "a.npy", mmap_mode="r")
+    assert memory.is_mapped(mapped[10:])
+    assert memory.deep_sizeof([mapped]) < 1000
+
+
+def test_deep_sizeof_extrapolates_large_containers():
+    items = [f"text {i}" * 10 for i in range(20_000)]
+    exact = memory.deep_sizeof(items, sample=len(items))
+    assert memory.deep_sizeof(items, sample=500) == pytest.approx(exact, rel=0.05)
+
+
+def test_threshold_warnings(monkeypatch):
+    monkeypatch.setattr(settings, "memory_warn_rss_mb", 100)
+    monkeypatch.setattr(settings, "memory_warn_component_mb", 10)
+    components = [memory.Component("bm25[web]", 20 * memory.MB), memory.Component("x", 1)]
+    warnings = memory.threshold_warnings(200 * memory.MB, components)
+    assert len(warnings) == 2 and "bm25[web]" in warnings[1]
+    assert memory.threshold_warnings(50 * memory.MB) == []
+
+
+def test_snapshot_diff_finds_growth():
+    memory.start_tracing()
+    try:
+        memory.take_snapshot("base")
+        hoard = [bytearray(1024) for _ in range(1000)]
+        diff = memory.compare_snapshots("base")
+        assert "test_memory.py" in diff["top"][0]["location"]
+        assert diff["top"][0]["size_diff_bytes"] >= 1000 * 1024
+        del hoard
+    finally:
+        memory.stop_tracing()
+
+
+@pytest.mark.asyncio
+async def test_memory_endpoint(monkeypatch):
+    from src.api.app import app
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/api/v1/admin/memory")
+        assert response.status_code == 200
+        names = [c["name"] for c in response.json()["components"]]
+        assert "single_flight" in names
+
+        # Tracing is off unless explicitly enabled
+        response = await client.post("/api/v1/admin/memory/tracemalloc/start")
+        assert response.status_code == 403
+        response = await client.get("/api/v1/admin/memory/snapshots/diff?base=missing")
+        assert response.status_code == 403
+        monkeypatch.setattr(settings, "memory_tracing_enabled", True)
+        response = await client.get("/api/v1/admin/memory/snapshots/diff?base=missing")
+        assert response.status_code == 404
@@ -0,0 +1,110 @@
+"""Tests for the retrieval result cache."""
+
+from langchain_core.documents import Document
+
+from src import metrics
+from src.config import settings
+from src.rag import retriever
+from src.rag.retrieval_cache import RetrievalCache
+
+STORE = {
+    str(i): Document(page_content=f"chunk {i}", metadata={"source": "kb"}, id=str(i))
+    for i in range(5)
+}
+
+
+def hydrate(ids):
+    return [STORE[i] for i in ids if i in STORE]
+
+
+def ranked(*ids):
+    return [
+        Document(page_content=STORE[i].page_content, metadata={"relevance_score": 0.9}, id=i)
+        for i in ids
+    ]
+
+
+def test_hits_hydrate_ids_and_evict_least_recent():
+    metrics.reset()
+    cache = RetrievalCache(2, hydrate)
+    a, b, c = (cache.key(q, None) for q in ("Claim A.", "claim b", "claim c"))
+    assert cache.key("  CLAIM a ", None) == a
+
+    assert cache.get(a, 1) is None
+    cache.put(a, 1, ranked("2", "0"))
+    docs = cache.get(a, 1)
+    assert [doc.id for doc in docs] == ["2", "0"]
+    assert docs[0].metadata == {"source": "kb", "relevance_score": 0.9}
+
+    cache.put(b, 1, ranked("1"))
+    cache.get(a, 1)
+    cache.put(c, 1, ranked("3"))
+    assert cache.get(b, 1) is None and cache.get(a, 1) is not None
+
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"]["retrieval.cache.hits"] == 3
+    assert snapshot["gauges"]["retrieval.cache.hit_ratio"] == 0.6
+
+
+def test_generation_change_invalidates():
+    cache = RetrievalCache(8, hydrate)
+    key = cache.key("claim", None)
+    cache.get(key, 1)
+    cache.put(key, 1, ranked("1"))
+    assert cache.get(key, 2) is None and not len(cache)
+    # A result computed before the change is not stored under the new generation
+    cache.put(key, 1, ranked("1"))
+    assert cache.get(key, 2) is None
+
+    # Chunks deleted behind the cache's back turn the entry into a miss
+    cache.put(key, 2, ranked("1") + [Document(page_content="gone", id="missing")])
+    assert cache.get(key, 2) is None and not len(cache)
+
+
+def test_get_context_reuses_reranked_results(monkeypatch):
+    calls = []
+
+    def adaptive(query, retrieval_filter):
+        calls.append(query)
+        return ranked("4", "1")
+
+    generation = [(1, ())]
+    monkeypatch.setattr(settings, "adaptive_retrieval", True)
+    monkeypatch.setattr(retriever, "_adaptive_context", adaptive)
+    monkeypatch.setattr(retriever, "_index_generation", lambda: generation[0])
+    monkeypatch.setattr(retriever, "_retrieval_cache", RetrievalCache(8, hydrate))
+
+    first = retriever.get_context_after_re_ranker("The claim.")
+    again = retriever.get_context_after_re_ranker("the claim")
+    assert [doc.id for doc in again] == [doc.id for doc in first] == ["4", "1"]
+    assert calls == ["The claim."]
+
+    generation[0] = (2, ())
+    retriever.get_context_after_re_ranker("the claim")
+    assert len(calls) == 2
+
+    monkeypatch.setattr(settings, "retrieval_cache_size", 0)
+    retriever.get_context_after_re_ranker("the claim")
+    assert len(calls) == 3
+
+
+def test_reranking_maps_scores_by_position(monkeypatch):
+    """A chunk's own ``id`` metadata (NDJSON records carry one) must not pick the candidate."""
+    candidates = [
+        Document(page_content="first", metadata={"id": "rec-17"}, id="a"),
+        Document(page_content="second", metadata={"id": 0}, id="b"),
+        Document(page_content="third", metadata={}, id="c"),
+    ]
+
+    class Hybrid:
+        def search(self, query, retrieval_filter):
+            return candidates
+
+    monkeypatch.setattr(retriever, "get_hybrid_retriever", Hybrid)
+    monkeypatch.setattr(retriever, "rerank_scores", lambda query, docs: [0.4, 0.9, 0.1])
+    monkeypatch.setattr(settings, "retriever_top_n", 2)
+
+    docs = retriever._reranked_context("claim", None)
+    assert [doc.id for doc in docs] == ["b", "a"]
+    assert [doc.page_content for doc in docs] == ["second", "first"]
+    assert docs[1].metadata == {"id": "rec-17", "relevance_score": 0.4}
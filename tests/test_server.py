@@ -0,0 +1,52 @@
+"""Tests for the pre-forking launcher's supervision loop."""
+
+import os
+import socket
+import time
+
+from src import server
+from src.config import settings
+
+
+def test_crashing_workers_are_respawned_with_backoff(monkeypatch):
+    monkeypatch.setattr(settings, "memory_report_interval", 0)
+    monkeypatch.setattr(server, "_RESPAWN_DELAY", 0.05)
+    # Workers crash right after the fork, as on a failing startup
+    monkeypatch.setattr(server, "_serve_worker", lambda sock, slot: os._exit(1))
+    spawns: dict[int, list[float]] = {}
+
+    def spawn(slot):
+        spawns.setdefault(slot, []).append(time.monotonic())
+        return server._spawn(sock, slot)
+
+    with socket.socket() as sock:
+        stop_at = time.monotonic() + 1.0
+        children = server.supervise(spawn, 2, lambda: time.monotonic() > stop_at, poll=0.01)
+    for pid in children:
+        os.waitpid(pid, 0)
+
+    assert set(spawns) == {0, 1}
+    for times in spawns.values():
+        # 0.05, 0.1, 0.2, 0.4 s apart – not hundreds of respawns
+        assert 3 <= len(times) <= 6
+        gaps = [b - a for a, b in zip(times, times[1:])]
+        assert all(gap >= 0.05 * 2**i for i, gap in enumerate(gaps))
+
+
+def test_long_lived_worker_is_replaced_at_once(monkeypatch):
+    monkeypatch.setattr(settings, "memory_report_interval", 0)
+    monkeypatch.setattr(server, "_RESPAWN_STABLE_AFTER", 0.0)
+    monkeypatch.setattr(server, "_serve_worker", lambda sock, slot: os._exit(0))
+    spawned = []
+
+    def spawn(slot):
+        spawned.append(time.monotonic())
+        return server._spawn(sock, slot)
+
+    with socket.socket() as sock:
+        stop_at = time.monotonic() + 0.5
+        children = server.supervise(spawn, 1, lambda: time.monotonic() > stop_at, poll=0.01)
+    for pid in children:
+        os.waitpid(pid, 0)
+    gaps = [b - a for a, b in zip(spawned, spawned[1:])]
+    assert len(gaps) >= 2 and max(gaps) < server._RESPAWN_DELAY
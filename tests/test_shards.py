@@ -0,0 +1,61 @@
+"""Tests for the shard layout of the knowledge base."""
+
+from src.config import settings
+from src.rag.shards import (
+    DEFAULT_SHARD,
+    FILE_SHARD,
+    collection_name,
+    shard_for,
+    shard_of_collection,
+)
+
+
+def test_everything_maps_to_default_shard_when_disabled(monkeypatch):
+    monkeypatch.setattr(settings, "shard_collections", False)
+    assert shard_for({"source_type": "web"}) == DEFAULT_SHARD
+    assert collection_name(DEFAULT_SHARD) == settings.chroma_collection_name
+
+
+def test_shard_for_splits_by_source_type_and_time_bucket(monkeypatch):
+    monkeypatch.setattr(settings, "shard_collections", True)
+    monkeypatch.setattr(settings, "shard_time_bucket", "month")
+    assert shard_for({"source": "data/Google.txt"}) == FILE_SHARD
+    assert shard_for({"source_type": "web", "published_date": "2024-03-05"}) == "web-2024-03"
+    monkeypatch.setattr(settings, "shard_time_bucket", "year")
+    assert shard_for({"source_type": "web", "published_date": "2024-03-05"}) == "web-2024"
+
+
+def test_collection_name_roundtrip():
+    for shard in (DEFAULT_SHARD, FILE_SHARD, "web-2024-03"):
+        assert shard_of_collection(collection_name(shard)) == shard
+    assert shard_of_collection("unrelated") is None
+
+
+def _bump_many(count: int) -> None:
+    from src.rag.shards import bump_generation, record_write
+
+    for i in range(count):
+        if i % 2:
+            record_write(f"web-{i % 3}")
+        else:
+            bump_generation()
+
+
+def test_generation_bumps_are_not_lost_across_processes(monkeypatch, tmp_path):
+    """Pre-forked workers bump the same counter; every write must count exactly once."""
+    import multiprocessing
+
+    from src.rag.shards import _read_registry, kb_generation
+
+    monkeypatch.setattr(settings, "chroma_persist_dir", str(tmp_path))
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_bump_many, args=(50,)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert [worker.exitcode for worker in workers] == [0] * 4
+    assert kb_generation() == 200
+    assert set(_read_registry()) == {"web-0", "web-1", "web-2"}
+    assert not list(tmp_path.glob("*.tmp"))
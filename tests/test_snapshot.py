@@ -0,0 +1,44 @@
+"""Tests for knowledge-base snapshot export / import."""
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import FakeEmbeddings
+
+from src.config import settings
+from src.rag import retriever, shards, snapshot, vector_store
+
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_store, "get_embedding_model", lambda: FakeEmbeddings(size=8))
+    monkeypatch.setattr(settings, "chroma_persist_dir", str(tmp_path / "primary"))
+    monkeypatch.setattr(settings, "shard_collections", False)
+    vector_store.reopen_vector_store()
+    retriever.invalidate_shard(None)
+    yield tmp_path
+    vector_store.reopen_vector_store()
+    retriever.invalidate_shard(None)
+
+
+def test_snapshot_roundtrip_and_checksum(store_dir, monkeypatch):
+    vector_store.add_documents(
+        [Document(page_content=f"chunk number {i}", metadata={"source": "a.txt"}) for i in range(5)]
+    )
+    manifest = snapshot.export_snapshot(store_dir / "snap")
+    assert manifest["shards"]["default"]["count"] == 5
+    assert snapshot.verify_snapshot(store_dir / "snap")["checksum"] == manifest["checksum"]
+
+    # A fresh replica restores vectors, texts and the prebuilt lexical index
+    monkeypatch.setattr(settings, "chroma_persist_dir", str(store_dir / "replica"))
+    vector_store.reopen_vector_store()
+    retriever.invalidate_shard(None)
+    snapshot.import_snapshot(store_dir / "snap")
+    assert shards.kb_generation() == manifest["generation"]
+    assert len(vector_store.get_all_documents()) == 5
+    shard_retriever = retriever.get_shard_retriever()
+    assert shard_retriever.documents is None  # loaded, not rebuilt
+    assert len(shard_retriever.bm25) == 5
+
+    (store_dir / "snap" / "shards" / "default" / "texts.bin").write_bytes(b"corrupt")
+    with pytest.raises(snapshot.SnapshotError):
+        snapshot.verify_snapshot(store_dir / "snap")
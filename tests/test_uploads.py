@@ -0,0 +1,125 @@
+"""Tests for streamed upload ingestion."""
+
+import json
+import random
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from src.config import settings
+from src.rag.streaming import NdjsonChunker, StreamingChunker
+
+
+def _pieces(data: bytes, rng: random.Random) -> list[bytes]:
+    pieces, start = [], 0
+    while start < len(data):
+        size = rng.randint(1, 700)
+        pieces.append(data[start : start + size])
+        start += size
+    return pieces
+
+
+def test_streaming_chunker_keeps_chunk_size_and_text():
+    rng = random.Random(0)
+    words = [f"wörd{i}" for i in range(300)]
+    text = " ".join(rng.choice(words) for _ in range(6000))
+    chunker = StreamingChunker({"source": "big.txt"}, window=4 * settings.chunk_size)
+
+    chunks = []
+    for piece in _pieces(text.encode(), rng):
+        chunks.extend(chunker.feed(piece))
+    chunks.extend(chunker.close())
+
+    assert all(len(c.page_content) <= settings.chunk_size for c in chunks)
+    assert all(c.metadata == {"source": "big.txt"} for c in chunks)
+    # Every word survives, in order, despite pieces splitting multi-byte characters
+    covered = " ".join(c.page_content for c in chunks)
+    assert set(covered.split()) == set(text.split())
+    assert chunks[0].page_content.split()[0] == text.split()[0]
+    assert chunks[-1].page_content.split()[-1] == text.split()[-1]
+
+
+def test_ndjson_chunker_reassembles_lines_and_counts_invalid():
+    lines = [
+        json.dumps({"text": "first document", "source": "a.com", "tags": ["x"]}),
+        "not json",
+        json.dumps({"content": "second document", "metadata": {"title": "T"}}),
+        json.dumps({"no_text": 1}),
+    ]
+    data = ("\n".join(lines)).encode()
+    chunker = NdjsonChunker({"source": "upload.jsonl", "upload_id": "u"})
+
+    chunks = []
+    for piece in _pieces(data, random.Random(1)):
+        chunks.extend(chunker.feed(piece[:5]) + chunker.feed(piece[5:]))
+    chunks.extend(chunker.close())
+
+    assert [c.page_content for c in chunks] == ["first document", "second document"]
+    assert chunks[0].metadata == {"source": "a.com", "upload_id": "u"}
+    assert chunks[1].metadata["title"] == "T"
+    assert (chunker.documents, chunker.invalid) == (2, 2)
+
+    with pytest.raises(ValueError):
+        NdjsonChunker({}, max_line_bytes=10).feed(b"x" * 11)
+
+
+@pytest.mark.asyncio
+async def test_upload_endpoint_streams_into_the_store(monkeypatch, tmp_path):
+    from src.api import routes
+    from src.api.app import app
+    from src.api.uploads import UploadManager, UploadStore
+
+    stored = []
+
+    def store_chunks(chunks):
+        stored.extend(chunks)
+        return len(chunks)
+
+    manager = UploadManager(store_chunks, UploadStore(tmp_path / "jobs.db"))
+    monkeypatch.setattr(routes, "upload_manager", manager)
+    monkeypatch.setattr(settings, "ingest_batch_size", 4)
+    body = "\n".join(json.dumps({"text": f"document number {i}"}) for i in range(10))
+
+    async def pieces():
+        for start in range(0, len(body), 50):
+            yield body[start : start + 50].encode()
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post(
+            "/api/v1/ingest/uploads?filename=docs.jsonl",
+            content=pieces(),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        assert response.status_code == 202
+        upload_id = response.json()["upload_id"]
+        upload = manager._active.get(upload_id)
+        if upload is not None:
+            upload.done.wait(5)
+
+        status = (await client.get(f"/api/v1/ingest/uploads/{upload_id}")).json()
+        assert status["status"] == "succeeded"
+        assert status["format"] == "ndjson"
+        assert status["documents"] == status["stored"] == 10
+        assert status["bytes_processed"] == len(body)
+        assert status["chunks_per_second"] > 0
+        assert len(stored) == 10 and stored[0].metadata["upload_id"] == upload_id
+
+        listed = (await client.get("/api/v1/ingest/uploads")).json()
+        assert [u["upload_id"] for u in listed] == [upload_id]
+        assert (await client.get("/api/v1/ingest/uploads/missing")).status_code == 404
+
+
+def test_uploads_with_an_expired_lease_are_failed(tmp_path):
+    """An unfinished upload no process has written for a lease period is failed."""
+    from src.api.uploads import Upload, UploadManager, UploadStore
+
+    store = UploadStore(tmp_path / "jobs.db")
+    stale, live = Upload("a.txt", "text", None), Upload("b.txt", "text", None)
+    stale.record["updated_at"] -= settings.job_lease_seconds + 1
+    store.save(stale.record)
+    store.save(live.record)
+
+    manager = UploadManager(store=store)
+    assert manager.get(stale.id)["status"] == "failed"
+    assert manager.get(live.id)["status"] == "receiving"
+    assert store.fail_orphans(settings.job_lease_seconds) == 0
@@ -0,0 +1,66 @@
+"""Tests for offline batch verification and its checkpointing."""
+
+import json
+
+import pytest
+
+from scripts import verify_batch
+from scripts.verify_batch import Checkpoint, read_claims
+
+
+def test_blank_and_malformed_lines_do_not_stall_the_watermark(tmp_path):
+    """Records are numbered as read, so finishing them all moves the watermark to the end."""
+    path = tmp_path / "claims.jsonl"
+    path.write_text('{"claim": "a"}\n\n{"claim": \n"b"\n{"claim": "c"}\n')
+    invalid = []
+
+    records = list(read_claims(path, "jsonl", "claim", lambda n, e: invalid.append(n)))
+    assert records == [(0, {"claim": "a"}), (1, {"claim": "b"}), (2, {"claim": "c"})]
+    assert invalid == [3]
+
+    checkpoint = Checkpoint(tmp_path / "ckpt")
+    for index, _ in records:
+        checkpoint.mark(index)
+    assert checkpoint.watermark == 3 and not checkpoint.done
+
+
+def test_resume_drops_a_torn_result_line(tmp_path):
+    """A line torn by a crash is cut off, so the next result starts on its own line."""
+    output = tmp_path / "results.jsonl"
+    output.write_bytes(b'{"index": 0}\n{"index": 2}\n{"ind')
+
+    checkpoint = Checkpoint(tmp_path / "ckpt")
+    checkpoint.load(output)
+    assert checkpoint.watermark == 1 and checkpoint.done == {2}
+    assert output.read_bytes() == b'{"index": 0}\n{"index": 2}\n'
+    assert checkpoint.output_offset == output.stat().st_size
+
+
+@pytest.mark.asyncio
+async def test_run_resumes_without_repeating_claims(tmp_path, monkeypatch):
+    verified = []
+
+    class Agent:
+        async def ainvoke(self, state):
+            verified.append(state["query"])
+            return state
+
+    def extract_output(result, claim):
+        return {"evidence_source": "RAG Store", "claim_verdict": True}
+
+    monkeypatch.setattr(verify_batch, "create_rag_agent", Agent)
+    monkeypatch.setattr(verify_batch, "extract_output", extract_output)
+    claims = tmp_path / "claims.jsonl"
+    output = tmp_path / "results.jsonl"
+    claims.write_text('{"claim": "one"}\nnot json\n{"claim": "two"}\n')
+    args = verify_batch.parse_args([str(claims), "--output", str(output)])
+
+    await verify_batch.run(args)
+    claims.write_text(claims.read_text() + '{"claim": "three"}\n')
+    await verify_batch.run(args)
+
+    assert sorted(verified) == ["one", "three", "two"]
+    lines = [json.loads(line) for line in output.read_text().splitlines()]
+    assert sorted(line["index"] for line in lines) == [0, 1, 2]
+    state = json.loads((tmp_path / "results.jsonl.ckpt").read_text())
+    assert state["watermark"] == 3 and state["done"] == []